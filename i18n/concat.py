@@ -0,0 +1,165 @@
+"""
+Concatenate .po catalogs in this process, the way msgcat does.
+
+Entries are merged on their (msgctxt, msgid) key, in the order in which they
+first appear.  Occurrences, comments and flags of the same message in several
+catalogs are united.  Instead of the "#-#-#-#-#" markup that msgcat writes into
+the msgstr of a message translated differently in several catalogs, the first
+translation is kept, and all of them are reported as a `Conflict`.
+
+"""
+
+from collections import namedtuple
+
+import polib
+
+# A message translated differently by several catalogs.  `entry` is the merged
+# entry, holding the first translation.  `translations` is a list of
+# (identification, translation) pairs, one for each catalog that translated it,
+# where a translation is the msgstr, or the msgstr_plural dictionary.
+Conflict = namedtuple('Conflict', 'entry translations')
+
+HEADER_MARKER = '#-#-#-#-#  {}  #-#-#-#-#'
+
+
+def identification(name, pofile):
+    """
+    Returns the name msgcat gives to the catalog `pofile` read from `name`:
+    the file name, followed by the Project-Id-Version if it has one.
+    """
+    project = pofile.metadata.get('Project-Id-Version')
+    return f'{name} ({project})' if project else name
+
+
+def translation(entry):
+    """
+    Returns the translation of `entry`, or None if it is not translated.
+    """
+    if entry.msgid_plural:
+        if any(entry.msgstr_plural.values()):
+            return dict(entry.msgstr_plural)
+        return None
+    return entry.msgstr or None
+
+
+def concatenate(catalogs):
+    """
+    Concatenate `catalogs`, a list of (name, pofile) pairs.
+
+    Returns a pair: the new pofile, and a list of `Conflict`.  The entries of
+    the pofiles in `catalogs` are reused for the new one, and those found in
+    several catalogs are changed, so the pofiles should not be used afterwards.
+
+    As msgcat does, the header comments of the catalogs are kept once if they
+    are all the same, or else each is preceded by a line identifying its
+    catalog.  Metadata found in several catalogs takes the last value.
+    """
+    merged = concatenate_headers(catalogs)
+    if not catalogs:
+        return merged, []
+    ids = [identification(name, pofile) for name, pofile in catalogs]
+
+    # The merge state of each message, and the messages translated by several
+    # catalogs, in the order they were found to be.
+    states = {}
+    translated_again = {}
+    for id_, (_, pofile) in zip(ids, catalogs):
+        for entry in pofile:
+            key = (entry.msgctxt, entry.msgid)
+            previous = states.get(key)
+            state = states[key] = merge_entry(previous, entry, id_)
+            if state is not previous:
+                translated_again.pop(key, None)
+            if state[2] and key not in translated_again:
+                translated_again[key] = None
+
+    merged.extend(state[0] for state in states.values())
+    conflicts = [conflict(states[key]) for key in translated_again]
+    return merged, [item for item in conflicts if item]
+
+
+def merge_entry(state, entry, id_):
+    """
+    Merge `entry`, read from the catalog identified as `id_`, into the merge
+    state of its message: None the first time it is seen, or else the
+    [merged entry, first translation, other translations] list returned for
+    it before, where translations are (identification, translation) pairs.
+
+    Returns the new state, a new list holding `entry` itself when the message
+    is first seen, or when an obsolete message is replaced by a live one.
+    """
+    if state is None or (state[0].obsolete and not entry.obsolete):
+        state = [entry, None, []]
+    elif entry.obsolete and not state[0].obsolete:
+        return state
+    else:
+        unite(state[0], entry)
+    text = translation(entry)
+    if text is not None:
+        if state[1] is None:
+            state[1] = (id_, text)
+            state[0].msgstr = entry.msgstr
+            state[0].msgstr_plural = entry.msgstr_plural
+        else:
+            state[2].append((id_, text))
+    return state
+
+
+def conflict(state):
+    """
+    Returns the `Conflict` of a message with this merge state, or None if
+    it has a single translation.
+    """
+    merged_entry, first, others = state
+    if any(text != first[1] for _, text in others):
+        return Conflict(merged_entry, [first] + others)
+    return None
+
+
+def concatenate_headers(catalogs):
+    """
+    Returns a new pofile with no entries, holding the header comments and
+    metadata of `catalogs`, a list of (name, pofile) pairs, concatenated as
+    `concatenate` does.
+    """
+    merged = polib.POFile(wrapwidth=catalogs[0][1].wrapwidth if catalogs else 78)
+    if not catalogs:
+        return merged
+    merged.encoding = catalogs[0][1].encoding
+    merged.metadata_is_fuzzy = catalogs[0][1].metadata_is_fuzzy
+    headers = [pofile.header for _, pofile in catalogs]
+    if all(header == headers[0] for header in headers):
+        merged.header = headers[0]
+    else:
+        merged.header = '\n'.join(
+            HEADER_MARKER.format(identification(name, pofile)) + '\n' + pofile.header
+            for name, pofile in catalogs
+            if pofile.header
+        )
+    for _, pofile in catalogs:
+        merged.metadata.update(pofile.metadata)
+    return merged
+
+
+def unite(merged_entry, entry):
+    """
+    Add the occurrences, comments and flags of `entry` to `merged_entry`.
+    """
+    occurrences = set(merged_entry.occurrences)
+    merged_entry.occurrences.extend(occ for occ in entry.occurrences if occ not in occurrences)
+    merged_entry.flags.extend(flag for flag in entry.flags if flag not in merged_entry.flags)
+    merged_entry.comment = _unite_lines(merged_entry.comment, entry.comment)
+    merged_entry.tcomment = _unite_lines(merged_entry.tcomment, entry.tcomment)
+
+
+def _unite_lines(text, other):
+    """
+    Returns the lines of `text` followed by those of `other` not in `text`.
+    """
+    if not other or other == text:
+        return text
+    if not text:
+        return other
+    lines = text.split('\n')
+    lines.extend(line for line in other.split('\n') if line not in lines)
+    return '\n'.join(lines)
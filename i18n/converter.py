@@ -37,6 +37,9 @@ class Converter:
         re.IGNORECASE | re.VERBOSE
     )
 
+    # matches the placeholders tags are replaced by: <0>, <1>, etc.
+    placeholder_pattern = re.compile(r'<\d+>')
+
     def convert(self, string):
         """Returns: a converted tagged string
            param: string (contains html tags)
@@ -48,6 +51,21 @@ class Converter:
         string = self.retag_string(string, tags)
         return string
 
+    def tokenize(self, string):
+        """Splits string into its text and tags, in a single scan.
+
+           returns a tuple alternating text and tags, starting and ending
+           with text, which may be empty: ('big ', '<b>', 'bad', '</b>', '')
+        """
+        tokens = []
+        start = 0
+        for match in self.tag_pattern.finditer(string):
+            tokens.append(string[start:match.start()])
+            tokens.append(match.group())
+            start = match.end()
+        tokens.append(string[start:])
+        return tuple(tokens)
+
     def detag_string(self, string):
         """Extracts tags from string.
 
@@ -55,21 +73,21 @@ class Converter:
            string: string has tags replaced by indices (<BR>... => <0>, <1>, <2>, etc.)
            list: list of the removed tags ('<BR>', '<I>', '</I>')
         """
-        counter = itertools.count(0)
-        count = lambda m: f'<{next(counter)}>'  # pylint: disable=unnecessary-lambda-assignment
-        tags = self.tag_pattern.findall(string)
-        tags = [''.join(tag) for tag in tags]
-        (new, nfound) = self.tag_pattern.subn(count, string)
-        if len(tags) != nfound:
-            raise Exception('tags dont match:' + string)  # pylint: disable=broad-exception-raised
+        tokens = self.tokenize(string)
+        if len(tokens) == 1:
+            return (string, [])
+        texts, tags = tokens[0::2], list(tokens[1::2])
+        placeholders = (f'<{i}>' for i in range(len(tags)))
+        new = ''.join(itertools.chain.from_iterable(zip(texts, placeholders))) + texts[-1]
         return (new, tags)
 
     def retag_string(self, string, tags):
         """substitutes each tag back into string, into occurrences of <0>, <1> etc"""
-        for i, tag in enumerate(tags):
-            bracketed = f'<{i}>'
-            string = re.sub(bracketed, tag, string, 1)
-        return string
+        if not tags:
+            return string
+        # Each tag goes into the first occurrence of its placeholder only.
+        remaining = {f'<{i}>': tag for i, tag in enumerate(tags)}
+        return self.placeholder_pattern.sub(lambda m: remaining.pop(m.group(), m.group()), string)
 
     # ------------------------------
     # Customize this in subclasses of Converter
@@ -23,14 +23,18 @@ where $DUMMY_LOCALE is the dummy_locale value set in the i18n config
 """
 
 
+import functools
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 import polib
 from path import Path
 
 from i18n import Runner
 from i18n.converter import Converter
-from i18n.generate import clean_pofile
+from i18n.extractors import file_digest
+from i18n.generate import clean_catalog
+from i18n.manifest import BuildManifest
 
 
 def is_format_message(msg):
@@ -43,12 +47,52 @@ class BaseDummyConverter(Converter):
 
     String conversion goes through a character map, then gets padded.
 
+    The strings converted are remembered, up to `cache_size` of them, so
+    that converting the same string again, from another file, is free.
+
     """
     TABLE = []
 
+    CACHE_SIZE = 50000
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.translate_table = self.make_translate_table(self.TABLE)
+        self.cached_convert = functools.lru_cache(maxsize=cache_size)(super().convert)
+
+    @staticmethod
+    def make_translate_table(table):
+        """
+        Returns the `str.translate` table doing the replacements of `table`
+        one after the other, or None if they aren't all of single characters.
+        """
+        if not all(len(old) == 1 for old, __ in table):
+            return None
+        # Looking up a character missing from the table is slow, so ASCII
+        # characters are all in it.
+        mapping = {chr(code): chr(code) for code in range(128)}
+        for old_char in dict(table):
+            char = old_char
+            for old, new in table:
+                char = char.replace(old, new)
+            mapping[old_char] = char
+        return str.maketrans(mapping)
+
+    def convert(self, string):
+        return self.cached_convert(string)
+
+    def cache_info(self):
+        """
+        Returns the hits, misses, maxsize and currsize of the cache of
+        converted strings, as `functools.lru_cache` does.
+        """
+        return self.cached_convert.cache_info()
+
     def inner_convert_string(self, string):
-        for old, new in self.TABLE:
-            string = string.replace(old, new)
+        if self.translate_table is not None:
+            string = string.translate(self.translate_table)
+        else:
+            for old, new in self.TABLE:
+                string = string.replace(old, new)
         return self.pad(string)
 
     def pad(self, string):
@@ -185,31 +229,61 @@ class ArabicDummy(BaseDummyConverter):
     ))
 
 
-def make_dummy(filename, locale, converter):
+def make_dummy(filename, locale, converter, manifest=None):
     """
     Takes a source po file, reads it, and writes out a new po file
     in :param locale: containing a dummy translation.
+
+    With a `manifest`, the new po file isn't written again while it is
+    unchanged, and the source file is the same as when it was last written.
+    Returns whether the new po file was written.
     """
-    if not Path(filename).exists():
-        raise OSError(f'File does not exist: {filename}')
-    pofile = polib.pofile(filename)
-    for msg in pofile:
-        # Some strings are actually formatting strings, don't dummy-ify them,
-        # or dates will look like "DÀTÉ_TÌMÉ_FÖRMÀT Ⱡ'σ# EST"
-        if is_format_message(msg):
-            continue
-        converter.convert_msg(msg)
+    return bool(make_dummies(filename, [(locale, converter)], manifest))
+
 
-    pofile.metadata['Language'] = locale
+def make_dummies(filename, dummies, manifest=None):
+    """
+    Takes a source po file, reads it once, and writes out a new po file
+    for each (locale, converter) pair of `dummies`, as `make_dummy` does.
 
-    # Apply declaration for English pluralization rules so that ngettext will
-    # do something reasonable.
-    pofile.metadata['Plural-Forms'] = 'nplurals=2; plural=(n != 1);'
+    Returns the list of the locales whose new po file was written.
+    """
+    if not Path(filename).exists():
+        raise OSError(f'File does not exist: {filename}')
+    digest = file_digest(filename) if manifest is not None else None
+    outdated = []
+    for locale, converter in dummies:
+        new_file = new_filename(filename, locale)
+        key = ['dummy', type(converter).__name__, digest]
+        if manifest is None or not manifest.is_current(new_file, key):
+            outdated.append((locale, converter, new_file, key))
+    if not outdated:
+        return []
 
-    new_file = new_filename(filename, locale)
-    new_file.parent.makedirs_p()
-    pofile.save(new_file)
-    clean_pofile(new_file)
+    pofile = polib.pofile(filename)
+    # The fields converting and cleaning change, to convert each locale from
+    # the source messages.
+    sources = [(msg.msgstr, msg.msgstr_plural, msg.flags) for msg in pofile]
+    for locale, converter, new_file, key in outdated:
+        for msg, (msgstr, msgstr_plural, flags) in zip(pofile, sources):
+            msg.msgstr, msg.msgstr_plural, msg.flags = msgstr, dict(msgstr_plural), list(flags)
+            # Some strings are actually formatting strings, don't dummy-ify them,
+            # or dates will look like "DÀTÉ_TÌMÉ_FÖRMÀT Ⱡ'σ# EST"
+            if not is_format_message(msg):
+                converter.convert_msg(msg)
+
+        pofile.metadata['Language'] = locale
+
+        # Apply declaration for English pluralization rules so that ngettext will
+        # do something reasonable.
+        pofile.metadata['Plural-Forms'] = 'nplurals=2; plural=(n != 1);'
+
+        clean_catalog(pofile)
+        new_file.parent.makedirs_p()
+        pofile.save(new_file)
+        if manifest is not None:
+            manifest.record(new_file, key)
+    return [locale for locale, *__ in outdated]
 
 
 def new_filename(original_filename, new_locale):
@@ -219,6 +293,34 @@ def new_filename(original_filename, new_locale):
     return new_file.abspath()
 
 
+# The converters of a worker process, by class, kept from one source file to
+# the next.
+_WORKER_CONVERTERS = {}
+
+
+def _make_dummies_task(task):
+    """
+    Make the dummy files of a source po file in a worker process.
+
+    Returns the locales whose new po file was written, the manifest records
+    of the files written, and the (hits, misses) of the conversions cache of
+    each converter meanwhile.
+    """
+    filename, locales, manifest = task
+    dummies = []
+    for locale, converter_class in locales:
+        if converter_class not in _WORKER_CONVERTERS:
+            _WORKER_CONVERTERS[converter_class] = converter_class()
+        dummies.append((locale, _WORKER_CONVERTERS[converter_class]))
+    before = [converter.cache_info() for __, converter in dummies]
+    written = make_dummies(filename, dummies, manifest)
+    counts = [
+        (info.hits - previous.hits, info.misses - previous.misses)
+        for previous, info in zip(before, (converter.cache_info() for __, converter in dummies))
+    ]
+    return written, manifest.updates(), counts
+
+
 class DummyCommand(Runner):
     """
     Class to run dummy commands.
@@ -228,20 +330,62 @@ class DummyCommand(Runner):
         Adds arguments
         """
         self.parser.description = __doc__
+        self.parser.add_argument(
+            "--force",
+            action='store_true',
+            help="Write all the dummy files, even those whose sources haven't changed since the last time.",
+        )
+        self.parser.add_argument(
+            "--jobs", "-j",
+            type=int,
+            default=1,
+            help="Make the dummy files of up to JOBS source files at the same time, in separate processes.",
+        )
 
     def run(self, args):
         """
         Generate dummy strings for all source po files.
+
+        Each source file is read once, and converted for all the dummy
+        locales.
         """
         configuration = self.configuration
         source_messages_dir = configuration.source_messages_dir
-        for locale, converter in zip(configuration.dummy_locales, [Dummy(), Dummy2(), ArabicDummy()]):
-            print(f'Processing source language files into dummy strings, locale "{locale}"')
-            for source_file in configuration.source_messages_dir.walkfiles('*.po'):
-                if args.verbose:
-                    print('   ', source_file.relpath())
-                make_dummy(source_messages_dir.joinpath(source_file), locale, converter)
+        manifest = BuildManifest(configuration.locale_dir, force=args.force)
+        dummies = list(zip(configuration.dummy_locales, [Dummy(), Dummy2(), ArabicDummy()]))
+        locales = ', '.join(f'"{locale}"' for locale, __ in dummies)
+        print(f'Processing source language files into dummy strings, locales {locales}')
+        source_files = list(source_messages_dir.walkfiles('*.po'))
+
+        def report(source_file, written):
+            if args.verbose:
+                print('   ', source_file.relpath(), *(written or ['(up to date)']))
+
+        if args.jobs <= 1 or len(source_files) <= 1:
+            for source_file in source_files:
+                report(source_file, make_dummies(source_messages_dir.joinpath(source_file), dummies, manifest))
+            counts = [converter.cache_info()[:2] for __, converter in dummies]
+        else:
+            locale_classes = [(locale, type(converter)) for locale, converter in dummies]
+            tasks = [
+                (source_messages_dir.joinpath(source_file), locale_classes, manifest)
+                for source_file in source_files
+            ]
+            counts = [(0, 0)] * len(dummies)
+            with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+                for source_file, (written, outputs, task_counts) in zip(
+                    source_files, executor.map(_make_dummies_task, tasks),
+                ):
+                    manifest.outputs.update(outputs)
+                    report(source_file, written)
+                    counts = [
+                        (hits + task_hits, misses + task_misses)
+                        for (hits, misses), (task_hits, task_misses) in zip(counts, task_counts)
+                    ]
+        manifest.save()
         if args.verbose:
+            for (locale, __), (hits, misses) in zip(dummies, counts):
+                print(f'    "{locale}": {misses} strings converted, {hits} reused')
             print()
 
 
@@ -4,6 +4,7 @@ Utility library file for executing shell commands
 import os
 import subprocess as sp
 import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from i18n import config
 
@@ -21,6 +22,116 @@ def execute(command, working_directory=config.BASE_DIR, stderr=sp.STDOUT):
     sp.check_call(command, cwd=working_directory, stderr=stderr, shell=True)
 
 
+def execute_captured(command, working_directory=config.BASE_DIR):
+    """
+    Executes shell command in a given working_directory, like `execute`,
+    but collects its stderr instead of letting it interleave with other
+    commands running at the same time.
+
+    Returns the stderr output as a string.  If the command fails, the
+    raised CalledProcessError carries that output in its `stderr` attribute.
+    """
+    LOG.info("Executing in %s ...", working_directory)
+    LOG.info(command)
+    proc = sp.run(command, cwd=working_directory, stderr=sp.PIPE, shell=True, check=False)
+    err = proc.stderr.decode('utf8', 'replace')
+    if proc.returncode:
+        raise sp.CalledProcessError(proc.returncode, command, stderr=err)
+    return err
+
+
+class Job:
+    """
+    A named unit of work for `run_jobs`.
+
+    `func` is called with no arguments.  It is only started once all the
+    jobs named in `requires` have finished successfully.
+    """
+
+    def __init__(self, name, func, requires=()):
+        self.name = name
+        self.func = func
+        self.requires = frozenset(requires)
+
+    def __repr__(self):
+        return f"<Job {self.name}>"
+
+
+def run_jobs(jobs, max_workers=1):
+    """
+    Run `jobs`, a list of `Job` objects, as a dependency graph.
+
+    Jobs are started in list order as soon as their requirements are met,
+    with at most `max_workers` of them running at once.  The jobs run in
+    threads, so they should spend their time waiting on subprocesses or I/O.
+    With a single worker, the jobs are run one after another in this thread.
+
+    If a job fails, its name and any stderr it captured are logged, no new
+    jobs are started, and the exception is re-raised once the jobs already
+    running have finished.
+    """
+    names = {job.name for job in jobs}
+    for job in jobs:
+        unknown = job.requires - names
+        if unknown:
+            raise ValueError(f"Job {job.name} requires unknown jobs: {sorted(unknown)}")
+
+    pending = list(jobs)
+    done = set()
+
+    def ready_jobs():
+        return [job for job in pending if job.requires <= done]
+
+    if max_workers <= 1:
+        while pending:
+            ready = ready_jobs()
+            if not ready:
+                raise ValueError(f"Job requirements cannot be satisfied: {pending}")
+            job = ready[0]
+            pending.remove(job)
+            try:
+                job.func()
+            except Exception as exc:
+                _log_job_failure(job, exc)
+                raise
+            done.add(job.name)
+        return
+
+    failure = None
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            if failure is None:
+                for job in ready_jobs()[:max_workers - len(running)]:
+                    pending.remove(job)
+                    running[executor.submit(job.func)] = job
+            if not running:
+                if failure is None:
+                    raise ValueError(f"Job requirements cannot be satisfied: {pending}")
+                break
+            finished, __ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job = running.pop(future)
+                exc = future.exception()
+                if exc is None:
+                    done.add(job.name)
+                else:
+                    _log_job_failure(job, exc)
+                    failure = failure or exc
+    if failure is not None:
+        raise failure
+
+
+def _log_job_failure(job, exc):
+    """
+    Log that `job` failed with `exc`, including any stderr it captured.
+    """
+    LOG.error("Job %s failed: %s", job.name, exc)
+    stderr = getattr(exc, 'stderr', None)
+    if stderr:
+        LOG.error("Output of %s:\n%s", job.name, stderr)
+
+
 def call(command, working_directory=config.BASE_DIR):
     """
     Executes shell command in a given working_directory.
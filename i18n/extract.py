@@ -15,8 +15,9 @@ and it cannot be overridden.
 
 """
 
+import argparse
 from datetime import datetime
-import importlib
+import importlib.metadata
 import os
 import os.path
 import logging
@@ -26,7 +27,30 @@ import polib
 from path import Path
 
 from i18n import Runner
-from i18n.execute import remove_file, execute
+from i18n.concat import concatenate
+from i18n.execute import Job, execute, execute_captured, remove_file, run_jobs
+from i18n.extractors import (
+    DJANGO_DOMAIN,
+    DJANGOJS_DOMAIN,
+    ExtractionCache,
+    PackageCache,
+    babel_keywords,
+    build_babel_catalog,
+    build_catalog,
+    extract_babel_sources,
+    extract_sources,
+    file_digest,
+    find_babel_files,
+    find_package_dir,
+    find_source_files,
+    in_shard,
+    package_key,
+    read_babel_mapping,
+    read_shards,
+    shard_output,
+    worker_pool,
+    write_shard,
+)
 from i18n.segment import segment_pofiles
 
 
@@ -40,6 +64,11 @@ DJANGOJS_PO = 'djangojs.po'
 DJANGOJS_PARTIAL_PO = 'djangojs-partial.po'
 DJANGOJS_SAVED_PO = 'djangojs-saved.po'
 MAKO_PO = 'mako.po'
+EXTRACTION_CACHE = '.extract-cache.json'
+# Each shard caches its own files, so that the runs of the other shards,
+# one after the other or at the same time, don't evict them.
+SHARD_EXTRACTION_CACHE = '.extract-cache-{}-of-{}.json'
+THIRD_PARTY_CACHE = '.extract-third-party-cache.json'
 UNDERSCORE_PO = 'underscore.po'
 
 
@@ -68,7 +97,7 @@ class Extract(Runner):
         self.parser.add_argument(
             '--merge-po-files',
             action='store_true',
-            help='Merge djangojs.po with django.po using msgcat'
+            help='Merge djangojs.po with django.po'
         )
         self.parser.add_argument(
             '--no-segment',
@@ -80,6 +109,51 @@ class Extract(Runner):
                 'helpful when running the `extract` command in small repositories with no segment/merge workflow.'
             )
         )
+        self.parser.add_argument(
+            '--makemessages',
+            action='store_true',
+            help=(
+                'Extract the django and djangojs domains with `django-admin makemessages` and xgettext instead of '
+                'the in-process extractor.'
+            )
+        )
+        self.parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help=(
+                'Parse every source file again instead of reusing the messages cached for the files and the '
+                'third-party applications that have not changed since the last extraction.'
+            )
+        )
+        shards = self.parser.add_mutually_exclusive_group()
+        shards.add_argument(
+            '--shard',
+            type=parse_shard,
+            metavar='I/N',
+            help=(
+                'Extract only the I-th of N parts of the source files, chosen by a stable hash of their paths, '
+                'and write what was found to extract-shard-I-of-N.json in the source messages directory '
+                'instead of writing the .po files.'
+            )
+        )
+        shards.add_argument(
+            '--merge-shards',
+            metavar='DIR',
+            help=(
+                'Instead of extracting, combine the N shard files in DIR written by --shard into the same '
+                '.po files a single extraction writes.'
+            )
+        )
+        self.parser.add_argument(
+            '--jobs', '-j',
+            type=int,
+            default=1,
+            help=(
+                'Run the independent extractors (Babel for mako, underscore and third-party apps, and django) '
+                'at the same time, parsing source files in a shared pool of JOBS worker processes. '
+                'Segmenting and cleaning still wait for all of them.'
+            )
+        )
 
     def rename_source_file(self, src, dst):
         """
@@ -100,81 +174,53 @@ class Extract(Runner):
         # pylint: disable=attribute-defined-outside-init
         self.source_msgs_dir = configuration.source_messages_dir
 
+        if args.makemessages and args.shard:
+            self.parser.error('--makemessages cannot be used with --shard')
+
+        # The extractors leave their catalogs here rather than writing them,
+        # so that they are segmented and cleaned in memory and written once.
+        catalogs = {}
+        files_to_clean = set()
+        if args.shard:
+            self.extract(args, files_to_clean, catalogs)
+            self.source_msgs_dir.makedirs_p()
+            filename = write_shard(self.source_msgs_dir, args.shard, {
+                path_name.basename(): output for path_name, output in catalogs.items()
+            })
+            LOG.info('Wrote extraction shard %s', filename)
+            return
+
         # The extraction process clobbers django.po and djangojs.po.
         # Save them so that it won't do that.
         self.rename_source_file(DJANGO_PO, DJANGO_SAVED_PO)
         self.rename_source_file(DJANGOJS_PO, DJANGOJS_SAVED_PO)
 
-        # Extract strings from mako templates.
-        verbosity_map = {
-            0: "-q",
-            1: "",
-            2: "-v",
-        }
-        babel_verbosity = verbosity_map.get(args.verbose, "")
-
-        if args.verbose:
-            stderr = None
+        if args.merge_shards:
+            self.merge_shards(args.merge_shards, files_to_clean, catalogs)
         else:
-            stderr = DEVNULL
-
-        self.babel_extract(stderr, babel_verbosity)
-
-        makemessages = f"django-admin makemessages -l en -v{args.verbose}"
-        ignores = " ".join(f'--ignore="{d}/*"' for d in configuration.ignore_dirs)
-        if ignores:
-            makemessages += " " + ignores
-
-        # Extract strings from django source files (*.py, *.html, *.txt).
-        make_django_cmd = makemessages + ' -d django'
-        execute(make_django_cmd, working_directory=configuration.root_dir, stderr=stderr)
-
-        # Extract strings from Javascript source files (*.js, *jsx).
-        make_djangojs_cmd = makemessages + ' -d djangojs -e js,jsx'
-        execute(make_djangojs_cmd, working_directory=configuration.root_dir, stderr=stderr)
-
-        # makemessages creates 'django.po'. This filename is hardcoded.
-        # Rename it to django-partial.po to enable merging into django.po later.
-        self.rename_source_file(DJANGO_PO, DJANGO_PARTIAL_PO)
-
-        # makemessages creates 'djangojs.po'. This filename is hardcoded.
-        # Rename it to djangojs-partial.po to enable merging into djangojs.po later.
-        self.rename_source_file(DJANGOJS_PO, DJANGOJS_PARTIAL_PO)
-
-        files_to_clean = set()
-
-        # Extract strings from third-party applications.
-        for app_name in configuration.third_party:
-            # Import the app to find out where it is.  Then use pybabel to extract
-            # from that directory.
-            app_module = importlib.import_module(app_name)
-            app_dir = Path(app_module.__file__).dirname().dirname()
-            output_file = self.source_msgs_dir / (app_name + ".po")
-            files_to_clean.add(output_file)
-
-            babel_cmd = 'pybabel {verbosity} extract -F {config} -c "Translators:" {app} -o {output}'
-            babel_cmd = babel_cmd.format(
-                verbosity=babel_verbosity,
-                config=configuration.locale_dir / 'babel_third_party.cfg',
-                app=app_name,
-                output=output_file,
-            )
-            execute(babel_cmd, working_directory=app_dir, stderr=stderr)
+            self.extract(args, files_to_clean, catalogs)
 
         # Segment the generated files.
         if not args.no_segment:
-            segmented_files = segment_pofiles(configuration, configuration.source_locale)
+            for filename in configuration.segment:
+                load_catalog(catalogs, self.source_msgs_dir.joinpath(filename))
+            segmented_files = segment_pofiles(configuration, configuration.source_locale, catalogs)
             files_to_clean.update(segmented_files)
 
         # Add partial files to the list of files to clean.
         files_to_clean.update((DJANGO_PARTIAL_PO, DJANGOJS_PARTIAL_PO))
 
-        # Finish each file.
+        # Finish each file, and write out all of them.
         for filename in files_to_clean:
-            clean_pofile(self.source_msgs_dir.joinpath(filename))
+            path_name = self.source_msgs_dir.joinpath(filename)
+            pofile = load_catalog(catalogs, path_name)
+            if pofile is not None:
+                LOG.info('Cleaning %s', os.path.basename(path_name))
+                clean_catalog(pofile)
 
         if args.merge_po_files:
-            self.merge_po_files(stderr)
+            self.merge_po_files(catalogs)
+        write_catalogs(catalogs)
 
         if args.no_segment:
             # Overwrite django.po and djangojs.po from django-partial.po and djangojs-partial.po
@@ -187,56 +233,335 @@ class Extract(Runner):
             self.rename_source_file(DJANGO_SAVED_PO, DJANGO_PO)
             self.rename_source_file(DJANGOJS_SAVED_PO, DJANGOJS_PO)
 
-    def babel_extract(self, stderr, verbosity):
+    def extract(self, args, files_to_clean, catalogs):
         """
-        Extract strings from mako templates.
+        Run the extraction jobs, up to --jobs of them at the same time.
+
+        The extractors running in this process share a single pool of --jobs
+        worker processes, started here before any job runs in a thread.
         """
-        configuration = self.configuration
+        jobs = max(args.jobs, 1)
+        executor = worker_pool(jobs)
+        try:
+            run_jobs(
+                self.extraction_jobs(args, files_to_clean, catalogs, parallel=jobs > 1, executor=executor),
+                max_workers=jobs,
+            )
+        finally:
+            if executor is not None:
+                executor.shutdown()
 
-        # --keyword informs Babel that `interpolate()` is an expected
-        # gettext function, which is necessary because the `tokenize` function
-        # in the `markey` module marks it as such and passes it to Babel.
-        # (These functions are called in the django-babel-underscore module.)
-        babel_cmd_template = (
-            'pybabel {verbosity} extract --mapping={config} '
-            '--add-comments="Translators:" --keyword="interpolate" '
-            '. --output={output}'
-        )
+    @staticmethod
+    def stderr_for(args):
+        """
+        Where the stderr of extraction commands should go for these `args`.
+        """
+        return None if args.verbose else DEVNULL
 
-        babel_mako_cfg = self.base(configuration.locale_dir, 'babel_mako.cfg')
-        if babel_mako_cfg.exists():
-            babel_mako_cmd = babel_cmd_template.format(
-                verbosity=verbosity,
-                config=babel_mako_cfg,
-                output=self.base(configuration.source_messages_dir, MAKO_PO),
-            )
+    def extraction_jobs(self, args, files_to_clean, catalogs, parallel=False, executor=None):
+        """
+        Returns the list of `Job` objects that extract strings from the sources.
+
+        The extractors are independent of each other, but with --makemessages
+        the renaming of its output has to wait for it to finish.  The names of
+        the third-party .po files are added to `files_to_clean`.  The Babel
+        and django extractors run in this process, but with --makemessages,
+        and parse files in the pool of worker processes `executor`, if given.
+        They put the catalogs they make into `catalogs` instead of writing
+        them: see `write_catalogs`.  With --shard, they put a `ShardOutput`
+        there instead of each catalog.
+
+        When `parallel` is true, each command's stderr is captured and logged
+        under the name of its job, so that interleaved output from commands
+        running at the same time can still be told apart.
+        """
+        stderr = self.stderr_for(args)
+
+        def command_job(name, command, working_directory, requires=()):
+            """
+            A job running a shell command.
+            """
+            def run_command():
+                if not parallel:
+                    execute(command, working_directory=working_directory, stderr=stderr)
+                    return
+                err = execute_captured(command, working_directory=working_directory)
+                if err and args.verbose:
+                    LOG.info("Output of %s:\n%s", name, err)
+            return Job(name, run_command, requires)
+
+        jobs = [
+            # Extract strings from mako and underscore templates, and from
+            # third-party applications, with Babel in this process.
+            Job('babel', lambda: self.babel_extract(
+                files_to_clean, catalogs, max(args.jobs, 1), use_cache=not args.no_cache, shard=args.shard,
+                executor=executor,
+            )),
+        ]
+
+        if args.makemessages:
+            jobs.extend(self.makemessages_jobs(args, command_job))
+        else:
+            # Extract strings from django and Javascript source files in this process.
+            jobs.append(Job(
+                'django',
+                lambda: self.django_extract(
+                    catalogs, max(args.jobs, 1), use_cache=not args.no_cache, shard=args.shard, executor=executor,
+                ),
+            ))
 
-            execute(babel_mako_cmd, working_directory=configuration.root_dir, stderr=stderr)
+        return jobs
 
-        babel_underscore_cfg = self.base(configuration.locale_dir, 'babel_underscore.cfg')
-        if babel_underscore_cfg.exists():
-            babel_underscore_cmd = babel_cmd_template.format(
-                verbosity=verbosity,
-                config=babel_underscore_cfg,
-                output=self.base(configuration.source_messages_dir, UNDERSCORE_PO),
-            )
+    def makemessages_jobs(self, args, command_job):
+        """
+        Returns the jobs extracting the django and djangojs domains with
+        django-admin makemessages, made with the `command_job` factory.
+        """
+        configuration = self.configuration
+        makemessages = f"django-admin makemessages -l en -v{args.verbose}"
+        ignores = " ".join(f'--ignore="{d}/*"' for d in configuration.ignore_dirs)
+        if ignores:
+            makemessages += " " + ignores
+
+        # Extract strings from django source files (*.py, *.html, *.txt).
+        make_django_cmd = makemessages + ' -d django'
+        # Extract strings from Javascript source files (*.js, *jsx).
+        make_djangojs_cmd = makemessages + ' -d djangojs -e js,jsx'
+        return [
+            command_job('django', make_django_cmd, configuration.root_dir),
+            command_job('djangojs', make_djangojs_cmd, configuration.root_dir),
+            # makemessages creates 'django.po'. This filename is hardcoded.
+            # Rename it to django-partial.po to enable merging into django.po later.
+            Job('rename-django', lambda: self.rename_source_file(DJANGO_PO, DJANGO_PARTIAL_PO), requires=['django']),
+            # makemessages creates 'djangojs.po'. This filename is hardcoded.
+            # Rename it to djangojs-partial.po to enable merging into djangojs.po later.
+            Job(
+                'rename-djangojs',
+                lambda: self.rename_source_file(DJANGOJS_PO, DJANGOJS_PARTIAL_PO),
+                requires=['djangojs'],
+            ),
+        ]
+
+    def django_extract(self, catalogs, jobs=1, use_cache=True, shard=None, *, executor=None):
+        """
+        Extract strings from django and Javascript source files without
+        makemessages, putting django-partial.po and djangojs-partial.po in
+        `catalogs`.
+
+        Like makemessages, a domain with no messages at all writes no file.
+        With `use_cache`, only the files that changed since the last run are
+        parsed again; the cache is kept next to the source messages directory.
+        With a `shard`, only the files of that shard are extracted, and cached
+        apart from those of the other shards.  The files
+        are parsed in `jobs` worker processes, the pool `executor` if given.
+        """
+        configuration = self.configuration
+        files = find_source_files(configuration.root_dir, configuration.ignore_dirs)
+        shard_files = files
+        if shard:
+            shard_files = {domain: [path for path in paths if in_shard(path, shard)] for domain, paths in files.items()}
+        self.source_msgs_dir.makedirs_p()
+        cache_name = SHARD_EXTRACTION_CACHE.format(*shard) if shard else EXTRACTION_CACHE
+        cache = ExtractionCache(self.source_msgs_dir.parent / cache_name) if use_cache else None
+        results = extract_sources(configuration.root_dir, shard_files, jobs=jobs, cache=cache, executor=executor)
+        for domain, filename in ((DJANGO_DOMAIN, DJANGO_PARTIAL_PO), (DJANGOJS_DOMAIN, DJANGOJS_PARTIAL_PO)):
+            spec = {'domain': domain}
+            if shard:
+                catalogs[self.source_msgs_dir / filename] = shard_output(spec, files[domain], results[domain])
+            else:
+                self.add_catalog(catalogs, filename, spec, results[domain])
+
+    def add_catalog(self, catalogs, filename, spec, file_messages):
+        """
+        Build the catalog `filename` from `file_messages`, and put it in
+        `catalogs`.  `spec` is the spec of a `ShardOutput`.
+        """
+        if 'domain' in spec:
+            catalog = build_catalog(file_messages, spec['domain'])
+            if catalog:
+                LOG.info('Extracted %s entries for %s', len(catalog), filename)
+                catalogs[self.source_msgs_dir / filename] = catalog
+        else:
+            catalogs[self.source_msgs_dir / filename] = build_babel_catalog(file_messages, spec['prefix'])
 
-            execute(babel_underscore_cmd, working_directory=configuration.root_dir, stderr=stderr)
+    def merge_shards(self, directory, files_to_clean, catalogs):
+        """
+        Put the catalogs combined from the extraction shards in `directory`
+        in `catalogs`, and add the third-party .po files to `files_to_clean`,
+        as an extraction would.
+        """
+        for filename, (spec, file_messages) in read_shards(directory).items():
+            self.add_catalog(catalogs, filename, spec, file_messages)
+        for app_name in self.configuration.third_party:
+            files_to_clean.add(self.source_msgs_dir / f"{app_name}.po")
 
-    def merge_po_files(self, stderr):
+    def babel_extract(self, files_to_clean, catalogs, jobs=1, use_cache=True, shard=None, *, executor=None):
         """
-        Merge djangojs.po with django.po using msgcat
+        Extract strings from mako templates, underscore templates and
+        third-party applications, putting mako.po, underscore.po and one
+        <app>.po per application in `catalogs`, as pybabel would write them.
+
+        The source tree is walked once for both the mako and the underscore
+        mappings, and the files for all outputs are parsed in one pool of
+        `jobs` worker processes, `executor` if given.  The names of the third-party .po files are
+        added to `files_to_clean`.
+
+        The third-party applications are found without being imported.  With
+        `use_cache`, the catalog of an application installed from a
+        distribution is reused for as long as the distribution's version and
+        babel_third_party.cfg are unchanged.  With a `shard`, only the files of
+        that shard are extracted, and nothing is cached.
         """
+        configuration = self.configuration
+
+        # "interpolate" is an expected gettext function, because the `tokenize`
+        # function in the `markey` module marks it as such and passes it to Babel.
+        # (These functions are called in the django-babel-underscore module.)
+        tree_keywords = babel_keywords('interpolate')
+        tree_mappings = {}
+        for cfg_name, output in (('babel_mako.cfg', MAKO_PO), ('babel_underscore.cfg', UNDERSCORE_PO)):
+            babel_cfg = configuration.locale_dir / cfg_name
+            if babel_cfg.exists():
+                tree_mappings[output] = read_babel_mapping(babel_cfg)
+
+        sources = {}
+        prefixes = {}
+        tree_files = find_babel_files(configuration.root_dir, tree_mappings)
+        for output, (method_map, options_map) in tree_mappings.items():
+            sources[output] = (configuration.root_dir, tree_files[output], method_map, options_map, tree_keywords)
+            prefixes[output] = '.'
+
+        # Extract strings from third-party applications, or reuse the catalogs
+        # extracted from the same versions of them last time.
+        # The (app name, cache key) of each third-party .po file.
+        package_keys = {}
+        cached_packages = []
+        package_cache = None
+        if configuration.third_party:
+            babel_cfg = configuration.locale_dir / 'babel_third_party.cfg'
+            method_map, options_map = read_babel_mapping(babel_cfg)
+            if use_cache and not shard:
+                package_cache = PackageCache(self.source_msgs_dir.parent / THIRD_PARTY_CACHE)
+            distributions = importlib.metadata.packages_distributions()
+            cfg_digest = file_digest(babel_cfg)
+            for app_name in configuration.third_party:
+                output = app_name + ".po"
+                files_to_clean.add(self.source_msgs_dir / output)
+                key = package_key(app_name, distributions, cfg_digest)
+                package_keys[output] = (app_name, key)
+                cached = package_cache.lookup(app_name, key) if package_cache and key else None
+                if cached is not None:
+                    LOG.info('Reusing the catalog of %s', app_name)
+                    catalogs[self.source_msgs_dir / output] = cached
+                    cached_packages.append((app_name, key, cached))
+                    continue
+                # Find where the app is, without importing it.  Then extract from that directory.
+                app_root = Path(find_package_dir(app_name))
+                app_files = find_babel_files(app_root, {output: (method_map, options_map)})[output]
+                sources[output] = (app_root, app_files, method_map, options_map, babel_keywords())
+                prefixes[output] = app_name
+
+        if shard:
+            all_paths = {output: paths for output, (__, paths, *___) in sources.items()}
+            sources = {
+                output: (root_dir, [path for path in paths if in_shard(path, shard)], *rest)
+                for output, (root_dir, paths, *rest) in sources.items()
+            }
+        results = extract_babel_sources(sources, jobs=jobs, executor=executor) if sources else {}
+        for output, file_messages in results.items():
+            spec = {'prefix': prefixes[output]}
+            if shard:
+                catalogs[self.source_msgs_dir / output] = shard_output(spec, all_paths[output], file_messages)
+            else:
+                self.add_catalog(catalogs, output, spec, file_messages)
+
+        if package_cache:
+            package_cache.replace(cached_packages + [
+                (*package_keys[output], catalogs[self.source_msgs_dir / output])
+                for output in results
+                if output in package_keys and package_keys[output][1]
+            ])
+            package_cache.save()
+
+    def merge_po_files(self, catalogs):
+        """
+        Merge djangojs-partial.po into django-partial.po in `catalogs`
+        """
+        django_partial = self.source_msgs_dir.joinpath(DJANGO_PARTIAL_PO)
+        djangojs_partial = self.source_msgs_dir.joinpath(DJANGOJS_PARTIAL_PO)
         # Some projects don't have any javascript, so there is no djangojs-partial.po
-        if not file_exists(self.source_msgs_dir.joinpath()):
+        djangojs_catalog = load_catalog(catalogs, djangojs_partial)
+        if djangojs_catalog is None:
             return
 
-        execute(
-            'msgcat django-partial.po djangojs-partial.po -o django-partial.po',
-            working_directory=self.source_msgs_dir,
-            stderr=stderr,
-        )
-        remove_file(self.source_msgs_dir.joinpath(DJANGOJS_PARTIAL_PO))
+        to_merge = [(DJANGOJS_PARTIAL_PO, djangojs_catalog)]
+        django_catalog = load_catalog(catalogs, django_partial)
+        if django_catalog is not None:
+            to_merge.insert(0, (DJANGO_PARTIAL_PO, django_catalog))
+        catalogs[django_partial], conflicts = concatenate(to_merge)
+        for conflict in conflicts:
+            LOG.warning('Multiple translations found for "%s" in %s', conflict.entry.msgid, DJANGO_PARTIAL_PO)
+        del catalogs[djangojs_partial]
+        if djangojs_partial.exists():
+            remove_file(djangojs_partial)
+
+
+def parse_shard(value):
+    """
+    Parse a --shard value, I/N, into an (index, count) pair.
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(f"{value!r} is not of the form I/N") from error
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"{value!r} is not a shard: I must be between 1 and N")
+    return index, count
+
+
+def load_catalog(catalogs, path_name):
+    """
+    Returns the pofile object for `path_name` from `catalogs`, parsing it
+    first if it is still the bytes written by Babel, or reading it from the
+    file if it is not in `catalogs` at all.  The pofile object is kept in
+    `catalogs`.  Returns None if there is no such catalog.
+    """
+    catalog = catalogs.get(path_name)
+    if isinstance(catalog, bytes):
+        catalog = polib.pofile(catalog.decode('utf-8'))
+    elif catalog is None:
+        if not file_exists(path_name):
+            return None
+        catalog = polib.pofile(path_name)
+    catalogs[path_name] = catalog
+    return catalog
+
+
+def write_catalogs(catalogs):
+    """
+    Write out every catalog in `catalogs`, a dictionary mapping paths to
+    either pofile objects or the bytes of a .po file.
+    """
+    for path_name, catalog in sorted(catalogs.items()):
+        LOG.info('Writing %s', os.path.basename(path_name))
+        Path(path_name).parent.makedirs_p()
+        if isinstance(catalog, bytes):
+            with open(path_name, 'wb') as po_file:
+                po_file.write(catalog)
+        else:
+            catalog.save(path_name)
+
+
+def clean_catalog(pofile):
+    """
+    Perform header fix, metadata fix, and key string removal on a pofile object
+    """
+    # replace default headers with edX headers
+    fix_header(pofile)
+    # replace default metadata with edX metadata
+    fix_metadata(pofile)
+    # remove key strings which belong in messages.po
+    strip_key_strings(pofile)
 
 
 def clean_pofile(path_name):
@@ -247,12 +572,7 @@ def clean_pofile(path_name):
         return
     LOG.info('Cleaning %s', os.path.basename(path_name))
     profile = polib.pofile(path_name)
-    # replace default headers with edX headers
-    fix_header(profile)
-    # replace default metadata with edX metadata
-    fix_metadata(profile)
-    # remove key strings which belong in messages.po
-    strip_key_strings(profile)
+    clean_catalog(profile)
     profile.save()
 
 
@@ -327,9 +647,7 @@ def strip_key_strings(pofile):
     Removes all entries in PO which are key strings.
     These entries should appear only in messages.po, not in any other po files.
     """
-    newlist = [entry for entry in pofile if not is_key_string(entry.msgid)]
-    del pofile[:]
-    pofile += newlist
+    pofile[:] = [entry for entry in pofile if not is_key_string(entry.msgid)]
 
 
 def is_key_string(string):
@@ -0,0 +1,754 @@
+"""
+In-process extraction of translatable strings from source files.
+
+This does the work of ``django-admin makemessages`` for the django and
+djangojs domains without starting xgettext: the source tree is listed once
+for both domains, each file is parsed with Babel's Python or JavaScript
+extractor (Django templates are first turned into Python by Django's own
+``templatize``, just as makemessages does), and the messages are collected
+into polib catalogs the way xgettext would collect them.  ``extract`` uses
+makemessages instead with ``--makemessages``.  tests/test_extractors.py
+compares the two on the tree of tests/data/extraction.
+
+It also does the work of ``pybabel extract`` for Babel mapping files, for
+several mappings in a single walk of the tree.
+"""
+
+from collections import namedtuple
+from datetime import datetime, timezone
+import glob
+import hashlib
+import importlib.metadata
+import importlib.util
+import io
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import babel
+import django
+import polib
+from babel.messages.catalog import DEFAULT_HEADER, Catalog
+from babel.messages.extract import DEFAULT_KEYWORDS, check_and_call_extract_file, extract, pathmatch
+from babel.messages.frontend import parse_mapping_cfg
+from babel.messages.pofile import write_po
+from django.core.management.utils import is_ignored_path
+from django.utils.translation.template import templatize
+
+from i18n.msgfmt import FormatError, parse_python_brace_format, parse_python_format
+
+LOG = logging.getLogger(__name__)
+
+DJANGO_DOMAIN = 'django'
+DJANGOJS_DOMAIN = 'djangojs'
+
+# The extensions makemessages reads for each domain, as it is run by extract.
+DOMAIN_EXTENSIONS = {
+    DJANGO_DOMAIN: ('.html', '.txt', '.py'),
+    DJANGOJS_DOMAIN: ('.js', '.jsx'),
+}
+
+# The part of one output catalog extracted by a shard.  `spec` says how the
+# catalog is built: {'domain': domain} for a django domain, or {'prefix': prefix}
+# for a Babel output.  `total` is the number of files of the output, over all the
+# shards, and `files` is a list of (index, path, messages) for the files of this
+# shard, where `index` is the position of the file in the output.
+ShardOutput = namedtuple('ShardOutput', 'spec total files')
+
+SHARD_FILENAME = 'extract-shard-{}-of-{}.json'
+
+# Patterns makemessages always ignores.
+DEFAULT_IGNORE_PATTERNS = ['CVS', '.*', '*~', '*.pyc']
+
+# The keywords xgettext knows for each language, plus the ones makemessages adds.
+DOMAIN_KEYWORDS = {
+    DJANGO_DOMAIN: {
+        '_': None,
+        'gettext': None,
+        'ugettext': None,
+        'dgettext': (2,),
+        'dcgettext': (2,),
+        'ngettext': (1, 2),
+        'ungettext': (1, 2),
+        'dngettext': (2, 3),
+        'dcngettext': (2, 3),
+        'gettext_noop': None,
+        'gettext_lazy': None,
+        'ngettext_lazy': (1, 2),
+        'pgettext': ((1, 'c'), 2),
+        'npgettext': ((1, 'c'), 2, 3),
+        'pgettext_lazy': ((1, 'c'), 2),
+        'npgettext_lazy': ((1, 'c'), 2, 3),
+    },
+    DJANGOJS_DOMAIN: {
+        '_': None,
+        'gettext': None,
+        'dgettext': (2,),
+        'dcgettext': (2,),
+        'ngettext': (1, 2),
+        'dngettext': (2, 3),
+        'gettext_noop': None,
+        'gettext_lazy': None,
+        'ngettext_lazy': (1, 2),
+        'pgettext': ((1, 'c'), 2),
+        'npgettext': ((1, 'c'), 2, 3),
+    },
+}
+
+# A directive of the JavaScript format strings xgettext knows, and the
+# conversions it can end with.
+JAVASCRIPT_DIRECTIVE = re.compile(r'%\d*(?:\.\d+)?(.?)', re.DOTALL)
+JAVASCRIPT_CONVERSIONS = 'bcdfjosxX%'
+
+COMMENT_TAGS = ('Translators',)
+
+# The comment tags extract passes to pybabel.
+BABEL_COMMENT_TAGS = ('Translators:',)
+
+# The width pybabel wraps its output to.
+BABEL_WIDTH = 76
+
+# The header xgettext writes on a new catalog.
+XGETTEXT_HEADER = (
+    "SOME DESCRIPTIVE TITLE.\n"
+    "Copyright (C) YEAR THE PACKAGE'S COPYRIGHT HOLDER\n"
+    "This file is distributed under the same license as the PACKAGE package.\n"
+    "FIRST AUTHOR <EMAIL@ADDRESS>, YEAR.\n"
+)
+
+
+def find_source_files(root_dir, ignore_dirs=()):
+    """
+    Returns a dict mapping each domain to the sorted list of the files under
+    `root_dir` that makemessages would read for it.
+
+    The tree is walked once for all the domains.  Paths are relative to
+    `root_dir`.  As with makemessages, `locale` directories are not entered,
+    and files and directories matching the default ignore patterns or one of
+    `ignore_dirs` are skipped.
+    """
+    patterns = DEFAULT_IGNORE_PATTERNS + [f'{d}/*' for d in ignore_dirs]
+    files = {domain: [] for domain in DOMAIN_EXTENSIONS}
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        reldir = os.path.relpath(dirpath, root_dir)
+        for dirname in dirnames[:]:
+            if dirname == 'locale' or is_ignored_path(os.path.normpath(os.path.join(reldir, dirname)), patterns):
+                dirnames.remove(dirname)
+        for filename in filenames:
+            extension = os.path.splitext(filename)[1]
+            path = os.path.normpath(os.path.join(reldir, filename))
+            for domain, extensions in DOMAIN_EXTENSIONS.items():
+                if extension in extensions and not is_ignored_path(path, patterns):
+                    files[domain].append(path)
+    return {domain: sorted(paths) for domain, paths in files.items()}
+
+
+def extract_file(root_dir, path, domain):
+    """
+    Returns the messages found for `domain` in the source file `path`.
+
+    Each message is a list: ``[lineno, msgctxt, msgid, msgid_plural, comments]``,
+    with `msgctxt` and `msgid_plural` None when the message has none.  Plain
+    lists are used so that the result can be stored as JSON.
+    """
+    filename = os.path.join(root_dir, path)
+    try:
+        if domain == DJANGO_DOMAIN and not path.endswith('.py'):
+            with open(filename, encoding='utf-8') as source:
+                python = templatize(source.read(), origin=path)
+            # The template's indentation survives in the Python templatize
+            # writes, and Python's tokenizer (unlike xgettext) refuses it when
+            # it is inconsistent.  Every call and comment is on a single line,
+            # so the indentation can go without changing what is found.
+            python = '\n'.join(line.lstrip() for line in python.split('\n'))
+            fileobj = io.BytesIO(python.encode('utf-8'))
+            method = 'python'
+        else:
+            with open(filename, 'rb') as source:
+                fileobj = io.BytesIO(source.read())
+            method = 'python' if domain == DJANGO_DOMAIN else 'javascript'
+        found = list(extract(method, fileobj, DOMAIN_KEYWORDS[domain], COMMENT_TAGS, {'encoding': 'utf-8'}))
+    except UnicodeDecodeError as error:
+        LOG.warning("UnicodeDecodeError: skipped file %s (reason: %s)", path, error)
+        return []
+
+    messages = []
+    for lineno, message, comments, context in found:
+        if isinstance(message, tuple):
+            msgid, msgid_plural = message[0], message[1]
+        else:
+            msgid, msgid_plural = message, None
+        messages.append([lineno, context, msgid, msgid_plural, comments])
+    return messages
+
+
+def _extract_file_task(task):
+    """
+    Unpack a (root_dir, path, domain) task for a worker process.
+    """
+    return extract_file(*task)
+
+
+def extract_sources(root_dir, files, jobs=1, cache=None, executor=None):
+    """
+    Extract the messages from `files`, as returned by `find_source_files`.
+
+    With more than one job, the files are parsed in a pool of `jobs` worker
+    processes, `executor` if given.  If an `ExtractionCache` is given, only the files whose
+    contents changed since it was saved are parsed, and the cache is then
+    updated to hold exactly the files in `files`.
+
+    Returns a dict mapping each domain to a list of ``(path, messages)``
+    pairs, in the same order as `files`.
+    """
+    tasks = [(root_dir, path, domain) for domain, paths in files.items() for path in paths]
+    found = [None] * len(tasks)
+    digests = [None] * len(tasks)
+    if cache is not None:
+        for i, (__, path, domain) in enumerate(tasks):
+            digests[i] = file_digest(os.path.join(root_dir, path))
+            found[i] = cache.lookup(domain, path, digests[i])
+    todo = [i for i, messages in enumerate(found) if messages is None]
+    if cache is not None:
+        LOG.info("Extracting %s of %s source files, the rest are unchanged", len(todo), len(tasks))
+
+    for i, messages in zip(todo, map_tasks(_extract_file_task, [tasks[i] for i in todo], jobs, executor)):
+        found[i] = messages
+
+    results = {domain: [] for domain in files}
+    for (__, path, domain), messages in zip(tasks, found):
+        results[domain].append((path, messages))
+    if cache is not None:
+        cache.replace(
+            (domain, path, digest, messages)
+            for (__, path, domain), digest, messages in zip(tasks, digests, found)
+        )
+        cache.save()
+    return results
+
+
+def map_tasks(func, tasks, jobs=1, executor=None):
+    """
+    Returns the list of `func(task)` for each of `tasks`.
+
+    With more than one job, the calls are made in a pool of `jobs` worker
+    processes, so `func` and the tasks have to be picklable.  The pool is
+    `executor` if given, as made by `worker_pool`, or one made for the call.
+    """
+    if len(tasks) <= 1 or (jobs <= 1 and executor is None):
+        return [func(task) for task in tasks]
+    chunksize = max(1, len(tasks) // (max(jobs, 1) * 4))
+    if executor is not None:
+        return list(executor.map(func, tasks, chunksize=chunksize))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(func, tasks, chunksize=chunksize))
+
+
+def worker_pool(jobs):
+    """
+    Returns a pool of `jobs` worker processes to share between several
+    calls to `map_tasks`, or None for a single job.
+
+    The workers are all started here, so that they are forked from the
+    calling thread, and not from threads running at the same time.
+    """
+    if jobs <= 1:
+        return None
+    executor = ProcessPoolExecutor(max_workers=jobs)
+    # Forking start methods start all the workers with the first task.
+    executor.submit(int).result()
+    return executor
+
+
+def file_digest(filename):
+    """
+    Returns the hex SHA-256 digest of the contents of `filename`.
+    """
+    with open(filename, 'rb') as source:
+        return hashlib.sha256(source.read()).hexdigest()
+
+
+class ExtractionCache:
+    """
+    A persistent record of the messages extracted from each source file.
+
+    Entries are keyed by domain and path, and are only used while the file's
+    content hash is unchanged.  The whole cache is discarded when the
+    extractor, Babel or Django changes, since any of them can change what is
+    extracted from the same file.
+    """
+
+    # Bump this when a change to this module changes the extracted messages.
+    VERSION = 2
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.files = read_stamped_json(filename, self.stamp(), 'files') or {}
+
+    @classmethod
+    def stamp(cls):
+        """
+        Identifies the code whose output the cache holds.
+        """
+        return [cls.VERSION, babel.__version__, django.__version__]
+
+    def lookup(self, domain, path, digest):
+        """
+        Returns the messages cached for `path` in `domain`, or None if there
+        are none for a file with this `digest`.
+        """
+        entry = self.files.get(domain, {}).get(path)
+        if entry is not None and entry[0] == digest:
+            return entry[1]
+        return None
+
+    def replace(self, entries):
+        """
+        Replace the contents of the cache with `entries`, an iterable of
+        (domain, path, digest, messages) tuples.  Files not in `entries` are
+        forgotten.
+        """
+        self.files = {}
+        for domain, path, digest, messages in entries:
+            self.files.setdefault(domain, {})[path] = [digest, messages]
+
+    def save(self):
+        """
+        Write the cache to its file.
+        """
+        write_stamped_json(self.filename, self.stamp(), 'files', self.files)
+
+
+class PackageCache:
+    """
+    A persistent record of the catalogs extracted from installed packages.
+
+    Each catalog is only used while its key is unchanged: the key names the
+    distributions providing the package with their versions, and the content
+    hash of the Babel mapping used.  The whole cache is discarded when the
+    extractor or Babel changes.
+    """
+
+    # Bump this when a change to this module changes the extracted messages.
+    VERSION = 1
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.packages = read_stamped_json(filename, self.stamp(), 'packages') or {}
+
+    @classmethod
+    def stamp(cls):
+        """
+        Identifies the code whose output the cache holds.
+        """
+        return [cls.VERSION, babel.__version__]
+
+    def lookup(self, name, key):
+        """
+        Returns the bytes of the catalog cached for package `name`, or None if
+        there is none under this `key`.
+        """
+        entry = self.packages.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1].encode('utf-8')
+        return None
+
+    def replace(self, entries):
+        """
+        Replace the contents of the cache with `entries`, an iterable of
+        (name, key, catalog) tuples, where `catalog` is the bytes of the .po
+        file.  Packages not in `entries` are forgotten.
+        """
+        self.packages = {name: [key, catalog.decode('utf-8')] for name, key, catalog in entries}
+
+    def save(self):
+        """
+        Write the cache to its file.
+        """
+        write_stamped_json(self.filename, self.stamp(), 'packages', self.packages)
+
+
+def read_stamped_json(filename, stamp, field):
+    """
+    Returns `field` of the JSON object in `filename`, or None if the file
+    can't be read, or was not written with this `stamp`.
+    """
+    try:
+        with open(filename, encoding='utf-8') as stream:
+            data = json.load(stream)
+    except (OSError, ValueError):
+        return None
+    if data.get('stamp') != stamp:
+        return None
+    return data.get(field)
+
+
+def write_stamped_json(filename, stamp, field, value):
+    """
+    Atomically write a JSON object holding `stamp` and `value` as `field` to
+    `filename`.
+    """
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, 'w', encoding='utf-8') as stream:
+        json.dump({'stamp': stamp, field: value}, stream, separators=(',', ':'))
+    os.replace(temp_filename, filename)
+
+
+def python_format_directives(text):
+    """
+    Does `text` have Python format directives?  None if it isn't a valid
+    Python format string.
+    """
+    try:
+        parse_python_format(text)
+    except FormatError:
+        return None
+    return '%' in text
+
+
+def python_brace_format_directives(text):
+    """
+    Does `text` have Python brace format directives?  None if it isn't a
+    valid Python brace format string.
+    """
+    try:
+        return bool(parse_python_brace_format(text))
+    except FormatError:
+        return None
+
+
+def javascript_format_directives(text):
+    """
+    Does `text` have JavaScript format directives?  None if it isn't a valid
+    JavaScript format string.
+    """
+    conversions = JAVASCRIPT_DIRECTIVE.findall(text)
+    if any(not conversion or conversion not in JAVASCRIPT_CONVERSIONS for conversion in conversions):
+        return None
+    return bool(conversions)
+
+
+# The formats of the language xgettext reads each domain as, in the order it
+# writes their flags, with the function telling whether a string has their
+# directives.
+DOMAIN_FORMATS = {
+    DJANGO_DOMAIN: (
+        ('python-format', python_format_directives),
+        ('python-brace-format', python_brace_format_directives),
+    ),
+    DJANGOJS_DOMAIN: (
+        ('javascript-format', javascript_format_directives),
+    ),
+}
+
+
+def build_catalog(file_messages, domain):
+    """
+    Returns a polib POFile holding the messages in `file_messages`, a list of
+    ``(path, messages)`` pairs as produced by `extract_sources`.
+
+    Messages are keyed by (msgctxt, msgid) and kept in the order they are
+    first seen, with their occurrences and extracted comments accumulated,
+    as xgettext does.
+    """
+    pofile = polib.POFile()
+    pofile.header = XGETTEXT_HEADER
+    pofile.metadata_is_fuzzy = ['fuzzy']
+    pofile.metadata = {
+        'Project-Id-Version': 'PACKAGE VERSION',
+        'Report-Msgid-Bugs-To': '',
+        'POT-Creation-Date': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M%z'),
+        'PO-Revision-Date': 'YEAR-MO-DA HO:MI+ZONE',
+        'Last-Translator': 'FULL NAME <EMAIL@ADDRESS>',
+        'Language-Team': 'LANGUAGE <LL@li.org>',
+        'Language': '',
+        'MIME-Version': '1.0',
+        'Content-Type': 'text/plain; charset=UTF-8',
+        'Content-Transfer-Encoding': '8bit',
+        'Plural-Forms': 'nplurals=2; plural=(n != 1);',
+    }
+
+    entries = {}
+    for path, messages in file_messages:
+        for lineno, msgctxt, msgid, msgid_plural, comments in messages:
+            entry = entries.get((msgctxt, msgid))
+            if entry is None:
+                entry = entries[(msgctxt, msgid)] = polib.POEntry(msgid=msgid, msgctxt=msgctxt)
+                pofile.append(entry)
+            occurrence = (path, str(lineno))
+            if occurrence not in entry.occurrences:
+                entry.occurrences.append(occurrence)
+            if msgid_plural and not entry.msgid_plural:
+                entry.msgid_plural = msgid_plural
+                entry.msgstr_plural = {0: '', 1: ''}
+            extracted = entry.comment.split('\n') if entry.comment else []
+            for comment in comments:
+                if comment not in extracted:
+                    extracted.append(comment)
+            entry.comment = '\n'.join(extracted)
+    for entry in pofile:
+        entry.flags = format_flags(domain, entry.msgid, entry.msgid_plural)
+    return pofile
+
+
+def format_flags(domain, msgid, msgid_plural=None):
+    """
+    Returns the format flags xgettext gives a message of `domain`.
+
+    Like xgettext, a message is flagged with each format of the language of
+    its domain that its msgid and msgid_plural are valid strings of, if
+    they have a directive: strings without one aren't marked, so that their
+    translations can have a percent sign or a brace.
+    """
+    flags = []
+    for flag, directives in DOMAIN_FORMATS[domain]:
+        found = [directives(text) for text in (msgid, msgid_plural) if text]
+        if None not in found and any(found):
+            flags.append(flag)
+    return flags
+
+
+def read_babel_mapping(filename):
+    """
+    Returns the (method_map, options_map) pair read from a Babel mapping file.
+    """
+    with open(filename, encoding='utf-8') as stream:
+        return parse_mapping_cfg(stream, filename=filename)
+
+
+def babel_keywords(*extra):
+    """
+    Returns Babel's default keywords, plus the functions named in `extra`.
+    """
+    keywords = dict(DEFAULT_KEYWORDS)
+    keywords.update((name, None) for name in extra)
+    return keywords
+
+
+def find_babel_files(root_dir, mappings):
+    """
+    Walk `root_dir` once, finding the files each of several Babel mappings
+    extracts from.
+
+    `mappings` maps names to (method_map, options_map) pairs.  Returns a dict
+    mapping the same names to lists of paths relative to `root_dir`, in the
+    order ``pybabel extract`` would visit them: sorted, with the files in a
+    directory before its subdirectories.  As with pybabel, directories whose
+    names start with '.' or '_' are skipped, and a directory matching an
+    ``ignore`` pattern of a mapping is skipped for that mapping.
+    """
+    files = {name: [] for name in mappings}
+    all_names = frozenset(mappings)
+    # For each directory still to visit, the mappings that ignore it.
+    ignored_by = {'.': frozenset()}
+    for dirpath, dirnames, filenames in os.walk(root_dir):
+        reldir = os.path.relpath(dirpath, root_dir).replace(os.sep, '/')
+        dir_ignored_by = ignored_by.pop(reldir)
+        for dirname in list(dirnames):
+            reldirname = dirname if reldir == '.' else f'{reldir}/{dirname}'
+            if dirname.startswith(('.', '_')):
+                skip = all_names
+            else:
+                skip = dir_ignored_by | {
+                    name for name, (method_map, __) in mappings.items()
+                    if any(method == 'ignore' and pathmatch(pattern, reldirname) for pattern, method in method_map)
+                }
+            if skip == all_names:
+                dirnames.remove(dirname)
+            else:
+                ignored_by[reldirname] = skip
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = filename if reldir == '.' else f'{reldir}/{filename}'
+            for name, (method_map, __) in mappings.items():
+                if name in dir_ignored_by:
+                    continue
+                method = next((method for pattern, method in method_map if pathmatch(pattern, path)), None)
+                if method not in (None, 'ignore'):
+                    files[name].append(path)
+    return files
+
+
+def extract_babel_file(root_dir, path, method_map, options_map, keywords):
+    """
+    Returns the messages Babel extracts from the file `path` under `root_dir`
+    with the given mapping, as a list of (lineno, context, message, comments)
+    tuples.
+    """
+    root_dir = os.path.abspath(root_dir)
+    return [
+        (lineno, context, message, comments)
+        for __, lineno, message, comments, context in check_and_call_extract_file(
+            os.path.join(root_dir, path).replace(os.sep, '/'),
+            method_map,
+            options_map,
+            None,
+            keywords,
+            BABEL_COMMENT_TAGS,
+            False,
+            dirpath=root_dir,
+        )
+    ]
+
+
+def _extract_babel_file_task(task):
+    """
+    Unpack a task for `extract_babel_file` for a worker process.
+    """
+    return extract_babel_file(*task)
+
+
+def extract_babel_sources(sources, jobs=1, executor=None):
+    """
+    Extract the messages for several Babel outputs in one pool of `jobs`
+    workers, `executor` if given.
+
+    `sources` maps output names to (root_dir, paths, method_map, options_map,
+    keywords) tuples.  Returns a dict mapping the same names to lists of
+    ``(path, messages)`` pairs.
+    """
+    tasks = [
+        (name, (root_dir, path, method_map, options_map, keywords))
+        for name, (root_dir, paths, method_map, options_map, keywords) in sources.items()
+        for path in paths
+    ]
+    found = map_tasks(_extract_babel_file_task, [task for __, task in tasks], jobs, executor)
+    results = {name: [] for name in sources}
+    for (name, (__, path, *___)), messages in zip(tasks, found):
+        results[name].append((path, messages))
+    return results
+
+
+def build_babel_catalog(file_messages, prefix='.'):
+    """
+    Returns the contents of the .po file ``pybabel extract`` writes for
+    `file_messages`, a list of ``(path, messages)`` pairs as produced by
+    `extract_babel_sources`.  Occurrences are named `prefix`/path, like the
+    input directory given to pybabel.
+    """
+    catalog = Catalog(charset='utf-8', header_comment=DEFAULT_HEADER)
+    for path, messages in file_messages:
+        filepath = os.path.normpath(os.path.join(prefix, path))
+        for lineno, context, message, comments in messages:
+            if isinstance(message, list):
+                message = tuple(message)
+            catalog.add(message, None, [(filepath, lineno)], auto_comments=comments, context=context)
+    output = io.BytesIO()
+    write_po(output, catalog, width=BABEL_WIDTH)
+    return output.getvalue()
+
+
+def find_package_dir(name):
+    """
+    Returns the directory `dirname(module.__file__)` would give for the module
+    or package `name`, without importing it, so that none of its import-time
+    code runs.  (Finding a dotted name still imports its parent packages.)
+    """
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    if not spec.has_location:
+        raise ImportError(f"Module {name!r} is not in a directory", name=name)
+    return os.path.dirname(spec.origin)
+
+
+def package_key(name, distributions, *extra):
+    """
+    Returns the key under which the catalog of the package `name` can be
+    cached, or None if it can't be cached.
+
+    The key lists the installed distributions providing the top-level package
+    of `name`, with their versions, followed by `extra`.  `distributions` maps
+    top-level packages to distribution names, as returned by
+    `importlib.metadata.packages_distributions`.  A package from no
+    distribution, or from a distribution installed in editable mode, can't be
+    cached: its files can change without its version changing.
+    """
+    dist_names = distributions.get(name.partition('.')[0])
+    if not dist_names:
+        return None
+    key = []
+    for dist_name in sorted(set(dist_names)):
+        dist = importlib.metadata.distribution(dist_name)
+        direct_url = dist.read_text('direct_url.json')
+        if direct_url and json.loads(direct_url).get('dir_info', {}).get('editable'):
+            return None
+        key.append([dist_name, dist.version])
+    key.extend(extra)
+    return key
+
+
+def in_shard(path, shard):
+    """
+    Returns whether the file `path` belongs to `shard`, an (index, count)
+    pair with index counted from 1.  Files are spread over the shards by a
+    hash of their path, which is the same on every machine.
+    """
+    index, count = shard
+    digest = hashlib.sha1(path.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % count == index - 1
+
+
+def shard_output(spec, paths, file_messages):
+    """
+    Returns the `ShardOutput` for `file_messages`, the ``(path, messages)``
+    pairs extracted by a shard for an output made of all the files in `paths`.
+    """
+    positions = {path: index for index, path in enumerate(paths)}
+    return ShardOutput(spec, len(paths), [[positions[path], path, messages] for path, messages in file_messages])
+
+
+def write_shard(directory, shard, outputs):
+    """
+    Write the `ShardOutput` for each output name in `outputs` to the file for
+    `shard` in `directory`.  Returns the name of the file.
+    """
+    filename = os.path.join(directory, SHARD_FILENAME.format(*shard))
+    write_stamped_json(filename, ExtractionCache.stamp(), 'shard', {
+        'index': shard[0],
+        'count': shard[1],
+        'outputs': {name: output._asdict() for name, output in outputs.items()},
+    })
+    return filename
+
+
+def read_shards(directory):
+    """
+    Read all the shard files in `directory`, and combine them.
+
+    Returns a dict mapping output names to (spec, file_messages) pairs, where
+    `file_messages` is the list of ``(path, messages)`` pairs for all the
+    files of the output, in the order a single extraction would have them.
+    Raises ValueError unless the shards are exactly the shards of one
+    extraction, made by this version of the extractor.
+    """
+    filenames = sorted(glob.glob(os.path.join(directory, SHARD_FILENAME.format('*', '*'))))
+    if not filenames:
+        raise ValueError(f"I18N: No extraction shards found in {directory}")
+    shards = {}
+    for filename in filenames:
+        shard = read_stamped_json(filename, ExtractionCache.stamp(), 'shard')
+        if shard is None:
+            raise ValueError(f"I18N: {filename} is not a shard of this version of the extractor")
+        shards[shard['index']] = shard
+    counts = {shard['count'] for shard in shards.values()}
+    if len(counts) != 1 or set(shards) != set(range(1, len(filenames) + 1)) or len(shards) != counts.pop():
+        raise ValueError(f"I18N: The shards in {directory} are not all the shards of one extraction")
+
+    combined = {}
+    for __, shard in sorted(shards.items()):
+        for name, output in shard['outputs'].items():
+            spec, total, files = combined.setdefault(name, (output['spec'], output['total'], []))
+            if (spec, total) != (output['spec'], output['total']):
+                raise ValueError(f"I18N: The shards in {directory} disagree about {name}")
+            files.extend(output['files'])
+
+    results = {}
+    for name, (spec, total, files) in combined.items():
+        files.sort(key=lambda file: file[0])
+        if [index for index, __, __ in files] != list(range(total)):
+            raise ValueError(f"I18N: The shards in {directory} do not hold all the files of {name}")
+        results[name] = (spec, [(path, messages) for __, path, messages in files])
+    return results
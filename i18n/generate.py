@@ -13,24 +13,36 @@ languages to generate.
 
 """
 import codecs
+import filecmp
 import logging
 import os
 import re
+import shutil
 import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 
 from path import Path as path
 from polib import pofile
 
 from i18n import Runner
-from i18n.execute import execute
-from i18n.extract import DJANGO_PARTIAL_PO, DJANGO_PO
+from i18n.concat import HEADER_MARKER, concatenate
+from i18n.extract import DJANGO_PARTIAL_PO, DJANGO_PO, DJANGOJS_PO
+from i18n.extractors import DJANGOJS_DOMAIN, file_digest
+from i18n.jscatalog import write_js_catalogs
+from i18n.manifest import BuildManifest
+from i18n.mofile import write_mofile
+from i18n.streaming import concatenate_files, rewrite_catalog
 
 LOG = logging.getLogger(__name__)
-DEVNULL = open(os.devnull, "wb")        # pylint: disable=consider-using-with
 DUPLICATE_ENTRY_PATTERN = re.compile('#-#-#-#-#.*#-#-#-#-#')
+LANG_MAP_MODES = ('copy', 'hardlink', 'symlink')
 
 
-def merge(configuration, locale, target=DJANGO_PO, sources=(DJANGO_PARTIAL_PO,), fail_if_missing=True):
+def merge(
+    configuration, locale, target=DJANGO_PO, sources=(DJANGO_PARTIAL_PO,), fail_if_missing=True, *,
+    normalize=False, streaming=False, manifest=None,
+):
     """
     For the given locale, merge the `sources` files to become the `target`
     file.  Note that the target file might also be one of the sources.
@@ -41,31 +53,64 @@ def merge(configuration, locale, target=DJANGO_PO, sources=(DJANGO_PARTIAL_PO,),
     If fail_if_missing is false, and the files to be merged are missing,
     just return silently.
 
+    Each source is read once and cleaned in memory, as `clean_pofile` does,
+    and only the target is written, if its contents changed.  With
+    `normalize`, the cleaned sources are written back too.
+
+    With `streaming`, the sources are read and the target is written a chunk
+    of entries at a time, keeping the merge state on disk, so that memory use
+    doesn't grow with the size of the catalogs.  The files written are the
+    same.
+
+    With a `manifest`, the target isn't merged again while it is unchanged,
+    and its sources are the same as when it was last merged.
+
     """
     LOG.info('Merging %s locale %s', target, locale)
     locale_directory = configuration.get_messages_dir(locale)
     valid_sources = []
     for filename in sources:
-        try:
-            validate_file(locale_directory, filename)
-            valid_sources.append(filename)
-        except (ValueError, IOError):
+        pathname = locale_directory.joinpath(filename)
+        if not pathname.exists():
             if fail_if_missing:
-                raise
+                raise ValueError(f"I18N: Cannot generate because file not found: {pathname}")
+            continue
+        valid_sources.append((filename, pathname))
     if not valid_sources:
         return
 
-    # merged file is merged.po
-    merge_cmd = 'msgcat -o merged.po ' + ' '.join(valid_sources)
-    execute(merge_cmd, working_directory=locale_directory)
-
-    # clean up redunancies in the metadata
-    merged_filename = locale_directory.joinpath('merged.po')
-    duplicate_entries = clean_pofile(merged_filename)
-
-    # rename merged.po -> django.po (default)
     target_filename = locale_directory.joinpath(target)
-    os.rename(merged_filename, target_filename)
+    if manifest is not None:
+        # The manifest checks the digest of the target itself, which the merge changes when it's a source.
+        key = ['merge', list(sources), [
+            [filename, file_digest(pathname)] for filename, pathname in valid_sources if pathname != target_filename
+        ]]
+        if manifest.is_current(target_filename, key):
+            LOG.info('%s is up to date', target_filename)
+            return
+    if streaming:
+        if normalize:
+            for __, pathname in valid_sources:
+                rewrite_catalog(pathname, clean_catalog)
+        conflicts = concatenate_files(valid_sources, target_filename, clean=clean_catalog)
+    else:
+        catalogs = []
+        for filename, pathname in valid_sources:
+            source = pofile(pathname)
+            clean_catalog(source)
+            if normalize:
+                source.save()
+            catalogs.append((filename, source))
+        merged, conflicts = concatenate(catalogs)
+        contents = str(merged)
+        if not target_filename.exists() or target_filename.read_text(encoding=merged.encoding) != contents:
+            with open(target_filename, 'w', encoding=merged.encoding) as target_file:
+                target_file.write(contents)
+
+    duplicate_entries = []
+    for entry, translations in conflicts:
+        duplicate_entries.append((duplicate_message(entry), duplicate_translations(translations)))
+        check_duplicate_msgid(entry)
 
     # Write duplicate messages to a file
     if duplicate_entries:
@@ -76,18 +121,191 @@ def merge(configuration, locale, target=DJANGO_PO, sources=(DJANGO_PARTIAL_PO,),
                 dfile.write(f"Translations found were:\n\t{translations}\n\n")
         LOG.warning(" %s duplicates in %s, details in .dup file", len(duplicate_entries), target_filename)
 
+    if manifest is not None:
+        manifest.record(target_filename, key)
 
-def merge_files(configuration, locale, fail_if_missing=True):
+
+def merge_files(configuration, locale, fail_if_missing=True, **options):
     """
-    Merge all the files in `locale`, as specified in config.yaml.
+    Merge all the files in `locale`, as specified in config.yaml, with the
+    `options` of `merge`.
     """
     for target, sources in configuration.generate_merge.items():
-        merge(configuration, locale, target, sources, fail_if_missing)
+        merge(configuration, locale, target, sources, fail_if_missing, **options)
+
+
+def compile_locale(configuration, locale, manifest, keep_untranslated=False):
+    """
+    Compile the merged .po files of `locale`, the targets of the
+    `generate_merge` configuration, into .mo files.
+
+    A .mo file is only written when `manifest` doesn't show it already
+    compiled from the same .po file contents, with the same options.  Returns
+    the list of .mo files written, all recorded in `manifest`.
+    """
+    locale_directory = configuration.get_messages_dir(locale)
+    written = []
+    for target in configuration.generate_merge:
+        po_filename = locale_directory.joinpath(target)
+        if not po_filename.exists():
+            continue
+        mo_filename = po_filename.stripext() + '.mo'
+        key = [file_digest(po_filename), keep_untranslated]
+        if manifest.is_current(mo_filename, key):
+            LOG.info('%s is up to date', mo_filename)
+            continue
+        LOG.info('Compiling %s', po_filename)
+        write_mofile(pofile(po_filename), mo_filename, keep_untranslated)
+        manifest.record(mo_filename, key)
+        written.append(mo_filename)
+    return written
+
+
+def write_locale_js_catalogs(configuration, locale, directory, manifest):
+    """
+    Write the JavaScript and JSON catalogs of the merged djangojs.po file of
+    `locale` into the `locale` subdirectory of `directory`, unless `manifest`
+    shows them written from the same file contents.  Returns the list of
+    files written.
+    """
+    po_filename = configuration.get_messages_dir(locale).joinpath(DJANGOJS_PO)
+    if not po_filename.exists():
+        return []
+    locale_directory = path(directory).joinpath(locale)
+    filenames = [locale_directory / f'{DJANGOJS_DOMAIN}.js', locale_directory / f'{DJANGOJS_DOMAIN}.json']
+    key = ['js-catalog', file_digest(po_filename)]
+    if all(manifest.is_current(filename, key) for filename in filenames):
+        LOG.info('JavaScript catalogs of %s are up to date', po_filename)
+        return []
+    LOG.info('Writing JavaScript catalogs of %s', po_filename)
+    written = write_js_catalogs(pofile(po_filename), locale_directory, DJANGOJS_DOMAIN)
+    for filename in written:
+        manifest.record(filename, key)
+    return written
+
+
+def generate_locales(
+    configuration, locales, manifest, *, jobs=1, keep_untranslated=False, merge_options=None, js_catalogs=None,
+):
+    """
+    Merge and compile the files of several locales, in a pool of `jobs`
+    worker processes when there is more than one job.
+
+    `locales` is a list of (locale, fail_if_missing_list) pairs: the files of
+    the locale are merged once for each item in the list, in order, with the
+    `merge_options` of `merge`, then compiled with `compile_locale`, and its
+    JavaScript catalogs are written under the `js_catalogs` directory, if
+    given, with `write_locale_js_catalogs`.  A locale failing doesn't stop
+    the others.  Each worker's log messages are logged here once its locale
+    is done, in the order of `locales`, and the files it merged and compiled
+    are recorded in `manifest`.
+
+    Returns a list of (locale, error) pairs, the formatted traceback of the
+    error that stopped each locale that failed.
+    """
+    options = {
+        'keep_untranslated': keep_untranslated,
+        'merge_options': merge_options or {},
+        'js_catalogs': js_catalogs,
+    }
+    failures = []
+    if jobs <= 1 or len(locales) <= 1:
+        for locale, fail_if_missing_list in locales:
+            try:
+                _generate_locale(configuration, locale, fail_if_missing_list, manifest, **options)
+            except Exception:  # pylint: disable=broad-except
+                failures.append((locale, traceback.format_exc()))
+        return failures
+
+    level = logging.getLogger().getEffectiveLevel()
+    tasks = [
+        (configuration, locale, fail_if_missing_list, manifest, options, level)
+        for locale, fail_if_missing_list in locales
+    ]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for (__, locale, *___), (records, outputs, error) in zip(tasks, executor.map(_generate_locale_task, tasks)):
+            for record in records:
+                logging.getLogger(record.name).handle(record)
+            manifest.outputs.update(outputs)
+            if error:
+                failures.append((locale, error))
+    return failures
+
+
+def _generate_locale(
+    configuration, locale, fail_if_missing_list, manifest, *, keep_untranslated, merge_options, js_catalogs,
+):
+    """
+    Merge the files of a locale once for each item of `fail_if_missing_list`,
+    then compile them and write its JavaScript catalogs, skipping the files
+    `manifest` shows up to date.
+    """
+    for fail_if_missing in fail_if_missing_list:
+        merge_files(configuration, locale, fail_if_missing, manifest=manifest, **merge_options)
+    compile_locale(configuration, locale, manifest, keep_untranslated)
+    if js_catalogs:
+        write_locale_js_catalogs(configuration, locale, js_catalogs, manifest)
+
+
+class _RecordCollector(logging.Handler):
+    """
+    A logging handler keeping the records it gets, ready to be pickled.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+def _generate_locale_task(task):
+    """
+    Merge and compile the files of a locale in a worker process.
+
+    Returns the log records made meanwhile, the manifest records of the
+    files written, and the formatted traceback of the error that stopped the
+    locale, if any.
+    """
+    configuration, locale, fail_if_missing_list, manifest, options, level = task
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers, root.level
+    collector = _RecordCollector()
+    root.handlers = [collector]
+    root.setLevel(level)
+    error = None
+    try:
+        _generate_locale(configuration, locale, fail_if_missing_list, manifest, **options)
+    except Exception:  # pylint: disable=broad-except
+        error = traceback.format_exc()
+    finally:
+        root.handlers = saved_handlers
+        root.setLevel(saved_level)
+    return collector.records, manifest.updates(), error
 
 
 def clean_pofile(pofile_path):
     """
-    Clean various aspect of a .po file.
+    Clean various aspect of a .po file, as `clean_catalog` does, and save it.
+
+    Returns a list of any duplicate entries found.
+    """
+    # Reading in the .po file and saving it again fixes redundancies.
+    pomsgs = pofile(pofile_path)
+    duplicate_entries = clean_catalog(pomsgs)
+    pomsgs.save()
+    return duplicate_entries
+
+
+def clean_catalog(pomsgs):
+    """
+    Clean various aspect of a pofile object.
 
     Fixes:
 
@@ -96,10 +314,11 @@ def clean_pofile(pofile_path):
         - Removes occurrence line numbers so that the generated files don't
           generate a lot of line noise when they're committed.
 
+        - Resolves the merge conflicts marked up by msgcat, picking the
+          first translation.
+
     Returns a list of any duplicate entries found.
     """
-    # Reading in the .po file and saving it again fixes redundancies.
-    pomsgs = pofile(pofile_path)
     # The msgcat tool marks the metadata as fuzzy, but it's ok as it is.
     pomsgs.metadata_is_fuzzy = False
     duplicate_entries = []
@@ -112,11 +331,7 @@ def clean_pofile(pofile_path):
             # Remove fuzzy from flags
             entry.flags = [f for f in entry.flags if f != 'fuzzy']
             # Save a warning message
-            occurrences = [f for (f, __) in entry.occurrences]
-            dup_msg = (f'Multiple translations found for single string.\n\t'
-                       f'String "{entry.msgid}"\n\tPresent in files {occurrences}'
-                       )
-            duplicate_entries.append((dup_msg, entry.msgstr))
+            duplicate_entries.append((duplicate_message(entry), entry.msgstr))
 
             # Pick the first entry
             for msgstr in DUPLICATE_ENTRY_PATTERN.split(entry.msgstr):
@@ -125,20 +340,50 @@ def clean_pofile(pofile_path):
                     # Set the first one we find to be the right one. Strip to remove extraneous
                     # new lines that exist.
                     entry.msgstr = msgstr.strip()
-
-                    # Raise error if there's new lines starting or ending the id string.
-                    if entry.msgid.startswith('\n') or entry.msgid.endswith('\n'):
-                        raise ValueError(
-                            f'{entry.msgid} starts or ends with a new line character, which is not allowed. '
-                            'Please fix before continuing. Source string is found in {entry.occurrences}'
-                            .encode('utf-8')
-                        )
+                    check_duplicate_msgid(entry)
                     break
 
-    pomsgs.save()
     return duplicate_entries
 
 
+def duplicate_message(entry):
+    """
+    Returns the warning about `entry` having several translations.
+    """
+    occurrences = [f for (f, __) in entry.occurrences]
+    return (f'Multiple translations found for single string.\n\t'
+            f'String "{entry.msgid}"\n\tPresent in files {occurrences}'
+            )
+
+
+def duplicate_translations(translations):
+    """
+    Returns the translations of a `Conflict`, marked up as msgcat does.
+    """
+    lines = []
+    for id_, text in translations:
+        lines.append(HEADER_MARKER.format(id_))
+        if isinstance(text, dict):
+            lines.extend(text[index] for index in sorted(text))
+        else:
+            lines.append(text)
+    return '\n'.join(lines)
+
+
+def check_duplicate_msgid(entry):
+    """
+    Raise an error if the msgid of `entry`, found with several translations,
+    starts or ends with a new line.
+    """
+    # Raise error if there's new lines starting or ending the id string.
+    if entry.msgid.startswith('\n') or entry.msgid.endswith('\n'):
+        raise ValueError(
+            f'{entry.msgid} starts or ends with a new line character, which is not allowed. '
+            'Please fix before continuing. Source string is found in {entry.occurrences}'
+            .encode('utf-8')
+        )
+
+
 def validate_file(directory, filename):
     """
     Asserts that the given files exist.
@@ -153,6 +398,78 @@ def validate_file(directory, filename):
     clean_pofile(pathname)
 
 
+def map_locale(source_dirname, dest_dirname, mode='copy'):
+    """
+    Make the directory `dest_dirname` hold the files of `source_dirname`,
+    as copies, hard links or relative symbolic links, depending on `mode`:
+    one of `LANG_MAP_MODES`.
+
+    Only the files not already mapped this way are written, and the files
+    not in the source are removed.  Where a link can't be made, the file is
+    copied instead.
+
+    Returns the number of files written or removed.
+    """
+    source_dirname, dest_dirname = path(source_dirname), path(dest_dirname)
+    if dest_dirname.islink() or os.path.isfile(dest_dirname):
+        dest_dirname.remove()
+    dest_dirname.makedirs_p()
+    changed = 0
+    linking = mode != 'copy'
+    mapped = set()
+    for source in sorted(source_dirname.walkfiles()):
+        dest = dest_dirname / source.relpath(source_dirname)
+        mapped.add(dest)
+        if _is_mapped(source, dest, mode):
+            continue
+        dest.parent.makedirs_p()
+        temp = dest + '.tmp'
+        if linking:
+            try:
+                if mode == 'hardlink':
+                    os.link(source, temp)
+                else:
+                    os.symlink(source.relpath(dest.parent), temp)
+            except OSError as error:
+                LOG.warning("Can't link %s, copying the files of %s instead: %s", dest, source_dirname, error)
+                path(temp).remove_p()
+                linking = False
+            else:
+                os.replace(temp, dest)
+                changed += 1
+                continue
+        if _is_mapped(source, dest, 'copy'):
+            continue
+        shutil.copy2(source, temp)
+        os.replace(temp, dest)
+        changed += 1
+
+    for dirpath, dirnames, filenames in os.walk(dest_dirname, topdown=False):
+        dirpath = path(dirpath)
+        for filename in filenames:
+            if dirpath / filename not in mapped:
+                (dirpath / filename).remove()
+                changed += 1
+        for dirname in dirnames:
+            if not os.path.isdir(source_dirname / (dirpath / dirname).relpath(dest_dirname)):
+                path.rmtree_p(dirpath / dirname)
+    return changed
+
+
+def _is_mapped(source, dest, mode):
+    """
+    Returns whether `dest` is already the mapping of the file `source` in
+    `mode`.
+    """
+    if mode == 'symlink':
+        return dest.islink() and os.readlink(dest) == source.relpath(dest.parent)
+    if dest.islink() or not os.path.isfile(dest):
+        return False
+    if mode == 'hardlink':
+        return os.path.samefile(source, dest)
+    return not os.path.samefile(source, dest) and filecmp.cmp(source, dest, shallow=False)
+
+
 class Generate(Runner):
     """Generate merged and compiled message files."""
 
@@ -161,6 +478,49 @@ class Generate(Runner):
         self.parser.add_argument("--strict", action='store_true', help="Complain about missing files.")
         self.parser.add_argument("--ltr", action='store_true', help="Only generate for LTR languages.")
         self.parser.add_argument("--rtl", action='store_true', help="Only generate for RTL languages.")
+        self.parser.add_argument(
+            "--jobs", "-j",
+            type=int,
+            default=1,
+            help="Merge and compile the files of up to JOBS locales at the same time, in separate processes.",
+        )
+        self.parser.add_argument(
+            "--keep-untranslated",
+            action='store_true',
+            help="Also compile untranslated messages, with empty translations, into the .mo files.",
+        )
+        self.parser.add_argument(
+            "--normalize",
+            action='store_true',
+            help="Also write back the merged source files, cleaned.",
+        )
+        self.parser.add_argument(
+            "--streaming",
+            action='store_true',
+            help="Merge the files a chunk at a time, to use less memory with very large files.",
+        )
+        self.parser.add_argument(
+            "--js-catalogs",
+            metavar='DIR',
+            help=(
+                "Also write the static JavaScript and JSON catalogs of the merged djangojs.po files, "
+                "into DIR/<locale>/djangojs.js and DIR/<locale>/djangojs.json."
+            ),
+        )
+        self.parser.add_argument(
+            "--force",
+            action='store_true',
+            help="Merge and compile all the files, even those whose sources haven't changed since the last time.",
+        )
+        self.parser.add_argument(
+            "--lang-map-mode",
+            choices=LANG_MAP_MODES,
+            default='copy',
+            help=(
+                "How to make the locales of edx_lang_map: copies, hard links, or relative symbolic links "
+                "to the files of the locales they map (default: copy)."
+            ),
+        )
 
     def run(self, args):
         """
@@ -176,30 +536,39 @@ class Generate(Runner):
         else:
             langs = configuration.translated_locales
 
+        # For each locale, the fail_if_missing value of each of its merges.
+        locales = {}
         for locale in langs:
-            merge_files(configuration, locale, fail_if_missing=args.strict)
+            locales.setdefault(locale, []).append(args.strict)
         # Dummy text is not required. Don't raise exception if files are missing.
         for locale in configuration.dummy_locales:
-            merge_files(configuration, locale, fail_if_missing=False)
+            locales.setdefault(locale, []).append(False)
         # Merge the source locale, so we have the canonical .po files.
         if configuration.source_locale not in langs:
-            merge_files(configuration, configuration.source_locale, fail_if_missing=args.strict)
-
-        compile_cmd = f'django-admin compilemessages -v{args.verbose}'
-        if args.verbose:
-            stderr = None
-        else:
-            stderr = DEVNULL
-        execute(compile_cmd, working_directory=configuration.root_dir, stderr=stderr)
+            locales.setdefault(configuration.source_locale, []).append(args.strict)
+
+        manifest = BuildManifest(configuration.locale_dir, force=args.force)
+        failures = generate_locales(
+            configuration, list(locales.items()), manifest,
+            jobs=max(args.jobs, 1), keep_untranslated=args.keep_untranslated,
+            merge_options={'normalize': args.normalize, 'streaming': args.streaming},
+            js_catalogs=args.js_catalogs,
+        )
+        manifest.save()
+        if failures:
+            for locale, error in failures:
+                LOG.error("Generating locale %s failed:\n%s", locale, error)
+            failed = ", ".join(locale for locale, __ in failures)
+            LOG.error("Generating failed for %s locale(s): %s", len(failures), failed)
+            return 1
 
         # Check for any mapped languages and copy directories around accordingly
         for source_locale, dest_locale in configuration.edx_lang_map.items():
             source_dirname = configuration.get_messages_dir(source_locale)
             dest_dirname = configuration.get_messages_dir(dest_locale)
-            LOG.info("Copying mapped locale %s to %s", source_dirname, dest_dirname)
-
-            path.rmtree_p(path(dest_dirname))
-            path.copytree(path(source_dirname), path(dest_dirname))
+            LOG.info("Mapping locale %s to %s (%s)", source_dirname, dest_dirname, args.lang_map_mode)
+            map_locale(source_dirname, dest_dirname, args.lang_map_mode)
+        return 0
 
 
 main = Generate()
@@ -0,0 +1,102 @@
+"""
+Write static JavaScript translation catalogs from .po catalogs.
+
+The catalogs are those Django's ``JavaScriptCatalog`` and ``JSONCatalog`` views
+build from the compiled djangojs domain on each request: the JavaScript one is
+rendered from Django's own template, with whitespace and comments removed, so
+that it defines the same ``django.gettext`` functions.  As there are no Django
+settings here, the catalogs hold no ``formats``, and ``get_format`` returns
+the name of the format asked for.
+"""
+
+import json
+import os
+import re
+
+from django.template import Context, Engine
+
+try:
+    from django.views.i18n import builtin_template_path
+    js_catalog_template = None
+except ImportError:
+    # Django 4.2 keeps the template in a string.
+    from django.views.i18n import js_catalog_template
+
+from i18n.mofile import mofile_messages
+
+NPLURALS_PATTERN = re.compile(r'nplurals\s*=\s*(\d+)')
+
+
+def js_catalog(pofile):
+    """
+    Returns the catalog of the translated messages of `pofile`, the way
+    ``JavaScriptCatalog`` does, and the plural expression of its
+    Plural-Forms metadata, or None if it has none.
+    """
+    plural_forms = pofile.metadata.get('Plural-Forms')
+    plural = None
+    num_plurals = 2
+    if plural_forms:
+        plural = [
+            el.strip()
+            for el in plural_forms.split(";")
+            if el.strip().startswith("plural=")
+        ][0].split("=", 1)[1]
+        match = NPLURALS_PATTERN.search(plural_forms)
+        if match:
+            num_plurals = int(match.group(1))
+
+    encoding = pofile.encoding or 'utf-8'
+    catalog = {}
+    for key, value in mofile_messages(pofile):
+        if not key:
+            continue
+        key, value = key.decode(encoding), value.decode(encoding)
+        if '\x00' in key:
+            forms = value.split('\x00')
+            catalog[key.split('\x00')[0]] = [forms[i] if i < len(forms) else '' for i in range(num_plurals)]
+        else:
+            catalog[key] = value
+    return catalog, plural
+
+
+def render_js_catalog(catalog, plural):
+    """
+    Returns the minified JavaScript source defining `catalog` and the
+    `plural` expression, the way the ``JavaScriptCatalog`` view does.
+    """
+    if js_catalog_template is not None:
+        template_source = js_catalog_template
+    else:
+        with builtin_template_path("i18n_catalog.js").open(encoding="utf-8") as template_file:
+            template_source = template_file.read()
+    source = Engine().from_string(template_source).render(Context({
+        'catalog_str': json.dumps(catalog, sort_keys=True, separators=(',', ':')) if catalog else None,
+        'formats_str': '{}',
+        'plural': plural,
+    }))
+    lines = (line.strip() for line in source.splitlines())
+    return '\n'.join(
+        line for line in lines if line and not (line.startswith('/*') and line.endswith('*/'))
+    ) + '\n'
+
+
+def write_js_catalogs(pofile, directory, domain):
+    """
+    Write the JavaScript and JSON catalogs of `pofile` into `directory`, as
+    `domain`.js and `domain`.json.  Returns the filenames written.
+    """
+    catalog, plural = js_catalog(pofile)
+    os.makedirs(directory, exist_ok=True)
+    js_filename = os.path.join(directory, f'{domain}.js')
+    json_filename = os.path.join(directory, f'{domain}.json')
+    outputs = (
+        (js_filename, render_js_catalog(catalog, plural)),
+        (json_filename, json.dumps({'catalog': catalog, 'formats': {}, 'plural': plural}, separators=(',', ':'))),
+    )
+    for filename, text in outputs:
+        temp_filename = f"{filename}.tmp"
+        with open(temp_filename, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+        os.replace(temp_filename, filename)
+    return [js_filename, json_filename]
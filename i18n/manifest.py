@@ -0,0 +1,84 @@
+"""
+A record of the files built by the i18n tools, to skip rebuilding them.
+"""
+
+import polib
+from path import Path
+
+import i18n
+from i18n.extractors import file_digest, read_stamped_json, write_stamped_json
+
+MANIFEST_FILENAME = '.build-manifest.json'
+
+
+class BuildManifest:
+    """
+    A persistent record of the output files built in a directory.
+
+    Each output is recorded with a key, identifying what it was built from
+    and how, and the content hash of the output itself.  An output is up to
+    date while it is unchanged and would be built under the same key.  Keys
+    are lists of JSON values.
+
+    With `force`, no output is up to date, but the outputs built are still
+    recorded.  The whole manifest is discarded when i18n-tools or polib
+    changes, since either can change what is built from the same inputs.
+    """
+
+    # Bump this when a change to the tools changes what they build, without a new release.
+    VERSION = 2
+
+    def __init__(self, directory, force=False):
+        self.directory = Path(directory)
+        self.filename = self.directory / MANIFEST_FILENAME
+        self.force = force
+        self.outputs = read_stamped_json(self.filename, self.stamp(), 'outputs') or {}
+        # The names of the outputs recorded since the manifest was read.
+        self.recorded = set()
+
+    @classmethod
+    def stamp(cls):
+        """
+        Identifies the code whose outputs the manifest records.
+        """
+        return [cls.VERSION, i18n.__version__, polib.__version__]
+
+    def name(self, output):
+        """
+        Returns the name `output` is recorded under.
+        """
+        return str(Path(output).relpath(self.directory))
+
+    def is_current(self, output, key):
+        """
+        Returns whether the file `output` was built under `key`, and is
+        unchanged since.
+        """
+        record = self.outputs.get(self.name(output))
+        if self.force or record is None or record[0] != key:
+            return False
+        try:
+            return file_digest(output) == record[1]
+        except OSError:
+            return False
+
+    def record(self, output, key):
+        """
+        Record that the file `output` has just been built under `key`.
+        """
+        name = self.name(output)
+        self.outputs[name] = [key, file_digest(output)]
+        self.recorded.add(name)
+
+    def updates(self):
+        """
+        Returns the records of the outputs recorded since the manifest was
+        read, to add to another copy of it.
+        """
+        return {name: self.outputs[name] for name in self.recorded}
+
+    def save(self):
+        """
+        Write the manifest to its file.
+        """
+        write_stamped_json(self.filename, self.stamp(), 'outputs', self.outputs)
@@ -0,0 +1,141 @@
+"""
+Compile .po catalogs into the binary .mo format, in this process.
+
+The output follows GNU gettext's format, as read by Python's `gettext` module
+and by GNU gettext itself.  As msgfmt does, obsolete and fuzzy messages are
+left out, and so are untranslated ones unless asked otherwise; the header
+entry is always written.
+"""
+
+import os
+import struct
+
+MO_MAGIC = 0x950412de
+
+# The size of the header: seven 32-bit unsigned integers.
+HEADER_SIZE = 7 * 4
+
+
+def mofile_messages(pofile, keep_untranslated=False):
+    """
+    Returns the messages to compile from `pofile`, a sorted list of
+    (key, translation) pairs of bytes, as stored in a .mo file.
+    """
+    encoding = pofile.encoding or 'utf-8'
+    header = pofile.metadata_as_entry()
+    messages = [(b'', header.msgstr.encode(encoding))]
+    for entry in pofile:
+        if entry.obsolete or 'fuzzy' in entry.flags:
+            continue
+        key = entry.msgid
+        if entry.msgctxt is not None:
+            key = entry.msgctxt + '\x04' + key
+        if entry.msgid_plural:
+            key += '\x00' + entry.msgid_plural
+            forms = [entry.msgstr_plural[index] for index in sorted(entry.msgstr_plural)]
+            text = '\x00'.join(forms)
+            translated = bool(forms and forms[0])
+        else:
+            text = entry.msgstr
+            translated = bool(text)
+        if translated or keep_untranslated:
+            messages.append((key.encode(encoding), text.encode(encoding)))
+    messages.sort()
+    return messages
+
+
+def hash_string(string):
+    """
+    Returns the hash of `string`, bytes, up to its first NUL byte, computed
+    as GNU gettext does to look messages up in the hash table of .mo files.
+    """
+    value = 0
+    for byte in string.partition(b'\x00')[0]:
+        value = ((value << 4) + byte) & 0xffffffff
+        high = value & 0xf0000000
+        if high:
+            value ^= high >> 24
+            value ^= high
+    return value
+
+
+def next_prime(number):
+    """
+    Returns the smallest odd prime number at least `number`.
+    """
+    candidate = max(number, 3) | 1
+    while any(candidate % divisor == 0 for divisor in range(3, int(candidate ** 0.5) + 1, 2)):
+        candidate += 2
+    return candidate
+
+
+def hash_table(keys):
+    """
+    Returns the GNU hash table of `keys`, a list of its slots: each holds 0
+    when empty, or the index of a key plus one.
+
+    The table is about twice as large as the number of keys, for few
+    collisions (msgfmt makes it a third larger).
+    """
+    size = next_prime(len(keys) * 2)
+    table = [0] * size
+    for index, key in enumerate(keys):
+        value = hash_string(key)
+        slot = value % size
+        if table[slot]:
+            increment = 1 + value % (size - 2)
+            while table[slot]:
+                if slot >= size - increment:
+                    slot -= size - increment
+                else:
+                    slot += increment
+        table[slot] = index + 1
+    return table
+
+
+def mofile_bytes(messages):
+    """
+    Returns the contents of a .mo file holding `messages`, a sorted list of
+    (key, translation) pairs of bytes.
+
+    The file has a hash table of the keys, and identical translations are
+    only stored once.
+    """
+    count = len(messages)
+    keys_index = HEADER_SIZE
+    values_index = keys_index + 8 * count
+    table = hash_table([key for key, __ in messages])
+    hash_index = values_index + 8 * count
+    strings_start = hash_index + 4 * len(table)
+
+    strings = bytearray()
+    index = []
+    offsets = {}
+    for key, __ in messages:
+        index.append((len(key), strings_start + len(strings)))
+        strings += key + b'\x00'
+    for __, value in messages:
+        offset = offsets.get(value)
+        if offset is None:
+            offset = offsets[value] = strings_start + len(strings)
+            strings += value + b'\x00'
+        index.append((len(value), offset))
+
+    output = bytearray(struct.pack(
+        '<7I', MO_MAGIC, 0, count, keys_index, values_index, len(table), hash_index,
+    ))
+    output += struct.pack(f'<{2 * len(index)}I', *(number for entry in index for number in entry))
+    output += struct.pack(f'<{len(table)}I', *table)
+    output += strings
+    return bytes(output)
+
+
+def write_mofile(pofile, filename, keep_untranslated=False):
+    """
+    Atomically compile `pofile` into the .mo file `filename`.
+    """
+    data = mofile_bytes(mofile_messages(pofile, keep_untranslated))
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, 'wb') as stream:
+        stream.write(data)
+    os.replace(temp_filename, filename)
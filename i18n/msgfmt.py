@@ -0,0 +1,571 @@
+"""
+Check .po catalogs the way GNU ``msgfmt -c`` does, in this process.
+
+These are the checks of msgfmt the catalogs depend on: the header entry, the
+plural forms, the format strings of the messages flagged c-format,
+python-format or python-brace-format, and the new lines at the beginning and
+end of the messages.  Like msgfmt, only the messages it would compile are
+checked: not the obsolete, fuzzy or untranslated ones.
+
+The problems are described with the words of msgfmt, those it only warns
+about beginning with "warning: " as they do in its output, and returned the
+way `i18n.validate.check_messages` returns them: a list of tuples, each a
+description, a msgid, and zero or more translations.
+
+`i18n.validate` runs msgfmt itself instead with --msgfmt.
+tests/test_msgfmt.py compares these checks with the output of msgfmt for
+the catalogs in tests/data/msgfmt, recorded by
+scripts/record_msgfmt_output.py.
+"""
+
+import gettext
+import re
+
+# The fields of the header, and their initial default value, if they have one.
+HEADER_FIELDS = (
+    ('Project-Id-Version', 'PACKAGE VERSION'),
+    ('PO-Revision-Date', 'YEAR-MO-DA HO:MI+ZONE'),
+    ('Last-Translator', 'FULL NAME <EMAIL@ADDRESS>'),
+    ('Language-Team', 'LANGUAGE <LL@li.org>'),
+    ('MIME-Version', None),
+    ('Content-Type', 'text/plain; charset=CHARSET'),
+    ('Content-Transfer-Encoding', 'ENCODING'),
+    ('Language', ''),
+)
+
+# How msgfmt begins the problems it only warns about.
+WARNING = "warning: "
+
+# The encodings that msgfmt considers portable.
+PORTABLE_CHARSETS = frozenset(name.upper() for name in (
+    'ASCII', 'ANSI_X3.4-1968', 'US-ASCII', 'ISO-8859-1', 'ISO-8859-2', 'ISO-8859-3', 'ISO-8859-4',
+    'ISO-8859-5', 'ISO-8859-6', 'ISO-8859-7', 'ISO-8859-8', 'ISO-8859-9', 'ISO-8859-13', 'ISO-8859-14',
+    'ISO-8859-15', 'KOI8-R', 'KOI8-U', 'KOI8-T', 'CP850', 'CP866', 'CP874', 'CP932', 'CP949', 'CP950',
+    'CP1250', 'CP1251', 'CP1252', 'CP1253', 'CP1254', 'CP1255', 'CP1256', 'CP1257', 'GB2312', 'EUC-JP',
+    'EUC-KR', 'EUC-TW', 'BIG5', 'BIG5-HKSCS', 'GBK', 'GB18030', 'SHIFT_JIS', 'JOHAB', 'TIS-620', 'VISCII',
+    'GEORGIAN-PS', 'UTF-8',
+))
+
+CHARSET_PATTERN = re.compile(r'charset=([^\s;]*)')
+
+# The values of n the plural expression is evaluated for, as msgfmt does.
+PLURAL_RANGE = range(1001)
+
+# A plural form used for this many of those values is used for many numbers,
+# and its format strings are checked as strictly as those of singular messages.
+OFTEN = 5
+
+NO_PLURAL_FORMS = (
+    'message catalog has plural form translations, but lacks a header entry with '
+    '"Plural-Forms: nplurals=INTEGER; plural=EXPRESSION;"'
+)
+
+
+class FormatError(ValueError):
+    """
+    A string isn't a valid format string.  The message is the reason why.
+    """
+
+
+def check_catalog(pofile):
+    """
+    Check `pofile` the way ``msgfmt -c`` does.
+
+    Returns the problems, a list of tuples: each a description, a msgid,
+    and zero or more translations.
+    """
+    problems = check_header(pofile)
+    entries = compiled_entries(pofile)
+    plural_problems, often = check_plural_forms(pofile, entries)
+    problems.extend(plural_problems)
+
+    seen = set()
+    for entry in pofile:
+        if not entry.obsolete:
+            if (entry.msgctxt, entry.msgid) in seen:
+                problems.append(("duplicate message definition", entry.msgid))
+            seen.add((entry.msgctxt, entry.msgid))
+
+    for entry in entries:
+        source = entry.msgid + " | " + entry.msgid_plural if entry.msgid_plural else entry.msgid
+        problems.extend((description, source, translation) for description, translation in check_newlines(entry))
+        problems.extend((description, source, translation) for description, translation in check_formats(entry, often))
+    return problems
+
+
+def compiled_entries(pofile):
+    """
+    Returns the entries of `pofile` msgfmt would compile, but the header.
+    """
+    entries = []
+    for entry in pofile:
+        if entry.obsolete or not entry.msgid or 'fuzzy' in entry.flags:
+            continue
+        if entry.msgid_plural:
+            translated = bool(entry.msgstr_plural and entry.msgstr_plural[min(entry.msgstr_plural)])
+        else:
+            translated = bool(entry.msgstr)
+        if translated:
+            entries.append(entry)
+    return entries
+
+
+def translations(entry):
+    """
+    Returns the (name, translation) pairs of `entry`, named as msgfmt does:
+    msgstr, or msgstr[0], msgstr[1], etc.
+    """
+    if entry.msgid_plural:
+        return [(f'msgstr[{index}]', entry.msgstr_plural[index]) for index in sorted(entry.msgstr_plural)]
+    return [('msgstr', entry.msgstr)]
+
+
+def check_header(pofile):
+    """
+    Check the fields of the header entry of `pofile`, and its charset.
+    """
+    metadata = pofile.metadata
+    if not metadata:
+        # Without a header, only ASCII messages can be read.
+        if any(not entry.msgid.isascii() or not entry.msgstr.isascii() for entry in pofile):
+            return [("PO file header missing or invalid", "")]
+        return []
+
+    # Like msgfmt, look the fields up in the text of the header, where
+    # "Language" is also found in "Language-Team".
+    header = ''.join(f'{field}: {value}\n' for field, value in metadata.items())
+    problems = []
+    initial = []
+    for field, default in HEADER_FIELDS:
+        index = header.find(field)
+        if index < 0:
+            problems.append((f"{WARNING}header field '{field}' missing in header", ""))
+        elif index and header[index - 1] != '\n':
+            problems.append((f"{WARNING}header field '{field}' should start at beginning of line", ""))
+        elif default is not None and header.startswith(f': {default}\n', index + len(field)):
+            initial.append(field)
+            if len(initial) > 1:
+                # msgfmt stops looking at the fields there.
+                break
+    if len(initial) > 1:
+        problems.append((f"{WARNING}some header fields still have the initial default value", ""))
+    elif initial:
+        problems.append((f"{WARNING}header field '{initial[0]}' still has the initial default value", ""))
+
+    match = CHARSET_PATTERN.search(metadata.get('Content-Type', ''))
+    if match and match.group(1) == 'CHARSET':
+        problems.append((
+            f"{WARNING}Charset missing in header. Message conversion to user's charset will not work.", "",
+        ))
+    elif match and match.group(1).upper() not in PORTABLE_CHARSETS:
+        problems.append((
+            f'{WARNING}Charset "{match.group(1)}" is not a portable encoding name. '
+            "Message conversion to user's charset might not work.",
+            "",
+        ))
+    return problems
+
+
+def check_plural_forms(pofile, entries):
+    """
+    Check the Plural-Forms of the header of `pofile`, and the number of plural
+    forms of the plural ones among `entries`.
+
+    Returns the problems, and for each plural form, whether it is used for
+    many numbers, or None if that isn't known.
+    """
+    plural_forms = pofile.metadata.get('Plural-Forms', '')
+    plural_entries = [entry for entry in entries if entry.msgid_plural]
+    nplurals_index = plural_forms.find('nplurals=')
+    # "nplurals=" doesn't hold "plural=".
+    plural_index = plural_forms.find('plural=')
+    if nplurals_index < 0 or plural_index < 0:
+        if plural_entries:
+            return [(NO_PLURAL_FORMS, plural_entries[0].msgid)], None
+        return [], None
+
+    nplurals = re.match(r'\s*(\d+)', plural_forms[nplurals_index + len('nplurals='):])
+    if not nplurals:
+        return [("invalid nplurals value", "")], None
+    nplurals = int(nplurals.group(1))
+    expression = plural_forms[plural_index + len('plural='):].split(';')[0]
+    try:
+        plural = gettext.c2py(expression)
+    except (ValueError, SyntaxError, RecursionError):
+        return [("invalid plural expression", "")], None
+
+    counts = [0] * nplurals
+    try:
+        for number in PLURAL_RANGE:
+            value = plural(number)
+            if value < 0:
+                return [("plural expression can produce negative values", "")], None
+            if value >= nplurals:
+                # msgfmt reports the first value out of range.
+                return [(
+                    f"nplurals = {nplurals} but plural expression can produce values as large as {value}", "",
+                )], None
+            counts[value] += 1
+    except ZeroDivisionError:
+        return [("plural expression can produce division by zero", "")], None
+
+    # Like msgfmt, report the message with the fewest plural forms if it has
+    # too few, or else the one with the most if it has too many.
+    problems = []
+    fewest = min(plural_entries, key=lambda entry: len(entry.msgstr_plural), default=None)
+    most = max(plural_entries, key=lambda entry: len(entry.msgstr_plural), default=None)
+    if fewest and len(fewest.msgstr_plural) < nplurals:
+        problems.append(_plural_forms_count(nplurals, fewest, "only "))
+    elif most and len(most.msgstr_plural) > nplurals:
+        problems.append(_plural_forms_count(nplurals, most, ""))
+    return problems, [count >= OFTEN for count in counts]
+
+
+def _plural_forms_count(nplurals, entry, only):
+    """
+    Returns the problem of the plural `entry` not having `nplurals` forms.
+    """
+    forms = len(entry.msgstr_plural)
+    forms = f"{only}one plural form" if forms == 1 else f"{only}{forms} plural forms"
+    return (f"nplurals = {nplurals} but some messages have {forms}", entry.msgid + " | " + entry.msgid_plural)
+
+
+def check_newlines(entry):
+    """
+    Check that the msgid and translations of `entry` all begin with a new line
+    or none do, and the same for their end.
+
+    Returns a list of (description, translation) pairs.
+    """
+    problems = []
+    for position, has_newline in (('begin', str.startswith), ('end', str.endswith)):
+        expected = has_newline(entry.msgid, '\n')
+        if entry.msgid_plural and has_newline(entry.msgid_plural, '\n') != expected:
+            problems.append((
+                f"'msgid' and 'msgid_plural' entries do not both {position} with '\\n'", entry.msgid_plural,
+            ))
+        for name, translation in translations(entry):
+            if has_newline(translation, '\n') != expected:
+                problems.append((f"'msgid' and '{name}' entries do not both {position} with '\\n'", translation))
+    return problems
+
+
+def check_formats(entry, often=None):
+    """
+    Check the format strings of the translations of `entry` against its
+    msgid, for each format it is flagged with.  `often` tells which plural
+    forms are used for many numbers, as `check_plural_forms` returns it.
+
+    Returns a list of (description, translation) pairs.
+    """
+    problems = []
+    named = translations(entry)
+    for kind, (language, parse, compare) in FORMATS.items():
+        if kind not in entry.flags and f'possible-{kind}' not in entry.flags:
+            continue
+        try:
+            msgid_spec = parse(entry.msgid_plural or entry.msgid)
+        except FormatError:
+            # msgfmt only checks the translations of valid format strings.
+            continue
+        for index, (name, translation) in enumerate(named):
+            # Plural forms used for a few numbers may leave out the number.
+            strict = not entry.msgid_plural or len(named) == 1 or bool(
+                often and index < len(often) and often[index]
+            )
+            try:
+                spec = parse(translation)
+            except FormatError as error:
+                problems.append((
+                    f"'{name}' is not a valid {language} format string, unlike 'msgid'. Reason: {error}",
+                    translation,
+                ))
+                continue
+            problem = compare(msgid_spec, spec, strict, name)
+            if problem:
+                problems.append((problem, translation))
+    return problems
+
+
+def _unterminated():
+    return FormatError("The string ends in the middle of a directive.")
+
+
+def _invalid_conversion(number, char):
+    return FormatError(f"In the directive number {number}, the character '{char}' is not a valid conversion specifier.")
+
+
+def _skip(string, index, chars):
+    """
+    Returns the index of the first character of `string` from `index` on not in `chars`.
+    """
+    while index < len(string) and string[index] in chars:
+        index += 1
+    return index
+
+
+# The size modifiers, and the standard ones of their synonyms.
+C_SIZES = {'hh': 'hh', 'h': 'h', 'll': 'll', 'l': 'l', 'L': 'L', 'q': 'll', 'j': 'j', 'z': 'z', 'Z': 'z', 't': 't'}
+
+C_CONVERSIONS = {
+    'd': 'int', 'i': 'int', 'o': 'unsigned', 'u': 'unsigned', 'x': 'unsigned', 'X': 'unsigned',
+    'e': 'double', 'E': 'double', 'f': 'double', 'F': 'double', 'g': 'double', 'G': 'double',
+    'a': 'double', 'A': 'double', 'c': 'char', 's': 'string', 'p': 'pointer', 'n': 'count',
+}
+
+MIXED_C_ARGUMENTS = (
+    "The string refers to arguments both through absolute argument numbers "
+    "and through unnumbered argument specifications."
+)
+
+
+def parse_c_format(string):
+    """
+    Returns the types of the arguments of the C format `string`, in order.
+    """
+    numbered = []
+    unnumbered = []
+    number = 0
+    index = string.find('%')
+    while index >= 0:
+        index += 1
+        if string[index:index + 1] == '%':
+            index = string.find('%', index + 1)
+            continue
+        number += 1
+        position = re.match(r'(\d+)\$', string[index:])
+        if position:
+            if int(position.group(1)) == 0:
+                raise FormatError(f"In the directive number {number}, the argument number 0 is not a positive integer.")
+            index += position.end()
+        arguments = []
+        index = _skip(string, index, "-+ #0'I")
+        for __ in range(2):
+            # The width, then the precision.
+            if string[index:index + 1] == '*':
+                width = re.match(r'(\d+)\$', string[index + 1:])
+                arguments.append((int(width.group(1)) if width else None, ('int', '')))
+                index += 1 + (width.end() if width else 0)
+            else:
+                index = _skip(string, index, '0123456789')
+            if string[index:index + 1] != '.':
+                break
+            index += 1
+        size = next((size for size in C_SIZES if string.startswith(size, index)), '')
+        index += len(size)
+        if index >= len(string):
+            raise _unterminated()
+        if string[index] not in C_CONVERSIONS:
+            raise _invalid_conversion(number, string[index])
+        conversion = C_CONVERSIONS[string[index]]
+        size = C_SIZES.get(size, '')
+        if (conversion == 'double' and size != 'L') or conversion == 'pointer':
+            size = ''
+        arguments.append((int(position.group(1)) if position else None, (conversion, size)))
+        for argument_number, argument_type in arguments:
+            if (argument_number is None) != (position is None):
+                raise FormatError(MIXED_C_ARGUMENTS)
+            if argument_number is None:
+                unnumbered.append(argument_type)
+            else:
+                numbered.append((argument_number, argument_type))
+        index = string.find('%', index + 1)
+
+    if numbered and unnumbered:
+        raise FormatError(MIXED_C_ARGUMENTS)
+    return _numbered_types(numbered) if numbered else unnumbered
+
+
+def _numbered_types(numbered):
+    """
+    Returns the types of the (number, type) arguments `numbered`, in the
+    order of their numbers, which have to be all the numbers from 1.
+    """
+    types = {}
+    for argument_number, argument_type in sorted(numbered):
+        if types.setdefault(argument_number, argument_type) != argument_type:
+            raise FormatError(f"The string refers to argument number {argument_number} in incompatible ways.")
+    for expected, argument_number in enumerate(sorted(types), 1):
+        if argument_number != expected:
+            raise FormatError(
+                f"The string refers to argument number {argument_number} but ignores argument number {expected}."
+            )
+    return [types[argument_number] for argument_number in sorted(types)]
+
+
+def compare_c_format(msgid_spec, spec, strict, name):
+    """
+    Returns the problem with the C format `spec` of the translation `name`,
+    against `msgid_spec`, or None.
+    """
+    if len(msgid_spec) != len(spec) if strict else len(msgid_spec) < len(spec):
+        return f"number of format specifications in 'msgid' and '{name}' does not match"
+    for number, (expected, found) in enumerate(zip(msgid_spec, spec), 1):
+        if expected != found:
+            return f"format specifications in 'msgid' and '{name}' for argument {number} are not the same"
+    return None
+
+
+PYTHON_CONVERSIONS = {
+    's': 'any', 'r': 'any', 'a': 'any', 'c': 'character',
+    'i': 'integer', 'd': 'integer', 'u': 'integer', 'o': 'integer', 'x': 'integer', 'X': 'integer',
+    'e': 'float', 'E': 'float', 'f': 'float', 'F': 'float', 'g': 'float', 'G': 'float',
+}
+
+MIXED_PYTHON_ARGUMENTS = (
+    "The string refers to arguments both through argument names and through unnamed argument specifications."
+)
+
+
+def parse_python_format(string):
+    """
+    Returns the types of the named arguments of the Python format `string`,
+    a dictionary, and those of its unnamed ones, a list.
+    """
+    named = {}
+    unnamed = []
+    number = 0
+    index = string.find('%')
+    while index >= 0:
+        index += 1
+        number += 1
+        name = None
+        if string[index:index + 1] == '(':
+            depth = 0
+            start = index = index + 1
+            while index < len(string) and not (string[index] == ')' and depth == 0):
+                depth += {'(': 1, ')': -1}.get(string[index], 0)
+                index += 1
+            if index >= len(string):
+                raise _unterminated()
+            name = string[start:index]
+            index += 1
+        index = _skip(string, index, '-+ #0')
+        for __ in range(2):
+            # The width, then the precision.
+            if string[index:index + 1] == '*':
+                if name is not None:
+                    raise FormatError(MIXED_PYTHON_ARGUMENTS)
+                unnamed.append('integer')
+                index += 1
+            else:
+                index = _skip(string, index, '0123456789')
+            if string[index:index + 1] != '.':
+                break
+            index += 1
+        if string[index:index + 1] in ('h', 'l', 'L'):
+            index += 1
+        if index >= len(string):
+            raise _unterminated()
+        char = string[index]
+        if char == '%':
+            conversion = None
+        elif char in PYTHON_CONVERSIONS:
+            conversion = PYTHON_CONVERSIONS[char]
+        else:
+            raise _invalid_conversion(number, char)
+        if name is not None:
+            if named.setdefault(name, conversion) != conversion:
+                raise FormatError(f"The string refers to the argument named '{name}' in incompatible ways.")
+        elif conversion is not None:
+            unnamed.append(conversion)
+        index = string.find('%', index + 1)
+
+    if named and unnamed:
+        raise FormatError(MIXED_PYTHON_ARGUMENTS)
+    return named, unnamed
+
+
+def _same_python_type(expected, found, strict):
+    return expected == found or (not strict and 'any' in (expected, found))
+
+
+def compare_python_format(msgid_spec, spec, strict, name):
+    """
+    Returns the problem with the Python format `spec` of the translation
+    `name`, against `msgid_spec`, or None.
+    """
+    (msgid_named, msgid_unnamed), (named, unnamed) = msgid_spec, spec
+    if msgid_named and unnamed:
+        return f"format specifications in 'msgid' expect a mapping, those in '{name}' expect a tuple"
+    if msgid_unnamed and named:
+        return f"format specifications in 'msgid' expect a tuple, those in '{name}' expect a mapping"
+    for argument in sorted(set(msgid_named) | set(named)):
+        if argument not in named:
+            if strict:
+                return f"a format specification for argument '{argument}' doesn't exist in '{name}'"
+        elif argument not in msgid_named:
+            return f"a format specification for argument '{argument}', as in '{name}', doesn't exist in 'msgid'"
+        elif not _same_python_type(msgid_named[argument], named[argument], strict):
+            return f"format specifications in 'msgid' and '{name}' for argument '{argument}' are not the same"
+    if msgid_unnamed or unnamed:
+        if len(msgid_unnamed) != len(unnamed):
+            return f"number of format specifications in 'msgid' and '{name}' does not match"
+        for number, (expected, found) in enumerate(zip(msgid_unnamed, unnamed), 1):
+            if not _same_python_type(expected, found, strict):
+                return f"format specifications in 'msgid' and '{name}' for argument {number} are not the same"
+    return None
+
+
+BRACE_FIELD_PATTERN = re.compile(r'([A-Za-z_]\w*|\d+)((?:\.[A-Za-z_]\w*|\[[^\]]+\])*)(![rsa])?')
+
+
+def parse_python_brace_format(string, index=0, names=None, toplevel=True):
+    """
+    Returns the set of the names of the arguments of the Python brace format
+    `string`.
+    """
+    names = set() if names is None else names
+    while index < len(string):
+        char = string[index]
+        if char == '{' and toplevel and string[index + 1:index + 2] == '{':
+            index += 2
+        elif char == '}' and toplevel:
+            if string[index + 1:index + 2] != '}':
+                raise FormatError(f"The string contains a lone '}}' after directive number {len(names)}.")
+            index += 2
+        elif char == '}':
+            return names, index
+        elif char == '{':
+            field = BRACE_FIELD_PATTERN.match(string, index + 1)
+            if not field:
+                raise FormatError(
+                    f"In the directive number {len(names) + 1}, '{{' is not followed by an argument name."
+                )
+            names.add(field.group(1))
+            index = field.end()
+            if string[index:index + 1] == ':':
+                if not toplevel:
+                    raise FormatError("The string contains format directives nested too deeply.")
+                __, index = parse_python_brace_format(string, index + 1, names, toplevel=False)
+            if string[index:index + 1] != '}':
+                raise FormatError(f"In the directive number {len(names)}, there is an unterminated format directive.")
+            index += 1
+        else:
+            index += 1
+    if not toplevel:
+        raise FormatError(f"In the directive number {len(names)}, there is an unterminated format directive.")
+    return names
+
+
+def compare_python_brace_format(msgid_spec, spec, strict, name):
+    """
+    Returns the problem with the Python brace format `spec` of the
+    translation `name`, against `msgid_spec`, or None.
+    """
+    for argument in sorted(msgid_spec | spec):
+        if argument not in spec:
+            if strict:
+                return f"a format specification for argument '{argument}' doesn't exist in '{name}'"
+        elif argument not in msgid_spec:
+            return f"a format specification for argument '{argument}', as in '{name}', doesn't exist in 'msgid'"
+    return None
+
+
+# The formats checked, by flag: the name of their language, their parser, and
+# their comparison.
+FORMATS = {
+    'c-format': ('C', parse_c_format, compare_c_format),
+    'python-format': ('Python', parse_python_format, compare_python_format),
+    'python-brace-format': ('Python brace', parse_python_brace_format, compare_python_brace_format),
+}
@@ -7,6 +7,8 @@ messages.
 import copy
 import fnmatch
 import logging
+import os.path
+import re
 import sys
 import textwrap
 
@@ -17,20 +19,23 @@ from i18n import Runner
 LOG = logging.getLogger(__name__)
 
 
-def segment_pofiles(configuration, locale):
+def segment_pofiles(configuration, locale, catalogs=None):
     """Segment all the pofiles for `locale`.
 
     Returns a set of filenames, all the segment files written.
 
+    If `catalogs` is given, the segmenting is done in memory: see
+    `segment_pofile`.
+
     """
     files_written = set()
     for filename, segments in configuration.segment.items():
         filename = configuration.get_messages_dir(locale) / filename
-        files_written.update(segment_pofile(filename, segments))
+        files_written.update(segment_pofile(filename, segments, catalogs))
     return files_written
 
 
-def segment_pofile(filename, segments):
+def segment_pofile(filename, segments, catalogs=None):
     """Segment a .po file using patterns in `segments`.
 
     The .po file at `filename` is read, and the occurrence locations of its
@@ -53,9 +58,15 @@ def segment_pofile(filename, segments):
     Any message that matches no segments, or more than one, is written back to
     the original file.
 
+    If `catalogs` is a dictionary mapping paths to pofile objects, the
+    original .po file is taken from it when it is there, and the segment files
+    are put into it instead of being written, so that the caller can finish
+    them before writing each of them once.
+
     Arguments:
         filename (path.path): a path object referring to the original .po file.
         segments (dict): specification of the segments to create.
+        catalogs (dict): optional pofile objects to use instead of the files.
 
     Returns:
         a set of path objects, all the segment files written.
@@ -63,35 +74,35 @@ def segment_pofile(filename, segments):
     """
     reading_msg = "Reading {num} entries from {file}"
     writing_msg = "Writing {num} entries to {file}"
-    source_po = polib.pofile(filename)
+    if catalogs is not None and filename in catalogs:
+        source_po = catalogs[filename]
+    else:
+        source_po = polib.pofile(filename)
     LOG.info(reading_msg.format(file=filename, num=len(source_po)))  # pylint: disable=logging-format-interpolation
 
     # A new pofile just like the source, but with no messages. We'll put
-    # anything not segmented into this file.
-    remaining_po = copy.deepcopy(source_po)
-    remaining_po[:] = []
-
-    # Turn the segments dictionary into two structures: segment_patterns is a
-    # list of (pattern, segmentfile) pairs.  segment_po_files is a dict mapping
+    # anything not segmented into this file.  The messages are set aside
+    # while copying, rather than copied and thrown away.
+    entries = source_po[:]
+    source_po[:] = []
+    try:
+        remaining_po = copy.deepcopy(source_po)
+    finally:
+        source_po[:] = entries
+
+    # Turn the segments dictionary into two structures: matcher finds the
+    # segment of each occurrence file.  segment_po_files is a dict mapping
     # segment file names to pofile objects of their contents.
     segment_po_files = {filename: remaining_po}
-    segment_patterns = []
-    for segmentfile, patterns in segments.items():
+    for segmentfile in segments:
         segment_po_files[segmentfile] = copy.deepcopy(remaining_po)
-        segment_patterns.extend((pat, segmentfile) for pat in patterns)
+    matcher = SegmentMatcher(segments, default=filename)
 
     # Examine each message in the source file. If all of its occurrences match
     # a pattern for the same segment, it goes in that segment.  Otherwise, it
     # goes in remaining.
     for msg in source_po:
-        msg_segments = set()
-        for occ_file, _ in msg.occurrences:
-            for pat, segment_file in segment_patterns:
-                if fnmatch.fnmatch(occ_file, pat):
-                    msg_segments.add(segment_file)
-                    break
-            else:
-                msg_segments.add(filename)
+        msg_segments = {matcher.segment(occ_file) for occ_file, _ in msg.occurrences}
 
         assert msg_segments
         if len(msg_segments) == 1:
@@ -110,12 +121,52 @@ def segment_pofile(filename, segments):
             LOG.error("No messages to write to %s, did you run segment twice?", out_file)
         else:
             LOG.info(writing_msg.format(file=out_file, num=len(pofile)))  # pylint: disable=logging-format-interpolation
-            pofile.save(out_file)
+            if catalogs is None:
+                pofile.save(out_file)
+            else:
+                catalogs[out_file] = pofile
             files_written.add(out_file)
 
     return files_written
 
 
+class SegmentMatcher:
+    """
+    Finds the segment of occurrence files, as `fnmatch` would with the
+    patterns of `segments`, a dictionary like that of `segment_pofile`: the
+    segment of a file is that of the first pattern it matches, or `default`.
+
+    The patterns are compiled once into a single regular expression, and the
+    segment of each file is remembered, since messages share few files.
+    """
+
+    def __init__(self, segments, default=None):
+        self.default = default
+        # The segment file of each group of the expression, one per pattern.
+        self.group_segments = {}
+        alternatives = []
+        for segmentfile, patterns in segments.items():
+            for pat in patterns:
+                group = f"segment{len(self.group_segments)}"
+                self.group_segments[group] = segmentfile
+                alternatives.append(f"(?P<{group}>{fnmatch.translate(os.path.normcase(pat))})")
+        self.pattern = re.compile("|".join(alternatives)) if alternatives else None
+        self.segments = {}
+
+    def segment(self, occ_file):
+        """
+        Returns the segment file of the occurrence file `occ_file`.
+        """
+        try:
+            return self.segments[occ_file]
+        except KeyError:
+            pass
+        match = self.pattern.match(os.path.normcase(occ_file)) if self.pattern else None
+        segment = self.group_segments[match.lastgroup] if match else self.default
+        self.segments[occ_file] = segment
+        return segment
+
+
 def get_parser(parser):
     """
     Grabs the parser.
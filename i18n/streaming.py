@@ -0,0 +1,250 @@
+"""
+Read, rewrite and concatenate .po catalogs a chunk of entries at a time.
+
+This is a bounded-memory counterpart of parsing whole catalogs with polib and
+merging them with `i18n.concat`, for catalogs too large to hold in memory
+several at a time: the catalogs are parsed by polib a chunk of entries at a
+time, and the merge state of each message is kept in an on-disk SQLite index
+instead of a dictionary.  The output is the same.
+"""
+
+import filecmp
+import json
+import os
+import pickle
+import re
+import sqlite3
+import tempfile
+
+import polib
+
+from i18n.concat import concatenate_headers, conflict, identification, merge_entry
+
+# The number of entries parsed at a time.
+CHUNK_SIZE = 500
+
+CHARSET_PATTERN = re.compile(rb'"Content-Type:.+? charset=([\w_\-:\.]+)')
+
+# A header entry put ahead of the entries of each chunk, so that polib parses
+# their comments as entry comments rather than header comments.
+CHUNK_PREFIX = 'msgid ""\nmsgstr ""\n\n'
+
+
+def read_chunks(filename, chunk_size=CHUNK_SIZE):
+    """
+    Iterate over the catalog in `filename`, as a series of pofiles.
+
+    The first pofile holds the header comments and metadata of the catalog,
+    the others hold at most `chunk_size` of its entries each, in order.
+    """
+    with open(filename, 'rb') as stream:
+        first = _read_block(stream)
+        match = CHARSET_PATTERN.search(first)
+        encoding = match.group(1).decode('ascii') if match else polib.default_encoding
+        header = polib.pofile(first.decode(encoding), encoding=encoding)
+        blocks = []
+        if len(header):
+            # The catalog has no header entry.
+            header = polib.POFile(encoding=encoding)
+            blocks.append(first.decode(encoding))
+        yield header
+        while True:
+            while len(blocks) < chunk_size:
+                block = _read_block(stream)
+                if not block:
+                    break
+                blocks.append(block.decode(encoding))
+            if not blocks:
+                return
+            chunk = polib.pofile(CHUNK_PREFIX + '\n'.join(blocks), encoding=encoding)
+            chunk.metadata_is_fuzzy = False
+            yield chunk
+            blocks = []
+
+
+def _read_block(stream):
+    """
+    Returns the lines of the next entry in `stream`, up to a blank line, or
+    an empty bytes object at the end.
+    """
+    lines = []
+    for line in stream:
+        if line.strip():
+            lines.append(line)
+        elif any(not kept.startswith(b'#') or kept.startswith(b'#~') for kept in lines):
+            break
+    return b''.join(lines)
+
+
+def _header_text(pofile):
+    """
+    Returns the text of `pofile` without its entries: the header comments and
+    the metadata entry.
+    """
+    header = polib.POFile(wrapwidth=pofile.wrapwidth, encoding=pofile.encoding)
+    header.header = pofile.header
+    header.metadata = pofile.metadata
+    header.metadata_is_fuzzy = pofile.metadata_is_fuzzy
+    return str(header)
+
+
+def _write_if_changed(temp_filename, filename):
+    """
+    Replace `filename` with `temp_filename` if their contents differ, or else
+    remove `temp_filename`.  Returns whether `filename` was replaced.
+    """
+    if os.path.exists(filename) and filecmp.cmp(temp_filename, filename, shallow=False):
+        os.remove(temp_filename)
+        return False
+    os.replace(temp_filename, filename)
+    return True
+
+
+def rewrite_catalog(filename, clean, chunk_size=CHUNK_SIZE):
+    """
+    Rewrite the catalog in `filename` a chunk at a time, as if it was read
+    and saved by polib, after calling `clean` on each chunk, a pofile, to
+    change it in place.  The first chunk holds the header and metadata.
+
+    The file is only replaced if its contents change.
+    """
+    temp_filename = f"{filename}.tmp"
+    obsolete_filename = f"{filename}.obsolete.tmp"
+    chunks = read_chunks(filename, chunk_size)
+    header = next(chunks)
+    clean(header)
+    encoding = header.encoding
+    try:
+        with open(temp_filename, 'w', encoding=encoding) as output, \
+                open(obsolete_filename, 'w+', encoding=encoding) as obsolete:
+            output.write(_header_text(header))
+            for chunk in chunks:
+                clean(chunk)
+                for entry in chunk:
+                    (obsolete if entry.obsolete else output).write('\n' + entry.__unicode__(header.wrapwidth))
+            obsolete.seek(0)
+            for text in iter(lambda: obsolete.read(1 << 16), ''):
+                output.write(text)
+    finally:
+        os.remove(obsolete_filename)
+    return _write_if_changed(temp_filename, filename)
+
+
+class MergeIndex:
+    """
+    An on-disk index of the merge state of each message, as kept in memory
+    by `i18n.concat.concatenate`.
+
+    Each message has a row with its key, the order in which it was first
+    seen, whether its merged entry is obsolete, its pickled merge state, and
+    the order in which it was found translated by several catalogs, if it
+    was.
+    """
+
+    def __init__(self, filename):
+        self.connection = sqlite3.connect(filename)
+        # The index is thrown away if anything goes wrong.
+        self.connection.execute('PRAGMA journal_mode = OFF')
+        self.connection.execute('PRAGMA synchronous = OFF')
+        self.connection.execute(
+            'CREATE TABLE messages (key TEXT PRIMARY KEY, seq INTEGER, obsolete INTEGER,'
+            ' state BLOB, again_seq INTEGER)'
+        )
+        self.seq = 0
+        self.again_seq = 0
+
+    def merge(self, entries, id_):
+        """
+        Merge `entries`, read from the catalog identified as `id_`.
+        """
+        rows = {}
+        keys = [json.dumps([entry.msgctxt, entry.msgid]) for entry in entries]
+        unique_keys = list(dict.fromkeys(keys))
+        for key, seq, again_seq, state in self.connection.execute(
+            f'SELECT key, seq, again_seq, state FROM messages WHERE key IN ({",".join("?" * len(unique_keys))})',
+            unique_keys,
+        ):
+            rows[key] = [seq, again_seq, pickle.loads(state)]
+        for key, entry in zip(keys, entries):
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = [self.seq, None, None]
+                self.seq += 1
+            previous = row[2]
+            row[2] = merge_entry(previous, entry, id_)
+            if row[2] is not previous:
+                row[1] = None
+            if row[2][2] and row[1] is None:
+                row[1] = self.again_seq
+                self.again_seq += 1
+        self.connection.executemany(
+            'INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?, ?)',
+            (
+                (key, seq, state[0].obsolete, pickle.dumps(state, pickle.HIGHEST_PROTOCOL), again_seq)
+                for key, (seq, again_seq, state) in rows.items()
+            ),
+        )
+
+    def entries(self):
+        """
+        Iterate over the merged entries, live ones first, in order.
+        """
+        for (state,) in self.connection.execute('SELECT state FROM messages ORDER BY obsolete, seq'):
+            yield pickle.loads(state)[0]
+
+    def conflicts(self):
+        """
+        Iterate over the `Conflict` of the messages with several translations.
+        """
+        for (state,) in self.connection.execute(
+            'SELECT state FROM messages WHERE again_seq IS NOT NULL ORDER BY again_seq'
+        ):
+            found = conflict(pickle.loads(state))
+            if found:
+                yield found
+
+    def close(self):
+        """
+        Close the index.
+        """
+        self.connection.close()
+
+
+def concatenate_files(catalogs, target, clean=None, chunk_size=CHUNK_SIZE):
+    """
+    Concatenate `catalogs`, a list of (name, filename) pairs, into the file
+    `target`, the way `i18n.concat.concatenate` does, calling `clean` on each
+    chunk read, a pofile, to change it in place.  The target is only
+    replaced if its contents change.
+
+    Returns the list of `Conflict`.
+    """
+    readers = [(name, read_chunks(filename, chunk_size)) for name, filename in catalogs]
+    headers = []
+    for name, chunks in readers:
+        header = next(chunks)
+        if clean:
+            clean(header)
+        headers.append((name, header))
+    merged = concatenate_headers(headers)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = MergeIndex(os.path.join(directory, 'index.sqlite'))
+        try:
+            for (name, chunks), (__, header) in zip(readers, headers):
+                id_ = identification(name, header)
+                for chunk in chunks:
+                    if clean:
+                        clean(chunk)
+                    index.merge(chunk, id_)
+
+            temp_filename = f"{target}.tmp"
+            with open(temp_filename, 'w', encoding=merged.encoding) as output:
+                output.write(_header_text(merged))
+                for entry in index.entries():
+                    output.write('\n' + entry.__unicode__(merged.wrapwidth))
+            _write_if_changed(temp_filename, target)
+            conflicts = list(index.conflicts())
+        finally:
+            index.close()
+    return conflicts
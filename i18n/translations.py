@@ -0,0 +1,274 @@
+"""
+Translations read lazily from memory-mapped .mo files.
+
+`MmapTranslations` is a drop-in replacement for `gettext.GNUTranslations`:
+instead of decoding every message of a .mo file into a dictionary when it is
+loaded, it maps the file into memory, and looks each message up when it is
+asked for, through the hash table of the file, or a binary search of its
+sorted keys when it has none.  The most recent lookups are cached.
+
+Loading a catalog this way costs the same whatever its size, and the pages of
+the file are shared by the processes that map it, such as forked web workers.
+"""
+
+import bisect
+import collections.abc
+import functools
+import gettext
+import mmap
+import struct
+
+from i18n.mofile import HEADER_SIZE, MO_MAGIC, hash_string
+
+# The number of lookups cached by each catalog.
+CACHE_SIZE = 4096
+
+# The value cached for the lookups of missing keys.
+_MISSING = object()
+
+
+class MmapCatalog(collections.abc.Mapping):
+    """
+    A read-only mapping over the messages of a .mo file, with the same keys
+    and values as the catalog `gettext.GNUTranslations` builds: translations
+    are keyed by their msgid, and each form of the plural ones by a (msgid,
+    index) pair.  Contexts are part of the msgids, as "context\\x04msgid".
+
+    `data` is the contents of the file, as bytes or a memory map, and
+    `charset` the encoding of its messages.
+    """
+
+    def __init__(self, data, charset='ascii', cache_size=CACHE_SIZE):
+        self.data = data
+        self.charset = charset
+        magic = struct.unpack('<I', data[:4])[0]
+        self.order = '<' if magic == MO_MAGIC else '>'
+        (
+            __, self.count, self.keys_index, self.values_index, self.hash_size, self.hash_index,
+        ) = struct.unpack(f'{self.order}6I', data[4:HEADER_SIZE])
+        if self.keys_index + 8 * self.count > len(data) or self.values_index + 8 * self.count > len(data):
+            raise OSError(0, 'File is corrupt')
+        # Whether the keys are hashed, or can only be searched.
+        if self.hash_size < 3 or self.hash_index + 4 * self.hash_size > len(data):
+            self.hash_size = 0
+        self._sorted_keys = None
+        self._length = None
+        self.find = functools.lru_cache(maxsize=cache_size)(self._find)
+
+    def _entry(self, table, index):
+        """
+        Returns the bytes of string `index` of the keys or values `table`.
+        """
+        length, offset = struct.unpack_from(f'{self.order}2I', self.data, table + 8 * index)
+        if offset + length > len(self.data):
+            raise OSError(0, 'File is corrupt')
+        return self.data[offset:offset + length]
+
+    def key(self, index):
+        """
+        Returns the key of message `index`, as bytes.
+        """
+        return self._entry(self.keys_index, index)
+
+    def value(self, index):
+        """
+        Returns the translation of message `index`, as bytes.
+        """
+        return self._entry(self.values_index, index)
+
+    def _candidates(self, msgid):
+        """
+        Iterate over the indexes of the messages whose key, up to its first NUL
+        byte, might be `msgid`, bytes.
+        """
+        if self.hash_size:
+            value = hash_string(msgid)
+            slot = value % self.hash_size
+            increment = 1 + value % (self.hash_size - 2)
+            for __ in range(self.hash_size):
+                number = struct.unpack_from(f'{self.order}I', self.data, self.hash_index + 4 * slot)[0]
+                if not number:
+                    return
+                yield number - 1
+                if slot >= self.hash_size - increment:
+                    slot -= self.hash_size - increment
+                else:
+                    slot += increment
+        else:
+            if self._sorted_keys is None:
+                self._sorted_keys = _SortedKeys(self)
+            index = bisect.bisect_left(self._sorted_keys, msgid)
+            while index < self.count and self._sorted_keys[index] == msgid:
+                yield index
+                index += 1
+
+    def _find(self, key):
+        """
+        Returns the value of `key`, or `_MISSING`.
+        """
+        if isinstance(key, tuple):
+            msgid, form = key
+        else:
+            msgid, form = key, None
+        try:
+            msgid = msgid.encode(self.charset)
+        except (AttributeError, UnicodeEncodeError):
+            return _MISSING
+        for index in self._candidates(msgid):
+            found = self.key(index)
+            if form is None:
+                if found == msgid:
+                    return self.value(index).decode(self.charset)
+            elif found.startswith(msgid + b'\x00'):
+                forms = self.value(index).split(b'\x00')
+                if 0 <= form < len(forms):
+                    return forms[form].decode(self.charset)
+                return _MISSING
+        return _MISSING
+
+    def __getitem__(self, key):
+        value = self.find(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self):
+        for index in range(self.count):
+            key = self.key(index)
+            if b'\x00' in key:
+                msgid = key.split(b'\x00')[0].decode(self.charset)
+                for form in range(self.value(index).count(b'\x00') + 1):
+                    yield (msgid, form)
+            else:
+                yield key.decode(self.charset)
+
+    def __len__(self):
+        if self._length is None:
+            self._length = sum(1 for __ in self)
+        return self._length
+
+    def __bool__(self):
+        return self.count > 0
+
+    def copy(self):
+        """
+        Returns a mutable copy of the catalog, that holds its own changes and
+        reads the rest from the catalog, as `dict.copy` would.
+        """
+        return collections.ChainMap({}, self)
+
+
+class _SortedKeys(collections.abc.Sequence):
+    """
+    The keys of a catalog up to their first NUL byte, in the order they are
+    stored in, which is sorted, to search them.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, index):
+        return self.catalog.key(index).partition(b'\x00')[0]
+
+    def __len__(self):
+        return self.catalog.count
+
+
+class MmapTranslations(gettext.GNUTranslations):
+    """
+    A `gettext.GNUTranslations` that maps its .mo file into memory, and looks
+    its messages up lazily, keeping `cache_size` of them cached.
+
+    As with GNUTranslations, `fp` is the open .mo file; it can be closed
+    once the translations are created.
+    """
+
+    cache_size = CACHE_SIZE
+
+    def _parse(self, fp):
+        """
+        Map the file `fp`, and read its metadata.
+        """
+        filename = getattr(fp, 'name', '')
+        try:
+            data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            # Not a regular file, or an empty one.
+            data = fp.read()
+        if len(data) < HEADER_SIZE or struct.unpack('<I', data[:4])[0] not in (MO_MAGIC, self.BE_MAGIC):
+            raise OSError(0, 'Bad magic number', filename)
+        self._info = {}
+        self.plural = lambda n: int(n != 1)
+        try:
+            # The metadata is read as UTF-8, as GNUTranslations does.
+            catalog = MmapCatalog(data, 'utf-8', self.cache_size)
+        except OSError as error:
+            raise OSError(0, error.strerror, filename) from error
+        major_version = struct.unpack(f'{catalog.order}I', data[4:8])[0] >> 16
+        if major_version not in self.VERSIONS:
+            raise OSError(0, 'Bad version number ' + str(major_version), filename)
+        self._catalog = catalog
+        header = catalog.find('')
+        if header is not _MISSING:
+            self._parse_metadata(header)
+        catalog.charset = self._charset or 'ascii'
+        catalog.find.cache_clear()
+
+    def _parse_metadata(self, header):
+        """
+        Read the metadata of the header entry `header`, as
+        GNUTranslations does.
+        """
+        last_key = None
+        for item in header.split('\n'):
+            item = item.strip()
+            if not item or (item.startswith('#-#-#-#-#') and item.endswith('#-#-#-#-#')):
+                continue
+            key = value = None
+            if ':' in item:
+                key, value = item.split(':', 1)
+                key = key.strip().lower()
+                value = value.strip()
+                self._info[key] = value
+                last_key = key
+            elif last_key:
+                self._info[last_key] += '\n' + item
+            if key == 'content-type':
+                self._charset = value.split('charset=')[1]
+            elif key == 'plural-forms':
+                plural = value.split(';')[1].split('plural=')[1]
+                self.plural = gettext.c2py(plural)
+
+
+def translation(domain, localedir=None, languages=None, fallback=False):
+    """
+    Returns the translations of `domain` for `languages`, as
+    `gettext.translation` does, read with `MmapTranslations`.
+    """
+    return gettext.translation(domain, localedir, languages, MmapTranslations, fallback)
+
+
+def install(domain, localedir=None, *, names=None):
+    """
+    Install the translations of `domain` as `_` in builtins, as
+    `gettext.install` does, read with `MmapTranslations`.
+    """
+    translation(domain, localedir, fallback=True).install(names)
+
+
+def install_django():
+    """
+    Make Django read its .mo files with `MmapTranslations`.
+
+    This has to be called before Django loads any translations, such as from
+    a settings module, or the `ready` method of an application.
+    """
+    # pylint: disable=import-outside-toplevel
+    from django.utils.translation import to_locale, trans_real
+
+    def _new_gnu_trans(self, localedir, use_null_fallback=True):
+        return translation(
+            self.domain, localedir, [to_locale(self.language())], fallback=use_null_fallback,
+        )
+
+    trans_real.DjangoTranslation._new_gnu_trans = _new_gnu_trans  # pylint: disable=protected-access
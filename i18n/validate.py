@@ -2,67 +2,259 @@
 
 
 import codecs
+import contextlib
+import functools
 import logging
 import os
-import struct
 import sys
 import textwrap
+from concurrent.futures import ProcessPoolExecutor
 
 import polib
+from lxml import etree
 from lxml.html import clean
+from path import Path
 
 from i18n import Runner
 from i18n.converter import Converter
 from i18n.dummy import is_format_message
 from i18n.execute import call
+from i18n.extractors import file_digest, read_stamped_json, write_stamped_json
+from i18n.msgfmt import check_catalog
 
 log = logging.getLogger(__name__)
 
+VALIDATION_CACHE = '.validate-cache.json'
 
-def validate_po_files(configuration, locale_dir, root_dir=None, report_empty=False, check_all=False):
+
+def validate_po_files(
+    configuration, locale_dir, root_dir=None, report_empty=False, check_all=False, *,
+    msgfmt=False, jobs=1, max_problems=None, cache=None,
+):
     """
     Validate all of the po files found in the root directory that are not product of a merge.
 
+    The files are checked by `validate_files`, with `msgfmt`, `jobs`,
+    `max_problems` and `cache`.
+
     Returns a boolean indicating whether or not problems were found.
     """
-    found_problems = False
+    po_files = find_po_files(configuration, root_dir if root_dir else locale_dir, check_all)
+    return validate_files(
+        locale_dir, po_files, report_empty, msgfmt=msgfmt, jobs=jobs, max_problems=max_problems, cache=cache,
+    )
+
 
+def find_po_files(configuration, root_dir, check_all=False):
+    """
+    Returns the .po files found in `root_dir` that are not product of a merge
+    (see generate.py), or all of them if `check_all` is true, sorted.
+    """
     # List of .po files that are the product of a merge (see generate.py).
     merged_files = configuration.generate_merge.keys()
 
-    for dirpath, __, filenames in os.walk(root_dir if root_dir else locale_dir):
+    po_files = []
+    for dirpath, __, filenames in os.walk(root_dir):
         for name in filenames:
             __, ext = os.path.splitext(name)
-            filename = os.path.join(dirpath, name)
-
-            # Validate only .po files that are not product of a merge (see generate.py) unless check_all is true.
             # If django-partial.po has a problem, then django.po will also, so don't report it.
-            if ext.lower() == '.po' and (check_all or os.path.basename(filename) not in merged_files):
+            if ext.lower() == '.po' and (check_all or name not in merged_files):
+                po_files.append(os.path.join(dirpath, name))
+    return sorted(po_files)
 
-                # First validate the format of this file
-                if msgfmt_check_po_file(locale_dir, filename):
-                    found_problems = True
 
-                # Check that the translated strings are valid, and optionally
-                # check for empty translations. But don't check English.
-                if "/locale/en/" not in filename:
-                    problems = check_messages(filename, report_empty)
-                    if problems:
-                        report_problems(filename, problems)
-                        found_problems = True
+def validate_files(
+    locale_dir, po_files, report_empty=False, *, msgfmt=False, jobs=1, max_problems=None, cache=None,
+):
+    """
+    Validate the .po files `po_files`, in a pool of `jobs` worker processes
+    when there is more than one job.
+
+    The format of the files is checked by i18n.msgfmt, the way GNU msgfmt -c
+    checks it, or with `msgfmt`, by running GNU msgfmt -c itself.
 
-                    dup_filename = filename.replace('.po', '.dup')
-                    has_duplicates = os.path.exists(dup_filename)
-                    if has_duplicates:
-                        log.warning("Duplicates found in %s, details in .dup file", dup_filename)
-                        found_problems = True
+    The problems of each file are reported as soon as it and the files
+    before it are checked, so that the .prob files and the log are written
+    in the order of `po_files`, whatever the number of jobs.  Once
+    `max_problems` problems have been reported, the remaining files aren't
+    checked.
 
-                    if not (problems or has_duplicates):
-                        log.info("No problems found in %s", filename)
+    With a `cache`, a `ValidationCache`, the files unchanged since they were
+    last checked with the same options aren't checked again: the problems
+    cached for them are reported instead, and saved in the cache otherwise.
 
+    Returns a boolean indicating whether or not problems were found.
+    """
+    tasks = [
+        (locale_dir, filename, report_empty, "/locale/en/" in filename, msgfmt)
+        for filename in po_files
+    ]
+    keys = {}
+    cached = {}
+    if cache is not None:
+        msgfmt_version = _msgfmt_version(locale_dir) if msgfmt else None
+        for __, filename, __, english, __ in tasks:
+            keys[filename] = [file_digest(filename), report_empty, english, msgfmt, msgfmt_version]
+            cached[filename] = cache.lookup(filename, keys[filename])
+    unchecked = [task for task in tasks if cached.get(task[1]) is None]
+
+    found_problems = False
+    problems_count = 0
+    with contextlib.closing(_check_po_files(unchecked, jobs, SourceTags())) as results:
+        for __, filename, __, english, __ in tasks:
+            result = cached.get(filename)
+            if result is None:
+                result = next(results)
+                if cache is not None:
+                    cache.record(filename, keys[filename], result)
+            msgfmt_output, problems = result
+            count = _report_po_file(filename, english, msgfmt_output, problems)
+            if count:
+                found_problems = True
+                problems_count += count
+            if max_problems and problems_count >= max_problems:
+                log.error("Stopped validating after %s problems, the files left aren't checked", problems_count)
+                break
+
+    if cache is not None:
+        cache.save()
     return found_problems
 
 
+class ValidationCache:
+    """
+    A persistent record of the problems found in each .po file of a
+    directory.
+
+    Entries are keyed by path, and are only used while the file's content
+    hash, the options it was checked with, and the version of GNU msgfmt
+    whose output it holds are unchanged.  The whole cache is discarded when
+    the validator, polib or lxml changes.  Duplicates
+    aren't cached: the .dup files are looked for each time.
+    """
+
+    # Bump this when a change to this module or to msgfmt.py changes the problems found.
+    VERSION = 2
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.filename = self.directory / VALIDATION_CACHE
+        self.files = read_stamped_json(self.filename, self.stamp(), 'files') or {}
+
+    @classmethod
+    def stamp(cls):
+        """
+        Identifies the code whose output the cache holds.
+        """
+        return [cls.VERSION, polib.__version__, etree.__version__]
+
+    def name(self, filename):
+        """
+        Returns the name `filename` is cached under.
+        """
+        return str(Path(filename).relpath(self.directory))
+
+    def lookup(self, filename, key):
+        """
+        Returns the (msgfmt output, problems) cached for `filename`, as
+        `_check_po_file_task` returns them, or None if there are none under
+        this `key`.
+        """
+        entry = self.files.get(self.name(filename))
+        if entry is None or entry[0] != key:
+            return None
+        msgfmt_output, problems = entry[1]
+        return (
+            tuple(msgfmt_output) if msgfmt_output else None,
+            [tuple(problem) for problem in problems],
+        )
+
+    def record(self, filename, key, result):
+        """
+        Record the (msgfmt output, problems) `result` of checking `filename`
+        under `key`.
+        """
+        self.files[self.name(filename)] = [key, result]
+
+    def save(self):
+        """
+        Write the cache to its file, forgetting the files that are gone.
+        """
+        self.files = {name: entry for name, entry in self.files.items() if (self.directory / name).exists()}
+        write_stamped_json(self.filename, self.stamp(), 'files', self.files)
+
+
+def _check_po_files(tasks, jobs, source_tags):
+    """
+    Iterate over the results of `_check_po_file_task` for `tasks`, in order,
+    checking the files in a pool of `jobs` worker processes when there is
+    more than one job, each with its own source tags, or here with
+    `source_tags`.  The files not checked yet when the iteration is closed
+    are left unchecked.
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield _check_po_file_task(task, source_tags)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_check_po_file_task, task) for task in tasks]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            executor.shutdown(cancel_futures=True)
+
+
+def _check_po_file_task(task, source_tags=None):
+    """
+    Check a .po file, possibly in a worker process, looking the tags of its
+    source strings up in `source_tags`, or those of the worker.
+
+    Returns the output and errors of msgfmt -c, if the file is checked with
+    it, and the problems `check_po_file` found.  Validate the format of the
+    file, check that the translated strings are valid, and optionally check
+    for empty translations, but don't check the strings of English.
+    """
+    locale_dir, filename, report_empty, english, msgfmt = task
+    msgfmt_output = _run_msgfmt(locale_dir, filename) if msgfmt else None
+    if source_tags is None:
+        source_tags = _WORKER_SOURCE_TAGS
+    problems = check_po_file(
+        filename, report_empty, check_translations=not english, source_tags=source_tags, check_format=not msgfmt,
+    )
+    return msgfmt_output, problems
+
+
+def _report_po_file(filename, english, msgfmt_output, problems):
+    """
+    Log and report the problems found in `filename`, as returned by
+    `_check_po_file_task`, and look for its .dup file, unless it's English.
+
+    Returns the number of problems: one for the errors of msgfmt, one for
+    the .dup file, and those reported in the .prob file.
+    """
+    count = 0
+    if msgfmt_output and _log_msgfmt_output(*msgfmt_output):
+        count += 1
+
+    if problems:
+        report_problems(filename, problems)
+        count += len(problems)
+
+    if not english:
+        dup_filename = filename.replace('.po', '.dup')
+        has_duplicates = os.path.exists(dup_filename)
+        if has_duplicates:
+            log.warning("Duplicates found in %s, details in .dup file", dup_filename)
+            count += 1
+
+        if not (problems or has_duplicates):
+            log.info("No problems found in %s", filename)
+
+    return count
+
+
 def msgfmt_check_po_file(locale_dir, filename):
     """
     Call GNU msgfmt -c on each .po file to validate its format.
@@ -70,17 +262,72 @@ def msgfmt_check_po_file(locale_dir, filename):
 
     Returns a boolean indicating whether or not problems were found.
     """
-    found_problems = False
+    return _log_msgfmt_output(*_run_msgfmt(locale_dir, filename))
 
+
+def _run_msgfmt(locale_dir, filename):
+    """
+    Call GNU msgfmt -c on `filename`.
+
+    Returns its output and errors.
+    """
     # Use relative paths to make output less noisy.
     rfile = os.path.relpath(filename, locale_dir)
     out, err = call(f'msgfmt -c -o /dev/null {rfile}', working_directory=locale_dir)
-    if err:
-        log.info('\n%s', out.decode('utf8'))
-        log.warning('\n%s', err.decode('utf8'))
-        found_problems = True
+    return out.decode('utf8'), err.decode('utf8')
 
-    return found_problems
+
+def _msgfmt_version(locale_dir):
+    """
+    Returns the first line of `msgfmt --version`, identifying the GNU msgfmt
+    that `_run_msgfmt` calls.
+    """
+    out, __ = call('msgfmt --version', working_directory=locale_dir)
+    return out.decode('utf8').partition('\n')[0]
+
+
+def _log_msgfmt_output(out, err):
+    """
+    Log the output and errors of msgfmt -c, if it found errors.
+
+    Returns a boolean indicating whether or not problems were found.
+    """
+    if not err:
+        return False
+    log.info('\n%s', out)
+    log.warning('\n%s', err)
+    return True
+
+
+def check_po_file(filename, report_empty=False, check_translations=True, source_tags=None, check_format=True):
+    """
+    Checks `filename` the way GNU msgfmt -c does, unless `check_format` is
+    false, and unless `check_translations` is false, checks its messages as
+    `check_pofile_messages` does, with `source_tags`, reading it once.
+
+    Returns the problems, a list of tuples, as `check_messages` does.  The
+    file isn't read when neither check is made.
+    """
+    if not (check_format or check_translations):
+        return []
+    try:
+        pomsgs = polib.pofile(filename)
+    except OSError as error:
+        return [("Syntax error", str(error))]
+    problems = check_catalog(pomsgs) if check_format else []
+    if check_translations:
+        problems.extend(check_pofile_messages(pomsgs, report_empty, source_tags))
+    return problems
+
+
+# The number of <abbr> tags whose cleaned HTML is kept.
+CLEAN_CACHE_SIZE = 4096
+
+# The converter finding the tags of strings.
+_converter = Converter()
+
+# clean_html for <abbr> tags, which translations often repeat.
+_clean_html = functools.lru_cache(maxsize=CLEAN_CACHE_SIZE)(clean.clean_html)
 
 
 def tags_in_string(msg):
@@ -93,31 +340,43 @@ def tags_in_string(msg):
     and so on.
 
     """
-    def is_linguistic_tag(tag):
-        """Is this tag one that can change with the language?"""
-        if tag.startswith("&"):
-            return True
-        if any(x in tag for x in ["<abbr>", "<abbr ", "</abbr>"]):
-            if "<abbr " in tag:
-                cleaned_tag = clean.clean_html(tag)
-                # clean_html will remove XSS from tag so check so don't skip abbr tag if cleaned_tag is different
-                if cleaned_tag != tag:
-                    return False
-            return True
-        return False
-
-    __, tags = Converter().detag_string(msg)
+    tags = _converter.tokenize(msg)[1::2]
     return {t for t in tags if not is_linguistic_tag(t)}
 
 
+def is_linguistic_tag(tag):
+    """Is this tag one that can change with the language?"""
+    if tag.startswith("&"):
+        return True
+    if any(x in tag for x in ["<abbr>", "<abbr ", "</abbr>"]):
+        if "<abbr " in tag:
+            cleaned_tag = _clean_html(tag)
+            # clean_html will remove XSS from tag so check so don't skip abbr tag if cleaned_tag is different
+            if cleaned_tag != tag:
+                return False
+        return True
+    return False
+
+
+class SourceTags(dict):
+    """
+    The tags of the source strings of messages, as `tags_in_string` finds
+    them, found once for each string however many files have it.
+    """
+
+    def __missing__(self, source):
+        tags = self[source] = frozenset(tags_in_string(source))
+        return tags
+
+
+# The source tags of a worker process, kept from one file to the next.
+_WORKER_SOURCE_TAGS = SourceTags()
+
+
 def astral(msg):
     """Does `msg` have characters outside the Basic Multilingual Plane?"""
-    # Python2 narrow builds present astral characters as surrogate pairs.
-    # By encoding as utf32, and decoding DWORDS, we can get at the real code
-    # points.
-    utf32 = msg.encode("utf32")[4:]         # [4:] to drop the bom
-    code_points = struct.unpack('%dI' % (len(utf32) / 4), utf32)
-    return any(cp > 0xFFFF for cp in code_points)
+    # Characters compare by their code points.
+    return max(msg, default="") > "\uffff"
 
 
 def check_messages(filename, report_empty=False):
@@ -134,8 +393,19 @@ def check_messages(filename, report_empty=False):
     then zero or more translations.
 
     """
+    return check_pofile_messages(polib.pofile(filename), report_empty)
+
+
+def check_pofile_messages(pomsgs, report_empty=False, source_tags=None):
+    """
+    Checks the messages of the pofile `pomsgs`, as `check_messages` does.
+
+    The tags of the source strings are looked up in `source_tags`, a
+    `SourceTags` that can be shared by the files of all the languages.
+    """
+    if source_tags is None:
+        source_tags = SourceTags()
     problems = []
-    pomsgs = polib.pofile(filename)
     for msg in pomsgs:
         # Check for characters Javascript can't support.
         # https://code.djangoproject.com/ticket/21725
@@ -161,7 +431,7 @@ def check_messages(filename, report_empty=False):
             if report_empty:
                 problems.append(("Empty translation", source))
         else:
-            id_tags = tags_in_string(source)
+            id_tags = source_tags[source]
             tx_tags = tags_in_string(translation)
 
             # Check if tags don't match
@@ -230,12 +500,41 @@ class Validate(Runner):
             help="Includes empty translation strings in .prob files."
         )
 
+        self.parser.add_argument(
+            '--msgfmt',
+            action='store_true',
+            help="Check the format of the files with GNU msgfmt -c instead of the checks made here, which follow it."
+        )
+
         self.parser.add_argument(
             '-ca', '--check-all',
             action='store_true',
             help="Validate all po files, including those that are the product of a merge (see generate.py)."
         )
 
+        self.parser.add_argument(
+            '-j', '--jobs',
+            type=int,
+            default=1,
+            help="Validate up to JOBS files at the same time, in separate processes."
+        )
+
+        self.parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help=(
+                "Check every file again instead of reusing the problems cached for the files that have not "
+                "changed since the last run."
+            )
+        )
+
+        self.parser.add_argument(
+            '--max-problems',
+            type=int,
+            metavar='N',
+            help="Stop validating once N problems have been reported, leaving the remaining files unchecked."
+        )
+
     def run(self, args):
         """
         Main entry point for script
@@ -255,10 +554,10 @@ class Validate(Runner):
 
         if not languages:
             # validate all languages
-            if validate_po_files(self.configuration, locale_dir, report_empty=args.empty, check_all=args.check_all):
-                command_exit_code = 1
+            po_files = find_po_files(self.configuration, locale_dir, args.check_all)
         else:
             # languages will be a list of language codes; test each language.
+            po_files = []
             for language in languages:
                 root_dir = self.configuration.locale_dir / language
                 # Assert that a directory for this language code exists on the system
@@ -266,9 +565,14 @@ class Validate(Runner):
                     log.error("%s is not a valid directory.\nSkipping language '%s'", root_dir, language)
                     continue
                 # If we found the language code's directory, validate the files.
-                if validate_po_files(self.configuration, locale_dir, root_dir=root_dir, report_empty=args.empty,
-                                     check_all=args.check_all):
-                    command_exit_code = 1
+                po_files.extend(find_po_files(self.configuration, root_dir, args.check_all))
+
+        cache = None if args.no_cache else ValidationCache(locale_dir)
+        if validate_files(
+            locale_dir, po_files, args.empty,
+            msgfmt=args.msgfmt, jobs=max(args.jobs, 1), max_problems=args.max_problems, cache=cache,
+        ):
+            command_exit_code = 1
 
         return command_exit_code
 
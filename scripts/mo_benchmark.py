@@ -0,0 +1,106 @@
+"""
+Compare the .mo files written by i18n.mofile with those written by polib.
+
+Usage: python scripts/mo_benchmark.py path/to/django.po
+
+Both files are loaded with Python's gettext, and all their messages are
+looked up with it.  Where the C library is GNU's, they are also looked up
+with its gettext, which uses the hash table of the i18n.mofile output, and a
+binary search in the polib output, which has none.
+"""
+
+import ctypes
+import ctypes.util
+import gettext
+import locale
+import os
+import sys
+import tempfile
+import time
+
+import polib
+
+from i18n.mofile import write_mofile
+
+
+def timed(function, repeat=5):
+    """
+    Returns the best time of `repeat` calls to `function`.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def python_times(filename, msgids):
+    """
+    Returns the times to load `filename` with Python's gettext, and to look
+    up all `msgids` in it.
+    """
+    def load():
+        with open(filename, 'rb') as mofile:
+            return gettext.GNUTranslations(mofile)
+
+    translations = load()
+    return timed(load), timed(lambda: [translations.gettext(msgid) for msgid in msgids])
+
+
+def libc_time(directory, domain, msgids):
+    """
+    Returns the time to look up all `msgids` with the C library's dgettext,
+    in `domain` under `directory`, or None if it can't be done here.
+    """
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        return None
+    libc = ctypes.CDLL(libc_name)
+    if not hasattr(libc, 'dgettext'):
+        return None
+    try:
+        locale.setlocale(locale.LC_ALL, 'C.UTF-8')
+    except locale.Error:
+        return None
+    os.environ['LANGUAGE'] = 'xx'
+    libc.bindtextdomain.restype = ctypes.c_char_p
+    libc.dgettext.restype = ctypes.c_char_p
+    libc.bindtextdomain(domain.encode(), directory.encode())
+    encoded = [msgid.encode('utf-8') for msgid in msgids]
+    dgettext = libc.dgettext
+    domain = domain.encode()
+    return timed(lambda: [dgettext(domain, msgid) for msgid in encoded])
+
+
+def main(po_filename):
+    """
+    Print the comparison for `po_filename`.
+    """
+    pofile = polib.pofile(po_filename)
+    msgids = [entry.msgid for entry in pofile.translated_entries() if not entry.msgctxt]
+    print(f"{po_filename}: {len(pofile)} entries, {len(msgids)} translated looked up")
+    with tempfile.TemporaryDirectory() as directory:
+        messages_dir = os.path.join(directory, 'xx', 'LC_MESSAGES')
+        os.makedirs(messages_dir)
+        writers = (
+            ('polib', pofile.save_as_mofile),
+            ('i18n.mofile', lambda filename: write_mofile(pofile, filename)),
+        )
+        print(f"{'writer':12} {'size':>10} {'write':>9} {'py load':>9} {'py lookup':>10} {'C lookup':>9}")
+        for number, (name, write) in enumerate(writers):
+            domain = f'benchmark{number}'
+            filename = os.path.join(messages_dir, f'{domain}.mo')
+            write_time = timed(lambda: write(filename), repeat=1)  # pylint: disable=cell-var-from-loop
+            load_time, lookup_time = python_times(filename, msgids)
+            c_time = libc_time(directory, domain, msgids)
+            c_text = f"{c_time * 1000:7.1f}ms" if c_time is not None else f"{'n/a':>9}"
+            print(
+                f"{name:12} {os.path.getsize(filename):10d} {write_time * 1000:7.1f}ms "
+                f"{load_time * 1000:7.1f}ms {lookup_time * 1000:8.1f}ms {c_text}"
+            )
+
+
+if __name__ == '__main__':
+    main(sys.argv[1])
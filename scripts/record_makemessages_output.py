@@ -0,0 +1,41 @@
+"""
+Record the catalogs makemessages writes for the source tree of tests/test_extractors.py.
+
+Usage: python scripts/record_makemessages_output.py
+
+The django and djangojs domains of tests/data/extraction are extracted with
+django-admin makemessages, as extract runs it, into
+tests/data/extraction/locale/en/LC_MESSAGES, which the tests compare with the
+catalogs the in-process extractor builds.  Commit the catalogs, with the
+version of xgettext that wrote them, when they change.
+"""
+
+import os
+import subprocess
+import sys
+
+EXTRACTION_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data', 'extraction')
+MESSAGES_DIR = os.path.join(EXTRACTION_DIR, 'locale', 'en', 'LC_MESSAGES')
+
+
+def main():
+    """
+    Record the catalogs of both domains.
+    """
+    version = subprocess.run(['xgettext', '--version'], capture_output=True, text=True, check=True).stdout
+    print(version.splitlines()[0])
+    os.makedirs(MESSAGES_DIR, exist_ok=True)
+    for domain, extensions in (('django', []), ('djangojs', ['-e', 'js,jsx'])):
+        filename = os.path.join(MESSAGES_DIR, f'{domain}.po')
+        # makemessages merges what it finds into an existing catalog.
+        if os.path.exists(filename):
+            os.remove(filename)
+        subprocess.run(
+            [sys.executable, '-m', 'django', 'makemessages', '-l', 'en', '-d', domain, *extensions],
+            cwd=EXTRACTION_DIR, env=dict(os.environ, LC_ALL='C', LANGUAGE=''), check=True,
+        )
+        print(f"{domain}.po written")
+
+
+if __name__ == '__main__':
+    main()
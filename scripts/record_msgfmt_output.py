@@ -0,0 +1,38 @@
+"""
+Record the output of GNU msgfmt -c for the fixtures of tests/test_msgfmt.py.
+
+Usage: python scripts/record_msgfmt_output.py
+
+Each tests/data/msgfmt/NAME.po is checked with msgfmt -c, and its errors are
+written to tests/data/msgfmt/NAME.msgfmt, which the tests compare with the
+problems i18n.msgfmt finds.  Commit the .msgfmt files, with the version of
+msgfmt that wrote them, when they change.
+"""
+
+import glob
+import os
+import subprocess
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', 'tests', 'data', 'msgfmt')
+
+
+def main():
+    """
+    Record the output of msgfmt -c for all the fixtures.
+    """
+    version = subprocess.run(['msgfmt', '--version'], capture_output=True, text=True, check=True).stdout
+    print(version.splitlines()[0])
+    environment = dict(os.environ, LC_ALL='C', LANGUAGE='')
+    for filename in sorted(glob.glob(os.path.join(FIXTURES_DIR, '*.po'))):
+        name = os.path.basename(filename)
+        result = subprocess.run(
+            ['msgfmt', '-c', '-o', os.devnull, name],
+            cwd=FIXTURES_DIR, env=environment, capture_output=True, text=True, check=False,
+        )
+        with open(filename[:-len('.po')] + '.msgfmt', 'w', encoding='utf-8') as output:
+            output.write(result.stderr)
+        print(f"{name}: {len(result.stderr.splitlines())} lines")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+// Translators: shown while the files load
+var loading = gettext('Loading...');
+var progress = interpolate(gettext('%s of %s'), [1, 2]);
+var named = interpolate(gettext('%(done)s done'), {done: 1}, true);
+var files = ngettext('%d file', '%d files', count);
+var open = pgettext('menu', 'Open');
+var sure = gettext('100% sure');
+var dashboard = gettext('Dashboard');
@@ -0,0 +1,5 @@
+export function Widget({ count }) {
+    // Translators: the title of the widget
+    const title = gettext("Widget");
+    return <div title={title}>{ngettext("One item", "%d items", count)}</div>;
+}
@@ -0,0 +1,30 @@
+"""
+Views of the application the in-process extractor is compared with makemessages on.
+"""
+from django.utils.translation import gettext as _
+from django.utils.translation import gettext_lazy, gettext_noop, ngettext, pgettext, pgettext_lazy
+
+# Translators: the name of the user
+GREETING = _("Hello %(name)s") % {'name': 'you'}
+POSITIONAL = _("%s of %s") % (1, 2)
+BRACES = _("Welcome back, {name}").format(name='you')
+BOTH = _("{count} files in %(folder)s")
+ESCAPED = _("100%% sure")
+INVALID = _("Progress: 100%")
+PLAIN = gettext_lazy("Dashboard")
+NOOP = gettext_noop("Later")
+
+
+def files(count):
+    """
+    Returns how many files there are.
+    """
+    # Translators: the number of files
+    return ngettext("%(count)d file", "%(count)d files", count) % {'count': count}
+
+
+def month():
+    """
+    Returns the name of a month, and of a verb.
+    """
+    return pgettext("month name", "May"), pgettext_lazy("verb", "May")
@@ -0,0 +1,92 @@
+"""Test i18n/concat.py"""
+
+import polib
+
+from i18n.concat import Conflict, concatenate
+
+from . import I18nToolTestCase
+
+
+def make_pofile(header, project, *entries):
+    """
+    Returns a pofile with `header`, Project-Id-Version `project` and `entries`.
+    """
+    pofile = polib.POFile()
+    pofile.header = header
+    pofile.metadata = {'Project-Id-Version': project, 'Language': 'fr'}
+    for entry in entries:
+        pofile.append(entry)
+    return pofile
+
+
+class TestConcatenate(I18nToolTestCase):
+    """
+    Tests of concatenating catalogs.
+    """
+
+    def test_merges_entries(self):
+        first = make_pofile(
+            'A header', '0.1a',
+            polib.POEntry(msgid='Hello', msgstr='Bonjour', occurrences=[('a.py', '1')], comment='Greeting'),
+            polib.POEntry(msgid='May', msgctxt='month', occurrences=[('a.py', '2')]),
+            polib.POEntry(msgid='One', msgid_plural='Many', msgstr_plural={0: '', 1: ''}),
+        )
+        second = make_pofile(
+            'A header', '0.1a',
+            polib.POEntry(msgid='May', occurrences=[('b.js', '3')]),
+            polib.POEntry(
+                msgid='Hello', occurrences=[('a.py', '1'), ('b.js', '1')], comment='Greeting\nShort',
+                flags=['javascript-format'],
+            ),
+            polib.POEntry(msgid='May', msgctxt='month', msgstr='Mai', occurrences=[('b.js', '2')]),
+            polib.POEntry(msgid='One', msgid_plural='Many', msgstr_plural={0: 'Un', 1: 'Plusieurs'}),
+        )
+
+        merged, conflicts = concatenate([('first.po', first), ('second.po', second)])
+
+        self.assertEqual(conflicts, [])
+        self.assertEqual(merged.header, 'A header')
+        self.assertEqual(
+            [(entry.msgctxt, entry.msgid) for entry in merged],
+            [(None, 'Hello'), ('month', 'May'), (None, 'One'), (None, 'May')],
+        )
+        hello = merged[0]
+        self.assertEqual(hello.msgstr, 'Bonjour')
+        self.assertEqual(hello.occurrences, [('a.py', '1'), ('b.js', '1')])
+        self.assertEqual(hello.comment, 'Greeting\nShort')
+        self.assertEqual(hello.flags, ['javascript-format'])
+        self.assertEqual(merged[1].msgstr, 'Mai')
+        self.assertEqual(merged[2].msgstr_plural, {0: 'Un', 1: 'Plusieurs'})
+
+    def test_conflicts(self):
+        first = make_pofile('First header', '0.1a', polib.POEntry(msgid='Save', msgstr='Enregistrer'))
+        second = make_pofile('Second header', '', polib.POEntry(msgid='Save', msgstr='Sauver'))
+        third = make_pofile('', 'other', polib.POEntry(msgid='Save', msgstr='Enregistrer'))
+
+        merged, conflicts = concatenate([('first.po', first), ('second.po', second), ('third.po', third)])
+
+        self.assertEqual(merged[0].msgstr, 'Enregistrer')
+        self.assertNotIn('fuzzy', merged[0].flags)
+        self.assertEqual(conflicts, [
+            Conflict(merged[0], [
+                ('first.po (0.1a)', 'Enregistrer'),
+                ('second.po', 'Sauver'),
+                ('third.po (other)', 'Enregistrer'),
+            ]),
+        ])
+        self.assertEqual(
+            merged.header,
+            '#-#-#-#-#  first.po (0.1a)  #-#-#-#-#\nFirst header\n#-#-#-#-#  second.po  #-#-#-#-#\nSecond header',
+        )
+        self.assertEqual(merged.metadata, {'Project-Id-Version': 'other', 'Language': 'fr'})
+
+    def test_obsolete_entries(self):
+        first = make_pofile('', '', polib.POEntry(msgid='Old', msgstr='Vieux', obsolete=True))
+        second = make_pofile('', '', polib.POEntry(msgid='Old', msgstr='Ancien'))
+
+        merged, conflicts = concatenate([('first.po', first), ('second.po', second)])
+
+        self.assertEqual(conflicts, [])
+        self.assertEqual(len(merged), 1)
+        self.assertFalse(merged[0].obsolete)
+        self.assertEqual(merged[0].msgstr, 'Ancien')
@@ -63,3 +63,17 @@ class TestConverter(I18nToolTestCase):
         source, expected = data
         result = UpcaseConverter().convert(source)
         self.assertEqual(result, expected)
+
+    def test_tokenize(self):
+        tokens = converter.Converter().tokenize('<b>big</b> %(adjective)s wolf')
+        self.assertEqual(tokens, ('', '<b>', 'big', '</b>', ' ', '%(adjective)s', ' wolf'))
+        self.assertEqual(converter.Converter().tokenize('big bad wolf'), ('big bad wolf',))
+
+    def test_detag_retag(self):
+        conv = converter.Converter()
+        source = r'<a href="C:\files">%s</a> and {name}'
+        detagged, tags = conv.detag_string(source)
+        self.assertEqual(detagged, '<0><1><2> and <3>')
+        self.assertEqual(tags, [r'<a href="C:\files">', '%s', '</a>', '{name}'])
+        self.assertEqual(conv.retag_string(detagged, tags), source)
+        self.assertEqual(conv.retag_string('<1> <1> <0>', ['a', 'b']), 'b <1> a')
@@ -1,9 +1,13 @@
 """Tests of i18n/dummy.py"""
 
+import tempfile
+
 import ddt
-from polib import POEntry
+from path import Path
+from polib import POEntry, pofile
 
 from i18n import dummy
+from i18n.manifest import BuildManifest
 
 from . import I18nToolTestCase,MOCK_APPLICATION_DIR
 
@@ -104,3 +108,69 @@ class TestDummy(I18nToolTestCase):
         source, expected = data
         result = dummy.ArabicDummy().convert(source)
         self.assertUnicodeEquals(result, expected)
+
+    def test_make_dummy_skips_up_to_date(self):
+        """
+        Tests that a dummy file is only written again once its source changed, or when forced.
+        """
+        locale_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(locale_dir.rmtree)
+        source = locale_dir / 'en' / 'LC_MESSAGES' / 'mako.po'
+        source.parent.makedirs()
+        (MOCK_APPLICATION_DIR / 'conf' / 'locale' / 'fr' / 'LC_MESSAGES' / 'mako.po').copy(source)
+        manifest = BuildManifest(locale_dir)
+
+        self.assertTrue(dummy.make_dummy(source, 'eo', self.converter, manifest))
+        self.assertFalse(dummy.make_dummy(source, 'eo', self.converter, manifest))
+        self.assertTrue(dummy.make_dummy(source, 'eo', dummy.Dummy2(), manifest))
+        with open(source, 'a', encoding='utf-8') as source_file:
+            source_file.write('\nmsgid "New"\nmsgstr ""\n')
+        self.assertTrue(dummy.make_dummy(source, 'eo', dummy.Dummy2(), manifest))
+        self.assertIn('New', [entry.msgid for entry in pofile(locale_dir / 'eo' / 'LC_MESSAGES' / 'mako.po')])
+
+        manifest.save()
+        self.assertFalse(dummy.make_dummy(source, 'eo', dummy.Dummy2(), BuildManifest(locale_dir)))
+        self.assertTrue(dummy.make_dummy(source, 'eo', dummy.Dummy2(), BuildManifest(locale_dir, force=True)))
+
+    def test_main_jobs(self):
+        """
+        Tests that the dummy files of all the locales are made from each source file, in parallel or not.
+        """
+        outputs = []
+        for jobs in (1, 2):
+            root_dir = Path(tempfile.mkdtemp())
+            self.addCleanup(root_dir.rmtree)
+            locale_dir = root_dir / 'conf' / 'locale'
+            (locale_dir / 'en' / 'LC_MESSAGES').makedirs()
+            (locale_dir / 'config.yaml').write_text('source_locale: en\ndummy_locales: [eo, fake2, rtl]\n')
+            for name in ('mako.po', 'django.po'):
+                (MOCK_APPLICATION_DIR / 'conf' / 'locale' / 'fr' / 'LC_MESSAGES' / 'mako.po').copy(
+                    locale_dir / 'en' / 'LC_MESSAGES' / name
+                )
+            dummy.main(verbose=0, force=False, jobs=jobs, root_dir=root_dir)
+            outputs.append({
+                name: (locale_dir / name).read_text()
+                for name in ('eo/LC_MESSAGES/mako.po', 'fake2/LC_MESSAGES/django.po', 'rtl/LC_MESSAGES/mako.po')
+            })
+            self.assertEqual(len(BuildManifest(locale_dir).outputs), 6)
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertIn('Language: fake2', outputs[0]['fake2/LC_MESSAGES/django.po'])
+        source = locale_dir / 'en' / 'LC_MESSAGES' / 'mako.po'
+        converted = pofile(source)
+        dummy.Dummy2().convert_msg(converted[0])
+        self.assertIn(converted[0].msgstr, outputs[0]['fake2/LC_MESSAGES/django.po'])
+
+    def test_translate_table(self):
+        # Dummy2 swaps some letters, which the replacements do one after the other.
+        table = [('b', 'q'), ('d', 'p'), ('p', 'd'), ('q', 'b')]
+        self.assertEqual('bdpq'.translate(dummy.BaseDummyConverter.make_translate_table(table)), 'bddb')
+        self.assertIsNone(dummy.BaseDummyConverter.make_translate_table([('ab', 'c')]))
+        self.assertEqual(dummy.Dummy2().convert('bdpq <b>bold</b>'), 'bddb <b>bøld</b>')
+
+    def test_conversions_cached(self):
+        converter = dummy.Dummy(cache_size=2)
+        for source in ('one', 'two', 'one', 'three', 'two'):
+            converter.convert(source)
+        self.assertEqual(converter.cache_info()[:2], (1, 4))
+        self.assertEqual(converter.convert('one'), dummy.Dummy().convert('one'))
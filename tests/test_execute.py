@@ -0,0 +1,67 @@
+"""
+Tests of i18n/execute.py
+"""
+
+import subprocess
+import threading
+
+from i18n.execute import Job, execute_captured, run_jobs
+
+from . import I18nToolTestCase
+
+
+class TestRunJobs(I18nToolTestCase):
+    """
+    Tests of the `run_jobs` dependency graph runner.
+    """
+
+    def test_serial_order(self):
+        order = []
+        jobs = [
+            Job('second', lambda: order.append('second'), requires=['first']),
+            Job('first', lambda: order.append('first')),
+            Job('third', lambda: order.append('third'), requires=['first', 'second']),
+        ]
+        run_jobs(jobs)
+        self.assertEqual(order, ['first', 'second', 'third'])
+
+    def test_parallel_respects_requirements(self):
+        order = []
+        lock = threading.Lock()
+
+        def record(name):
+            with lock:
+                order.append(name)
+
+        jobs = [Job(f'job{i}', lambda i=i: record(f'job{i}')) for i in range(6)]
+        jobs.append(Job('after', lambda: record('after'), requires=[job.name for job in jobs]))
+        run_jobs(jobs, max_workers=3)
+        self.assertEqual(sorted(order[:6]), [f'job{i}' for i in range(6)])
+        self.assertEqual(order[6], 'after')
+
+    def test_failure_stops_dependents(self):
+        ran = []
+
+        def fail():
+            raise subprocess.CalledProcessError(1, 'false', stderr='boom')
+
+        jobs = [
+            Job('bad', fail),
+            Job('dependent', lambda: ran.append('dependent'), requires=['bad']),
+        ]
+        for workers in (1, 2):
+            with self.assertLogs('i18n.execute', level='ERROR') as logs:
+                with self.assertRaises(subprocess.CalledProcessError):
+                    run_jobs(jobs, max_workers=workers)
+            self.assertEqual(ran, [])
+            self.assertTrue(any('bad' in line and 'boom' in line for line in logs.output))
+
+    def test_unknown_requirement(self):
+        with self.assertRaises(ValueError):
+            run_jobs([Job('orphan', lambda: None, requires=['missing'])])
+
+    def test_execute_captured(self):
+        self.assertEqual(execute_captured('echo oops >&2'), 'oops\n')
+        with self.assertRaises(subprocess.CalledProcessError) as context:
+            execute_captured('echo failed >&2; exit 3')
+        self.assertEqual(context.exception.stderr, 'failed\n')
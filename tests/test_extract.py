@@ -1,15 +1,45 @@
+import argparse
 import os
 from datetime import datetime, timedelta
 from functools import wraps
 import itertools
+import shutil
 
 import ddt
 import mock
 import polib
-from i18n import extract, config
+from i18n import extract, extractors, config
 from path import Path
 
-from . import I18nToolTestCase, MOCK_DJANGO_APP_DIR
+from . import I18nToolTestCase, MOCK_DJANGO_APP_DIR, TEST_DATA_DIR
+
+# An application made of the sources of tests/data/extraction, to extract.
+WORK_APP_DIR = Path(__file__).dirname() / 'work_extract_app'
+
+WORK_APP_CONFIG = """\
+locales:
+    - en
+segment:
+    django-partial.po:
+        django-studio.po:
+            - app/templates/*
+    djangojs-partial.po:
+        djangojs-studio.po:
+            - app/static/widget.jsx
+    underscore.po:
+        underscore-studio.po:
+            - app/static/studio/*
+"""
+
+# Underscore templates, read with Babel's JavaScript extractor.
+WORK_APP_BABEL_CFG = """\
+[javascript: app/**.underscore]
+"""
+
+WORK_APP_UNDERSCORE = {
+    'app/static/list.underscore': '<li><%- gettext("List item") %></li>\n<%- ngettext("One", "%d items", n) %>\n',
+    'app/static/studio/edit.underscore': '<button><%- gettext("Edit") %></button>\n<%- gettext("List item") %>\n',
+}
 
 
 def perform_extract_with_options():
@@ -244,3 +274,148 @@ class TestExtract(ExtractInitTestMixin):
                 no_segment=True,
             )
         mock_segment_pofiles.assert_not_called()
+
+    def test_jobs_share_one_worker_pool(self):
+        """
+        Verify that with --jobs, the extractors share a single pool of that many worker processes
+        """
+        with mock.patch('i18n.extractors.ProcessPoolExecutor', wraps=extractors.ProcessPoolExecutor) as pool_class:
+            extract.main(
+                verbosity=0,
+                config=self.configuration._filename,
+                root_dir=MOCK_DJANGO_APP_DIR,
+                no_segment=True,
+                no_cache=True,
+                jobs=2,
+            )
+        pool_class.assert_called_once_with(max_workers=2)
+
+    def test_extraction_jobs_graph(self):
+        """
+        Verify that the renames wait for makemessages, and the extractors are independent
+        """
+        runner = extract.Extract()
+        runner.configuration = self.configuration
+        runner.source_msgs_dir = self.configuration.source_messages_dir
+        args = mock.Mock(verbose=0, makemessages=True)
+        jobs = {job.name: job for job in runner.extraction_jobs(args, set(), {})}
+        self.assertEqual(jobs['rename-django'].requires, {'django'})
+        self.assertEqual(jobs['rename-djangojs'].requires, {'djangojs'})
+        self.assertEqual(jobs['django'].requires, set())
+        self.assertEqual(jobs['djangojs'].requires, set())
+
+        args = mock.Mock(verbose=0, makemessages=False, jobs=1)
+        jobs = {job.name: job for job in runner.extraction_jobs(args, set(), {})}
+        self.assertNotIn('rename-django', jobs)
+        self.assertEqual(jobs['django'].requires, set())
+
+    def test_in_process_by_default(self):
+        """
+        Verify that unless asked for makemessages, the django and djangojs domains are extracted without it
+        """
+        with mock.patch('i18n.extract.execute') as mock_execute:
+            extract.main(
+                verbosity=0,
+                config=self.configuration._filename,
+                root_dir=MOCK_DJANGO_APP_DIR,
+                no_segment=True,
+                no_cache=True,
+            )
+        self.assertNotIn('makemessages', str(mock_execute.call_args_list))
+        for filename in (extract.DJANGO_PO, extract.DJANGOJS_PO):
+            pofile = polib.pofile(self.configuration.source_messages_dir / filename)
+            self.assertTrue(pofile.translated_entries() or pofile.untranslated_entries())
+
+    def test_shard_without_makemessages(self):
+        """
+        Verify that --shard is refused with --makemessages
+        """
+        with self.assertRaises(SystemExit):
+            extract.main(
+                verbosity=0,
+                config=self.configuration._filename,
+                root_dir=MOCK_DJANGO_APP_DIR,
+                makemessages=True,
+                shard=(1, 2),
+            )
+
+    def test_parse_shard(self):
+        """
+        Verify the parsing of --shard values
+        """
+        self.assertEqual(extract.parse_shard('2/4'), (2, 4))
+        for value in ('0/4', '5/4', '2', 'a/b'):
+            with self.assertRaises(argparse.ArgumentTypeError):
+                extract.parse_shard(value)
+
+
+class TestExtractShards(I18nToolTestCase):
+    """
+    Tests of extracting an application in shards
+    """
+    def setUp(self):
+        super().setUp()
+        shutil.copytree(TEST_DATA_DIR / 'extraction' / 'app', WORK_APP_DIR / 'app')
+        self.addCleanup(shutil.rmtree, WORK_APP_DIR)
+        locale_dir = WORK_APP_DIR / 'conf' / 'locale'
+        locale_dir.makedirs_p()
+        (locale_dir / 'config.yaml').write_text(WORK_APP_CONFIG)
+        (locale_dir / 'babel_underscore.cfg').write_text(WORK_APP_BABEL_CFG)
+        for path, source in WORK_APP_UNDERSCORE.items():
+            (WORK_APP_DIR / path).parent.makedirs_p()
+            (WORK_APP_DIR / path).write_text(source)
+        self.configuration = config.Configuration(root_dir=WORK_APP_DIR)
+
+    def extract(self, **options):
+        """
+        Extract the strings of the application with `options`.
+        """
+        extract.main(verbosity=0, config=self.configuration._filename, root_dir=WORK_APP_DIR, **options)
+
+    def test_shard_caches(self):
+        """
+        Verify that each shard caches its own files, without evicting those of the others
+        """
+        self.extract(shard=(1, 2))
+        self.extract(shard=(2, 2))
+        cache_dir = self.configuration.source_messages_dir.parent
+        self.assertTrue((cache_dir / '.extract-cache-1-of-2.json').exists())
+        self.assertTrue((cache_dir / '.extract-cache-2-of-2.json').exists())
+        self.assertFalse((cache_dir / extract.EXTRACTION_CACHE).exists())
+        with mock.patch('i18n.extractors.extract_file', wraps=extractors.extract_file) as extract_file:
+            self.extract(shard=(1, 2))
+            self.extract(shard=(2, 2))
+        self.assertEqual(extract_file.call_count, 0)
+
+    def source_catalogs(self):
+        """
+        Returns the text of the entries of each .po file of the source messages directory.
+        """
+        return {
+            pofile.basename(): [str(entry) for entry in polib.pofile(pofile)]
+            for pofile in self.configuration.source_messages_dir.files('*.po')
+        }
+
+    def test_shards_merge_to_single_extraction(self):
+        """
+        Verify that merging the shards of an extraction writes the files a single extraction does
+        """
+        self.extract(no_cache=True)
+        expected = self.source_catalogs()
+        self.assertEqual(sorted(expected), [
+            'django-partial.po', 'django-studio.po', 'djangojs-partial.po', 'djangojs-studio.po',
+            'underscore-studio.po', 'underscore.po',
+        ])
+        self.assertTrue(all(expected.values()))
+        for pofile in self.configuration.source_messages_dir.files('*.po'):
+            pofile.remove()
+
+        shard_dir = WORK_APP_DIR / 'shards'
+        shard_dir.makedirs_p()
+        for index in (1, 2, 3):
+            self.extract(shard=(index, 3))
+            shard_file = self.configuration.source_messages_dir / f'extract-shard-{index}-of-3.json'
+            shard_file.move(shard_dir)
+        self.assertEqual(self.source_catalogs(), {})
+        self.extract(merge_shards=shard_dir)
+        self.assertEqual(self.source_catalogs(), expected)
@@ -0,0 +1,412 @@
+"""Tests of i18n/extractors.py"""
+
+import importlib.metadata
+import os
+import re
+import shutil
+import subprocess
+import sys
+import textwrap
+from unittest import mock
+
+import polib
+from path import Path
+
+from i18n import extractors
+from i18n.extractors import (
+    DJANGO_DOMAIN,
+    DJANGOJS_DOMAIN,
+    ExtractionCache,
+    PackageCache,
+    babel_keywords,
+    build_babel_catalog,
+    build_catalog,
+    extract_babel_sources,
+    extract_sources,
+    find_babel_files,
+    find_package_dir,
+    find_source_files,
+    format_flags,
+    in_shard,
+    package_key,
+    read_babel_mapping,
+    read_shards,
+    shard_output,
+    worker_pool,
+    write_shard,
+)
+
+from . import I18nToolTestCase
+
+HERE = Path(__file__).dirname()
+WORK = HERE / "work_extractors"
+
+SOURCES = {
+    'lms/views.py': '''\
+        from django.utils.translation import gettext as _, ngettext, pgettext_lazy
+        # Translators: greet the user
+        greeting = _("Hello %(name)s") % {'name': 'you'}
+        apples = ngettext("one apple", "%d apples", 3)
+        month = pgettext_lazy("month", "May")
+        ''',
+    'cms/templates/page.html': '''\
+        {% load i18n %}
+        <p>{% trans "Welcome" %}</p>
+        {# Translators: count of items #}
+        {% blocktrans count counter=n %}One item{% plural %}{{ counter }} items{% endblocktrans %}
+        <p>{% trans "May" context "month" %}</p>
+        ''',
+    'lms/static/app.jsx': '''\
+        // Translators: shown in the header
+        const title = gettext('JS hello');
+        const items = ngettext('one', 'many', n);
+        const node = <div>{gettext("In JSX")}</div>;
+        ''',
+    'lms/static/legacy.js': '''\
+        var ctx = pgettext('menu', 'Open');
+        ''',
+    'node_modules/pkg/index.js': '''\
+        gettext('ignored by ignore_dirs');
+        ''',
+    'conf/locale/helper.py': '''\
+        _('inside a locale directory');
+        ''',
+    '.hidden/secret.py': '''\
+        _('hidden directory');
+        ''',
+}
+
+
+# A source tree with the kinds of messages of each domain, and the catalogs
+# makemessages writes for it, recorded by scripts/record_makemessages_output.py.
+EXTRACTION_DIR = HERE / 'data' / 'extraction'
+MAKEMESSAGES_DIR = EXTRACTION_DIR / 'locale' / 'en' / 'LC_MESSAGES'
+
+
+def makemessages_catalog(domain):
+    """
+    Returns the catalog makemessages writes for `domain` from the tree of
+    EXTRACTION_DIR: the one recorded, or the one it writes now if xgettext is
+    installed, or None.
+    """
+    recorded = MAKEMESSAGES_DIR / f'{domain}.po'
+    if recorded.exists():
+        return polib.pofile(recorded)
+    if not shutil.which('xgettext'):
+        return None
+    work = WORK / 'makemessages'
+    shutil.copytree(EXTRACTION_DIR, work)
+    try:
+        (work / 'locale').makedirs_p()
+        subprocess.run(
+            [sys.executable, '-m', 'django', 'makemessages', '-l', 'en', '-d', domain]
+            + (['-e', 'js,jsx'] if domain == DJANGOJS_DOMAIN else []),
+            cwd=work, env=dict(os.environ, LC_ALL='C', LANGUAGE=''), capture_output=True, check=True,
+        )
+        return polib.pofile(work / 'locale' / 'en' / 'LC_MESSAGES' / f'{domain}.po')
+    finally:
+        shutil.rmtree(work)
+
+
+def catalog_messages(pofile):
+    """
+    Returns what a catalog says of each of its messages, but its translations.
+    """
+    return [
+        (entry.msgctxt, entry.msgid, entry.msgid_plural, entry.occurrences, entry.comment, entry.flags)
+        for entry in pofile
+    ]
+
+
+class TestExtractors(I18nToolTestCase):
+    """
+    Tests of the in-process django/djangojs string extractor.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for path, source in SOURCES.items():
+            filename = WORK / path
+            filename.parent.makedirs_p()
+            filename.write_text(textwrap.dedent(source))
+        self.addCleanup(shutil.rmtree, WORK)
+
+    def test_find_source_files(self):
+        files = find_source_files(WORK, ignore_dirs=['node_modules'])
+        self.assertEqual(files[DJANGO_DOMAIN], ['cms/templates/page.html', 'lms/views.py'])
+        self.assertEqual(files[DJANGOJS_DOMAIN], ['lms/static/app.jsx', 'lms/static/legacy.js'])
+
+    def test_build_catalog(self):
+        files = find_source_files(WORK, ignore_dirs=['node_modules'])
+        results = extract_sources(WORK, files)
+
+        django = build_catalog(results[DJANGO_DOMAIN], DJANGO_DOMAIN)
+        self.assertEqual(
+            [(entry.msgctxt, entry.msgid) for entry in django],
+            [(None, 'Welcome'), (None, 'One item'), ('month', 'May'),
+             (None, 'Hello %(name)s'), (None, 'one apple')],
+        )
+        month = django.find('May', msgctxt='month')
+        self.assertEqual(month.occurrences, [('cms/templates/page.html', '5'), ('lms/views.py', '5')])
+        hello = django.find('Hello %(name)s')
+        self.assertEqual(hello.comment, 'Translators: greet the user')
+        self.assertIn('python-format', hello.flags)
+        items = django.find('One item')
+        self.assertEqual(items.msgid_plural, '%(counter)s items')
+        self.assertEqual(items.comment, 'Translators: count of items')
+
+        djangojs = build_catalog(results[DJANGOJS_DOMAIN], DJANGOJS_DOMAIN)
+        self.assertEqual(
+            [(entry.msgctxt, entry.msgid) for entry in djangojs],
+            [(None, 'JS hello'), (None, 'one'), (None, 'In JSX'), ('menu', 'Open')],
+        )
+        self.assertEqual(djangojs.find('JS hello').comment, 'Translators: shown in the header')
+        self.assertEqual(djangojs.find('one').msgid_plural, 'many')
+
+    def test_format_flags(self):
+        # Like xgettext, only valid format strings with a directive are flagged.
+        self.assertEqual(format_flags(DJANGO_DOMAIN, 'Hello %(name)s'), ['python-format'])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, '100%% sure'), ['python-format'])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, 'Hello {name}'), ['python-brace-format'])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, '{count} in %s'), ['python-format', 'python-brace-format'])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, 'Progress: 100%'), [])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, 'Hello'), [])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, 'One file', '%(count)s files'), ['python-format'])
+        self.assertEqual(format_flags(DJANGO_DOMAIN, '100%', '%(count)s files'), [])
+        self.assertEqual(format_flags(DJANGOJS_DOMAIN, '%s of %s'), ['javascript-format'])
+        self.assertEqual(format_flags(DJANGOJS_DOMAIN, '%(done)s done'), [])
+        self.assertEqual(format_flags(DJANGOJS_DOMAIN, '100% sure'), [])
+        self.assertEqual(format_flags(DJANGOJS_DOMAIN, 'Hello {name}'), [])
+
+    def test_same_as_makemessages(self):
+        # The extractor builds the catalogs makemessages writes, but their header.
+        files = find_source_files(EXTRACTION_DIR)
+        results = extract_sources(EXTRACTION_DIR, files)
+        for domain in (DJANGO_DOMAIN, DJANGOJS_DOMAIN):
+            expected = makemessages_catalog(domain)
+            if expected is None:
+                self.skipTest("xgettext isn't installed, and the output of makemessages isn't recorded")
+            with self.subTest(domain=domain):
+                self.assertEqual(
+                    catalog_messages(build_catalog(results[domain], domain)), catalog_messages(expected),
+                )
+
+    def test_template_indentation(self):
+        # Django's own admin templates have indentation Python can't tokenize.
+        (WORK / 'lms' / 'indented.html').write_text(textwrap.dedent('''\
+            {% load i18n %}
+            <div>
+                {% if a %}
+                  <p>{% trans "Deep" %}</p>
+               {% endif %}
+              <p>{% trans "Shallow" %}</p>
+            </div>
+            '''))
+        self.assertEqual(
+            extract_sources(WORK, {DJANGO_DOMAIN: ['lms/indented.html']})[DJANGO_DOMAIN],
+            [('lms/indented.html', [[4, None, 'Deep', None, []], [6, None, 'Shallow', None, []]])],
+        )
+
+    def test_shards(self):
+        files = find_source_files(WORK)
+        shards = [(index, 3) for index in (1, 2, 3)]
+        for paths in files.values():
+            for path in paths:
+                self.assertEqual(sum(in_shard(path, shard) for shard in shards), 1)
+
+        results = extract_sources(WORK, files)
+        shard_dir = WORK / 'shards'
+        shard_dir.makedirs_p()
+        for shard in shards:
+            shard_files = {domain: [path for path in paths if in_shard(path, shard)] for domain, paths in files.items()}
+            shard_results = extract_sources(WORK, shard_files)
+            write_shard(shard_dir, shard, {
+                domain: shard_output({'domain': domain}, files[domain], shard_results[domain])
+                for domain in files
+            })
+        self.assertEqual(
+            read_shards(shard_dir),
+            {domain: ({'domain': domain}, results[domain]) for domain in files},
+        )
+
+        (shard_dir / 'extract-shard-2-of-3.json').remove()
+        with self.assertRaises(ValueError):
+            read_shards(shard_dir)
+
+    def test_worker_pool_matches_serial(self):
+        files = find_source_files(WORK)
+        serial = extract_sources(WORK, files)
+        pooled = extract_sources(WORK, files, jobs=2)
+        self.assertEqual(serial, pooled)
+
+    def test_shared_worker_pool(self):
+        self.assertIsNone(worker_pool(1))
+        executor = worker_pool(2)
+        self.addCleanup(executor.shutdown)
+        # The workers are started by worker_pool, in this thread.
+        processes = set(executor._processes)  # pylint: disable=protected-access
+        self.assertEqual(len(processes), 2)
+        files = find_source_files(WORK)
+        for __ in range(2):
+            self.assertEqual(extract_sources(WORK, files, jobs=2, executor=executor), extract_sources(WORK, files))
+        self.assertEqual(set(executor._processes), processes)  # pylint: disable=protected-access
+
+    def test_undecodable_file_is_skipped(self):
+        with open(os.path.join(WORK, 'lms', 'latin1.html'), 'wb') as bad:
+            bad.write('{% trans "caf\xe9" %}'.encode('latin-1'))
+        files = {DJANGO_DOMAIN: ['lms/latin1.html']}
+        self.assertEqual(extract_sources(WORK, files), {DJANGO_DOMAIN: [('lms/latin1.html', [])]})
+
+    def test_cache(self):
+        cache_file = WORK / 'cache.json'
+        files = find_source_files(WORK)
+        cold = extract_sources(WORK, files)
+        self.assertEqual(extract_sources(WORK, files, cache=ExtractionCache(cache_file)), cold)
+
+        # Change one file and delete another: only the changed one is parsed again.
+        (WORK / 'lms' / 'views.py').write_text('_("Changed")\n')
+        (WORK / 'lms' / 'static' / 'legacy.js').remove()
+        files = find_source_files(WORK)
+        with mock.patch('i18n.extractors.extract_file', wraps=extractors.extract_file) as extract_file:
+            warm = extract_sources(WORK, files, cache=ExtractionCache(cache_file))
+        extract_file.assert_called_once_with(WORK, 'lms/views.py', DJANGO_DOMAIN)
+        self.assertEqual(warm, extract_sources(WORK, files))
+        for domain in (DJANGO_DOMAIN, DJANGOJS_DOMAIN):
+            self.assertEqual(
+                [str(entry) for entry in build_catalog(warm[domain], domain)],
+                [str(entry) for entry in build_catalog(extract_sources(WORK, files)[domain], domain)],
+            )
+
+        cache = ExtractionCache(cache_file)
+        self.assertNotIn('lms/static/legacy.js', cache.files[DJANGOJS_DOMAIN])
+        self.assertIsNone(cache.lookup(DJANGO_DOMAIN, 'lms/views.py', 'not the digest'))
+
+    def test_cache_discarded_for_other_extractor(self):
+        cache_file = WORK / 'cache.json'
+        files = find_source_files(WORK)
+        extract_sources(WORK, files, cache=ExtractionCache(cache_file))
+        self.assertTrue(ExtractionCache(cache_file).files)
+        with mock.patch.object(ExtractionCache, 'VERSION', ExtractionCache.VERSION + 1):
+            self.assertEqual(ExtractionCache(cache_file).files, {})
+
+
+BABEL_SOURCES = {
+    'a/templates/page.html': '# Translators: shown on the page\n_("Page %s")\n_("Shared")\n',
+    'a/views.py': '_("Shared")\nngettext("one", "many", 2)\n',
+    'b/views.py': '_("B")\n',
+    'b/skip/views.py': '_("Ignored by the mapping")\n',
+    '_private/views.py': '_("Private")\n',
+    'a/t.underscore': 'gettext("U1") + interpolate("I")\n',
+}
+
+MAIN_CFG = """\
+[ignore: b/skip/**]
+[python: **/templates/**.html]
+input_encoding = utf-8
+[python: **.py]
+"""
+
+UNDERSCORE_CFG = """\
+[javascript: **.underscore]
+"""
+
+
+class TestBabelExtractors(I18nToolTestCase):
+    """
+    Tests of the single-walk Babel extraction.
+    """
+
+    def setUp(self):
+        super().setUp()
+        for path, source in BABEL_SOURCES.items():
+            filename = WORK / 'src' / path
+            filename.parent.makedirs_p()
+            filename.write_text(source)
+        (WORK / 'main.cfg').write_text(MAIN_CFG)
+        (WORK / 'underscore.cfg').write_text(UNDERSCORE_CFG)
+        self.addCleanup(shutil.rmtree, WORK)
+        self.mappings = {
+            'main': read_babel_mapping(WORK / 'main.cfg'),
+            'underscore': read_babel_mapping(WORK / 'underscore.cfg'),
+        }
+
+    def test_find_babel_files(self):
+        self.assertEqual(
+            find_babel_files(WORK / 'src', self.mappings),
+            {
+                'main': ['a/views.py', 'a/templates/page.html', 'b/views.py'],
+                'underscore': ['a/t.underscore'],
+            },
+        )
+
+    def test_build_babel_catalog(self):
+        files = find_babel_files(WORK / 'src', self.mappings)
+        sources = {
+            name: (WORK / 'src', files[name], method_map, options_map, babel_keywords('interpolate'))
+            for name, (method_map, options_map) in self.mappings.items()
+        }
+        results = extract_babel_sources(sources)
+        self.assertEqual(results, extract_babel_sources(sources, jobs=2))
+
+        main = build_babel_catalog(results['main']).decode('utf-8')
+        self.assertIn('msgid ""\nmsgstr ""\n"Project-Id-Version: PROJECT VERSION\\n"', main)
+        entries = main.split('\n\n')[1:]
+        self.assertEqual(
+            [re.sub(r'\n"POT-Creation-Date.*', '', entry) for entry in entries],
+            [
+                '#: a/templates/page.html:3 a/views.py:1\nmsgid "Shared"\nmsgstr ""',
+                '#: a/views.py:2\nmsgid "one"\nmsgid_plural "many"\nmsgstr[0] ""\nmsgstr[1] ""',
+                '#. Translators: shown on the page\n#: a/templates/page.html:2\n#, python-format\n'
+                'msgid "Page %s"\nmsgstr ""',
+                '#: b/views.py:1\nmsgid "B"\nmsgstr ""',
+                '',
+            ],
+        )
+        underscore = build_babel_catalog(results['underscore'], 'app').decode('utf-8')
+        self.assertIn('#: app/a/t.underscore:1\nmsgid "U1"', underscore)
+        self.assertIn('#: app/a/t.underscore:1\nmsgid "I"', underscore)
+
+
+class TestThirdPartyPackages(I18nToolTestCase):
+    """
+    Tests of finding and caching the third-party packages.
+    """
+
+    def test_find_package_dir_without_importing(self):
+        package_dir = WORK / 'site' / 'noisy_app'
+        package_dir.makedirs_p()
+        (package_dir / '__init__.py').write_text('raise RuntimeError("imported")\n')
+        self.addCleanup(shutil.rmtree, WORK)
+        sys.path.insert(0, str(WORK / 'site'))
+        self.addCleanup(sys.path.remove, str(WORK / 'site'))
+
+        self.assertEqual(Path(find_package_dir('noisy_app')), package_dir)
+        self.assertNotIn('noisy_app', sys.modules)
+        with self.assertRaises(ModuleNotFoundError):
+            find_package_dir('no_such_app')
+
+    def test_package_key(self):
+        distributions = {'mock': ['mock']}
+        version = importlib.metadata.version('mock')
+        self.assertEqual(package_key('mock', distributions, 'cfg'), [['mock', version], 'cfg'])
+        self.assertEqual(package_key('mock.sub', distributions, 'cfg'), [['mock', version], 'cfg'])
+        self.assertIsNone(package_key('local_app', distributions, 'cfg'))
+
+        editable = mock.Mock(version='1.0', read_text=lambda name: '{"dir_info": {"editable": true}}')
+        with mock.patch('importlib.metadata.distribution', return_value=editable):
+            self.assertIsNone(package_key('mock', distributions, 'cfg'))
+
+    def test_package_cache(self):
+        WORK.makedirs_p()
+        self.addCleanup(shutil.rmtree, WORK)
+        cache = PackageCache(WORK / 'cache.json')
+        cache.replace([('app', [['app-dist', '1.0'], 'cfg'], 'msgid "\u00e9"'.encode('utf-8'))])
+        cache.save()
+
+        cache = PackageCache(WORK / 'cache.json')
+        self.assertEqual(cache.lookup('app', [['app-dist', '1.0'], 'cfg']), 'msgid "\u00e9"'.encode('utf-8'))
+        self.assertIsNone(cache.lookup('app', [['app-dist', '1.1'], 'cfg']))
+        self.assertIsNone(cache.lookup('other', [['app-dist', '1.0'], 'cfg']))
+
+        with mock.patch.object(PackageCache, 'VERSION', PackageCache.VERSION + 1):
+            self.assertIsNone(PackageCache(WORK / 'cache.json').lookup('app', [['app-dist', '1.0'], 'cfg']))
@@ -3,9 +3,12 @@ This test tests that i18n extraction works properly.
 """
 from datetime import datetime, timedelta
 from filecmp import dircmp
+import gettext
+import os
 import random
 import re
 import string
+import tempfile
 
 from unittest.mock import patch
 from path import Path
@@ -14,6 +17,7 @@ from pytz import UTC
 
 from i18n import config, generate
 from i18n.extract import DJANGO_PARTIAL_PO, DJANGO_PO
+from i18n.manifest import MANIFEST_FILENAME, BuildManifest
 
 from . import I18nToolTestCase, MOCK_APPLICATION_DIR, MOCK_DJANGO_APP_DIR
 
@@ -38,6 +42,10 @@ class TestGenerate(I18nToolTestCase):
         # since Path.getmtime() is not millisecond-accurate
         self.start_time = datetime.now(UTC) - timedelta(seconds=1)
 
+    def tearDown(self):
+        super().tearDown()
+        Path.joinpath(self.configuration.locale_dir, MANIFEST_FILENAME).remove_p()
+
     def test_merge(self):
         """
         Tests merge script on English source files.
@@ -80,6 +88,96 @@ class TestGenerate(I18nToolTestCase):
             )
         self.assertFalse(Path.exists(filename))
 
+    def test_merge_sources_unchanged(self):
+        """
+        Tests that merging writes the target and .dup report, but not the sources unless normalizing.
+        """
+        messages_dir = self.configuration.get_messages_dir('mock')
+        sources = ('mako.po', 'mako-studio.po')
+        for source, msgstr in zip(sources, ('Un', 'Deux')):
+            with open(messages_dir / source, 'a', encoding='utf-8') as source_file:
+                source_file.write(f'\n#: lms/one.py:12\nmsgid "One"\nmsgstr "{msgstr}"\n')
+        before = [(messages_dir / source).read_bytes() for source in sources]
+        target = messages_dir / (random_name() + '.po')
+        generate.merge(self.configuration, 'mock', target=target, sources=sources)
+        self.assertEqual([(messages_dir / source).read_bytes() for source in sources], before)
+
+        merged = pofile(target)
+        one = merged.find('One')
+        self.assertEqual((one.msgstr, one.occurrences, one.flags), ('Un', [('lms/one.py', '')], []))
+        self.assertFalse(merged.metadata_is_fuzzy)
+        with open(target.stripext() + '.dup', encoding='utf-8') as dup_file:
+            self.assertEqual(dup_file.read(), (
+                "Multiple translations found for single string.\n\tString \"One\"\n\tPresent in files ['lms/one.py']\n"
+                "Translations found were:\n\t#-#-#-#-#  mako.po (0.1a)  #-#-#-#-#\nUn\n"
+                "#-#-#-#-#  mako-studio.po (0.1a)  #-#-#-#-#\nDeux\n\n"
+            ))
+
+        generate.merge(self.configuration, 'mock', target=target, sources=sources, normalize=True)
+        self.assertNotEqual((messages_dir / sources[0]).read_bytes(), before[0])
+        self.assertEqual(pofile(messages_dir / sources[0]).find('One').occurrences, [('lms/one.py', '')])
+
+    def test_merge_into_source_up_to_date(self):
+        """
+        Tests that a target merged from itself isn't merged again while it and the other sources are unchanged.
+        """
+        messages_dir = self.configuration.get_messages_dir('mock')
+        target = messages_dir / (random_name() + '.po')
+        (messages_dir / 'mako.po').copy(target)
+        sources = (target.basename(), 'mako-studio.po')
+        manifest = BuildManifest(self.configuration.locale_dir)
+        generate.merge(self.configuration, 'mock', target=target, sources=sources, manifest=manifest)
+        with self.assertLogs(level='INFO') as logs:
+            generate.merge(self.configuration, 'mock', target=target, sources=sources, manifest=manifest)
+        self.assertTrue([line for line in logs.output if 'is up to date' in line])
+
+    def test_merge_locales_reports_all_failures(self):
+        """
+        Tests that a failing locale doesn't stop the others, in order, with or without workers.
+        """
+        test_configuration = config.Configuration(root_dir=MOCK_DJANGO_APP_DIR)
+        locales = [('aa', [True]), ('bb', [False]), ('cc', [False, True])]
+        manifest = BuildManifest(test_configuration.locale_dir)
+        for jobs in (1, 3):
+            with self.assertLogs(level='INFO') as logs:
+                failures = generate.generate_locales(test_configuration, locales, manifest, jobs=jobs)
+            self.assertEqual([locale for locale, __ in failures], ['aa', 'cc'])
+            for __, error in failures:
+                self.assertIn('ValueError: I18N: Cannot generate because file not found', error)
+            merged = [line.rsplit(' ', 1)[-1] for line in logs.output if 'Merging' in line]
+            self.assertEqual(merged, ['aa', 'bb', 'bb', 'cc', 'cc', 'cc'])
+
+    def test_compile_locale(self):
+        """
+        Tests that the merged files are compiled, and only recompiled once changed.
+        """
+        manifest = BuildManifest(self.configuration.locale_dir)
+        messages_dir = self.configuration.get_messages_dir('fr')
+        expected = [messages_dir / 'django.mo', messages_dir / 'djangojs.mo']
+        self.assertEqual(generate.compile_locale(self.configuration, 'fr', manifest), expected)
+        with open(expected[0], 'rb') as mofile:
+            translations = gettext.GNUTranslations(mofile)
+        self.assertEqual(translations.gettext('Problem'), 'Ṗṛöḅḷëṁ')
+
+        self.assertEqual(generate.compile_locale(self.configuration, 'fr', manifest), [])
+        self.assertEqual(generate.compile_locale(self.configuration, 'fr', manifest, keep_untranslated=True), expected)
+        with open(messages_dir / 'djangojs.po', 'a', encoding='utf-8') as pofile_:
+            pofile_.write('\nmsgid "New"\nmsgstr "Nouveau"\n')
+        self.assertEqual(generate.compile_locale(self.configuration, 'fr', manifest), expected)
+        Path.remove(expected[0])
+        self.assertEqual(generate.compile_locale(self.configuration, 'fr', manifest), expected[:1])
+
+    def test_manifest_discarded_on_upgrade(self):
+        """
+        Tests that the files built by another version of i18n-tools are built again.
+        """
+        manifest = BuildManifest(self.configuration.locale_dir)
+        self.assertEqual(len(generate.compile_locale(self.configuration, 'fr', manifest)), 2)
+        manifest.save()
+        self.assertEqual(generate.compile_locale(self.configuration, 'fr', BuildManifest(manifest.directory)), [])
+        with patch('i18n.__version__', '0.0.1'):
+            self.assertEqual(len(generate.compile_locale(self.configuration, 'fr', BuildManifest(manifest.directory))), 2)
+
     # Patch dummy_locales to not have esperanto present
     def test_main(self):
         """
@@ -126,6 +224,42 @@ class TestGenerate(I18nToolTestCase):
             msg="Found %s (should be %s) merge comments in the header for %s" % (len(match), num_headers, file_path)
         )
 
+    def test_main_skips_up_to_date(self):
+        """
+        Tests that running generate again only merges and compiles files whose sources changed, unless forced.
+        """
+        generate.main(verbose=0, strict=False, root_dir=MOCK_APPLICATION_DIR)
+        with self.assertLogs(level='INFO') as logs:
+            generate.main(verbose=0, strict=False, root_dir=MOCK_APPLICATION_DIR)
+        self.assertFalse([line for line in logs.output if 'Compiling' in line or 'duplicates' in line])
+        self.assertTrue([line for line in logs.output if 'is up to date' in line])
+
+        with open(self.configuration.get_messages_dir('fr') / 'wiki.po', 'a', encoding='utf-8') as source_file:
+            source_file.write('\nmsgid "New"\nmsgstr "Nouveau"\n')
+        with self.assertLogs(level='INFO') as logs:
+            generate.main(verbose=0, strict=False, root_dir=MOCK_APPLICATION_DIR)
+        compiled = [line.rsplit('/', 3)[-3:] for line in logs.output if 'Compiling' in line]
+        self.assertEqual(compiled, [['fr', 'LC_MESSAGES', 'django.po']])
+
+        with self.assertLogs(level='INFO') as logs:
+            generate.main(verbose=0, strict=False, force=True, root_dir=MOCK_APPLICATION_DIR)
+        self.assertEqual(len([line for line in logs.output if 'Compiling' in line]), 4)
+
+    def test_main_js_catalogs(self):
+        """
+        Tests that the JavaScript catalogs of the merged locales are written, once.
+        """
+        js_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(js_dir.rmtree)
+        generate.main(verbose=0, strict=False, js_catalogs=js_dir, root_dir=MOCK_APPLICATION_DIR)
+        self.assertEqual(
+            sorted(js_dir.relpathto(filename) for filename in js_dir.walkfiles()),
+            ['fr/djangojs.js', 'fr/djangojs.json', 'mock/djangojs.js', 'mock/djangojs.json'],
+        )
+        with self.assertLogs(level='INFO') as logs:
+            generate.main(verbose=0, strict=False, js_catalogs=js_dir, root_dir=MOCK_APPLICATION_DIR)
+        self.assertEqual(len([line for line in logs.output if 'JavaScript catalogs' in line and 'up to date' in line]), 2)
+
     @patch('i18n.generate.LOG')
     def test_resolve_merge_conflicts(self, mock_log):
         django_po_path = Path.joinpath(self.configuration.get_messages_dir('mock'), DJANGO_PO)
@@ -164,6 +298,29 @@ class TestGenerate(I18nToolTestCase):
             self.assertEqual(len(diff.right_only), 0)
             self.assertEqual(len(diff.diff_files), 0)
 
+    def test_map_locale(self):
+        """
+        Tests mapping a locale directory in each mode, only changing what differs.
+        """
+        source_dir = self.configuration.get_messages_dir('fr')
+        dest_dir = self.mock_mapped_path / 'LC_MESSAGES'
+        for mode in generate.LANG_MAP_MODES:
+            self.assertEqual(generate.map_locale(source_dir, dest_dir, mode), len(source_dir.files()))
+            self.assertEqual(generate.map_locale(source_dir, dest_dir, mode), 0)
+            diff = dircmp(source_dir, dest_dir)
+            self.assertEqual((diff.left_only, diff.right_only, diff.diff_files), ([], [], []))
+            dest_file = dest_dir / 'django.po'
+            self.assertEqual(dest_file.islink(), mode == 'symlink')
+            if mode == 'symlink':
+                self.assertEqual(Path(dest_file.readlink()), Path('../../fr/LC_MESSAGES/django.po'))
+            else:
+                self.assertEqual(Path.samefile(source_dir / 'django.po', dest_file), mode == 'hardlink')
+
+        Path.write_text(dest_dir / 'stale.po', 'msgid ""')
+        Path.remove(dest_dir / 'wiki.po')
+        self.assertEqual(generate.map_locale(source_dir, dest_dir, 'symlink'), 2)
+        self.assertEqual(sorted(os.listdir(dest_dir)), sorted(os.listdir(source_dir)))
+
 
 def random_name(size=6):
     """Returns random filename as string, like test-4BZ81W"""
@@ -26,6 +26,7 @@ class TestIntegration(test_extract.ExtractInitTestMixin):
         """
         Helper to verify that extract and validate work together
         """
+        self.addCleanup((MOCK_DJANGO_APP_DIR / 'locale' / validate.VALIDATION_CACHE).remove_p)
         return validate.main(
             verbosity=0,
             config=self.configuration._filename,
@@ -0,0 +1,66 @@
+"""Test i18n/jscatalog.py"""
+
+import json
+import shutil
+import tempfile
+
+import polib
+from path import Path
+
+from i18n.jscatalog import js_catalog, render_js_catalog, write_js_catalogs
+
+from . import I18nToolTestCase
+
+
+class TestJsCatalog(I18nToolTestCase):
+    """
+    Tests of writing JavaScript catalogs.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pofile = polib.POFile()
+        self.pofile.metadata = {
+            'Content-Type': 'text/plain; charset=UTF-8',
+            'Plural-Forms': 'nplurals=3; plural=(n==1 ? 0 : n%10>=2 && n%10<=4 ? 1 : 2);',
+        }
+        self.pofile.extend([
+            polib.POEntry(msgid='Hello', msgstr='Cześć'),
+            polib.POEntry(msgid='May', msgctxt='month', msgstr='Maj'),
+            polib.POEntry(msgid='One file', msgid_plural='{} files', msgstr_plural={0: 'Plik', 1: '{} pliki'}),
+            polib.POEntry(msgid='Untranslated'),
+            polib.POEntry(msgid='Fuzzy', msgstr='Rozmyty', flags=['fuzzy']),
+        ])
+
+    def test_js_catalog(self):
+        catalog, plural = js_catalog(self.pofile)
+        self.assertEqual(catalog, {
+            'Hello': 'Cześć',
+            'month\x04May': 'Maj',
+            'One file': ['Plik', '{} pliki', ''],
+        })
+        self.assertEqual(plural, '(n==1 ? 0 : n%10>=2 && n%10<=4 ? 1 : 2)')
+
+    def test_render_js_catalog(self):
+        source = render_js_catalog(*js_catalog(self.pofile))
+        self.assertIn('const v = (n==1 ? 0 : n%10>=2 && n%10<=4 ? 1 : 2);', source)
+        self.assertIn('const newcatalog = {"Hello":"Cze\\u015b\\u0107",', source)
+        self.assertIn('django.gettext = function(msgid) {', source)
+        self.assertNotIn('\n\n', source)
+        self.assertNotIn('  ', source.replace('%10', ''))
+
+        source = render_js_catalog({}, None)
+        self.assertIn('django.pluralidx = function(count) { return (count == 1) ? 0 : 1; };', source)
+        self.assertNotIn('newcatalog', source)
+
+    def test_write_js_catalogs(self):
+        directory = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, directory)
+        written = write_js_catalogs(self.pofile, directory / 'pl', 'djangojs')
+        self.assertEqual(written, [directory / 'pl' / 'djangojs.js', directory / 'pl' / 'djangojs.json'])
+        with open(written[1], encoding='utf-8') as json_file:
+            self.assertEqual(json.load(json_file), {
+                'catalog': js_catalog(self.pofile)[0],
+                'formats': {},
+                'plural': js_catalog(self.pofile)[1],
+            })
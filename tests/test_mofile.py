@@ -0,0 +1,85 @@
+"""Test i18n/mofile.py"""
+
+import gettext
+import io
+import struct
+
+import polib
+
+from i18n.mofile import hash_string, mofile_bytes, mofile_messages, next_prime
+
+from . import I18nToolTestCase
+
+
+class TestMofile(I18nToolTestCase):
+    """
+    Tests of compiling .mo files.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pofile = polib.POFile()
+        self.pofile.metadata = {
+            'Content-Type': 'text/plain; charset=UTF-8',
+            'Plural-Forms': 'nplurals=2; plural=(n > 1);',
+        }
+        self.pofile.extend([
+            polib.POEntry(msgid='Hello', msgstr='Bonjour'),
+            polib.POEntry(msgid='May', msgctxt='month', msgstr='Mai'),
+            polib.POEntry(msgid='May', msgstr='Peut'),
+            polib.POEntry(msgid='One file', msgid_plural='{} files', msgstr_plural={0: 'Un fichier', 1: '{} fichiers'}),
+            polib.POEntry(msgid='Untranslated'),
+            polib.POEntry(msgid='Fuzzy', msgstr='Flou', flags=['fuzzy']),
+            polib.POEntry(msgid='Obsolete', msgstr='Obsolète', obsolete=True),
+        ])
+
+    def translations(self, **kwargs):
+        return gettext.GNUTranslations(io.BytesIO(mofile_bytes(mofile_messages(self.pofile, **kwargs))))
+
+    def test_compile(self):
+        translations = self.translations()
+        self.assertEqual(translations.gettext('Hello'), 'Bonjour')
+        self.assertEqual(translations.gettext('May'), 'Peut')
+        self.assertEqual(translations.pgettext('month', 'May'), 'Mai')
+        self.assertEqual(translations.ngettext('One file', '{} files', 1), 'Un fichier')
+        self.assertEqual(translations.ngettext('One file', '{} files', 3), '{} fichiers')
+        self.assertEqual(translations.info()['content-type'], 'text/plain; charset=UTF-8')
+        for msgid in ('Untranslated', 'Fuzzy', 'Obsolete'):
+            self.assertEqual(translations.gettext(msgid), msgid)
+        # pylint: disable=protected-access
+        self.assertEqual(len(translations._catalog), 6)
+
+    def test_keep_untranslated(self):
+        messages = dict(mofile_messages(self.pofile, keep_untranslated=True))
+        self.assertEqual(messages[b'Untranslated'], b'')
+        self.assertNotIn(b'Fuzzy', messages)
+        self.assertEqual(self.translations(keep_untranslated=True).gettext('Hello'), 'Bonjour')
+
+    def test_hash_table(self):
+        data = mofile_bytes(mofile_messages(self.pofile))
+        __, __, count, keys_index, values_index, size, hash_index = struct.unpack('<7I', data[:28])
+        self.assertEqual(size, next_prime(2 * count))
+        table = struct.unpack(f'<{size}I', data[hash_index:hash_index + 4 * size])
+
+        def key(index):
+            length, offset = struct.unpack('<2I', data[keys_index + 8 * index:keys_index + 8 * index + 8])
+            return data[offset:offset + length]
+
+        # Look each key up the way GNU gettext does.
+        for msgid in (b'', b'Hello', b'month\x04May', b'May', b'One file'):
+            value = hash_string(msgid)
+            slot, increment = value % size, 1 + value % (size - 2)
+            while key(table[slot] - 1).partition(b'\x00')[0] != msgid:
+                self.assertNotEqual(table[slot], 0)
+                slot = slot - (size - increment) if slot >= size - increment else slot + increment
+
+        self.assertEqual(hash_string(b'month\x04May'), 0x5a907e9)
+        self.assertEqual(hash_string(b'One file\x00{} files'), hash_string(b'One file'))
+        self.assertEqual([next_prime(number) for number in (0, 3, 8, 14, 24)], [3, 3, 11, 17, 29])
+
+    def test_identical_translations(self):
+        self.pofile.append(polib.POEntry(msgid='Hi', msgstr='Bonjour'))
+        data = mofile_bytes(mofile_messages(self.pofile))
+        self.assertEqual(data.count(b'Bonjour\x00'), 1)
+        translations = gettext.GNUTranslations(io.BytesIO(data))
+        self.assertEqual((translations.gettext('Hi'), translations.gettext('Hello')), ('Bonjour', 'Bonjour'))
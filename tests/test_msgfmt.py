@@ -0,0 +1,288 @@
+"""Test i18n/msgfmt.py"""
+
+import os
+import re
+import shutil
+import subprocess
+import textwrap
+
+import ddt
+import polib
+from path import Path
+
+from i18n import msgfmt
+
+from . import I18nToolTestCase
+
+# Catalogs with the problems of each check, and the errors GNU msgfmt -c
+# finds in them, recorded by scripts/record_msgfmt_output.py.
+FIXTURES_DIR = Path(__file__).dirname() / 'data' / 'msgfmt'
+FIXTURES = sorted(fixture.basename() for fixture in FIXTURES_DIR.files('*.po'))
+
+HEADER = r'''
+msgid ""
+msgstr ""
+"Project-Id-Version: edx-platform\n"
+"PO-Revision-Date: 2023-06-13 09:00+0000\n"
+"Last-Translator: \n"
+"Language-Team: French\n"
+"Language: fr\n"
+"MIME-Version: 1.0\n"
+"Content-Type: text/plain; charset=UTF-8\n"
+"Content-Transfer-Encoding: 8bit\n"
+"Plural-Forms: nplurals=2; plural=(n > 1);\n"
+'''
+
+
+def catalog(text, header=HEADER):
+    """
+    Returns the pofile of `header` and `text`.
+    """
+    return polib.pofile(textwrap.dedent(header) + textwrap.dedent(text))
+
+
+def msgfmt_output(name):
+    """
+    Returns the errors GNU msgfmt -c finds in the fixture `name`: those
+    recorded for it, or those msgfmt finds now if none are and it is
+    installed, or None.
+    """
+    recorded = FIXTURES_DIR / name.replace('.po', '.msgfmt')
+    if recorded.exists():
+        return recorded.read_text()
+    if not shutil.which('msgfmt'):
+        return None
+    return subprocess.run(
+        ['msgfmt', '-c', '-o', os.devnull, name], cwd=FIXTURES_DIR, env=dict(os.environ, LC_ALL='C', LANGUAGE=''),
+        capture_output=True, text=True, check=False,
+    ).stderr
+
+
+def msgfmt_problems(name, output):
+    """
+    Returns the descriptions of the problems in the errors `output` of msgfmt
+    -c for the fixture `name`, sorted.  The two parts of the problems msgfmt
+    reports on two messages, like the number of plural forms, are joined.
+    """
+    problems = []
+    for line in output.splitlines():
+        if line.startswith(name + ':'):
+            problem = re.sub(r'^[^:]*:(\d+:)? ', '', line)
+            if problems and problem.startswith('but '):
+                problems[-1] += ' ' + problem
+            else:
+                problems.append(problem)
+        elif problems and line[:1].isspace():
+            problems[-1] += ' ' + line.strip()
+    return sorted(problems)
+
+
+@ddt.ddt
+class TestMsgfmt(I18nToolTestCase):
+    """
+    Tests of the checks msgfmt -c makes.
+    """
+
+    def test_no_problems(self):
+        pofile = catalog(r'''
+            #, python-format
+            msgid "Hello %(name)s"
+            msgstr "Bonjour %(name)s"
+
+            #, python-format
+            msgid "One file"
+            msgid_plural "%(count)s files"
+            msgstr[0] "Un fichier"
+            msgstr[1] "%(count)s fichiers"
+
+            #, fuzzy, python-format
+            msgid "Fuzzy %(name)s"
+            msgstr "Flou"
+
+            #, python-format
+            msgid "Untranslated %(name)s"
+            msgstr ""
+
+            #~ msgid "Hello %(name)s"
+            #~ msgstr "Salut"
+            ''')
+        self.assertEqual(msgfmt.check_catalog(pofile), [])
+
+    def test_header(self):
+        header = r'''
+            msgid ""
+            msgstr ""
+            "Project-Id-Version: PACKAGE VERSION\n"
+            "PO-Revision-Date: YEAR-MO-DA HO:MI+ZONE\n"
+            "Content-Type: text/plain; charset=LATIN-42\n"
+            '''
+        # msgfmt stops looking at the fields at the second with its initial value.
+        self.assertEqual(msgfmt.check_catalog(catalog('', header)), [
+            ("warning: some header fields still have the initial default value", ""),
+            (
+                'warning: Charset "LATIN-42" is not a portable encoding name. '
+                "Message conversion to user's charset might not work.",
+                "",
+            ),
+        ])
+        header = r'''
+            msgid ""
+            msgstr ""
+            "Project-Id-Version: PACKAGE VERSION\n"
+            "Language-Team: French\n"
+            "Content-Type: text/plain; charset=CHARSET\n"
+            "X-Generator: MIME-Version 1.0\n"
+            '''
+        # "Language" is found in "Language-Team".
+        self.assertEqual(msgfmt.check_catalog(catalog('', header)), [
+            ("warning: header field 'PO-Revision-Date' missing in header", ""),
+            ("warning: header field 'Last-Translator' missing in header", ""),
+            ("warning: header field 'MIME-Version' should start at beginning of line", ""),
+            ("warning: some header fields still have the initial default value", ""),
+            ("warning: Charset missing in header. Message conversion to user's charset will not work.", ""),
+        ])
+        self.assertEqual(msgfmt.check_catalog(catalog('msgid "Hi"\nmsgstr "Salut"\n', header='')), [])
+        self.assertEqual(
+            msgfmt.check_catalog(catalog('msgid "Hi"\nmsgstr "Sälut"\n', header='')),
+            [("PO file header missing or invalid", "")],
+        )
+
+    @ddt.data(
+        ('nplurals=2; plural=(n > 1);', []),
+        ('nplurals=3; plural=n%10==1 && n%100!=11 ? 0 : n != 0 ? 1 : 2;', [
+            ("nplurals = 3 but some messages have only 2 plural forms", "One file | {count} files"),
+        ]),
+        ('nplurals=1; plural=0;', [("nplurals = 1 but some messages have 2 plural forms", "One file | {count} files")]),
+        ('nplurals=2; plural=n;', [("nplurals = 2 but plural expression can produce values as large as 2", "")]),
+        ('nplurals=2; plural=(n > 1) / (n - 2);', [("plural expression can produce division by zero", "")]),
+        ('nplurals=2; plural=n ++ 1;', [("invalid plural expression", "")]),
+        ('nplurals=x; plural=(n > 1);', [("invalid nplurals value", "")]),
+        ('plural=(n > 1);', [(msgfmt.NO_PLURAL_FORMS, "One file")]),
+        (None, [(msgfmt.NO_PLURAL_FORMS, "One file")]),
+    )
+    @ddt.unpack
+    def test_plural_forms(self, plural_forms, expected):
+        pofile = catalog(r'''
+            msgid "One file"
+            msgid_plural "{count} files"
+            msgstr[0] "Un fichier"
+            msgstr[1] "{count} fichiers"
+            ''')
+        if plural_forms:
+            pofile.metadata['Plural-Forms'] = plural_forms
+        else:
+            del pofile.metadata['Plural-Forms']
+        self.assertEqual(msgfmt.check_catalog(pofile), expected)
+
+    def test_newlines(self):
+        pofile = catalog(r'''
+            msgid "Hello\n"
+            msgstr "Bonjour"
+
+            msgid "\nOne file"
+            msgid_plural "\n{count} files"
+            msgstr[0] "\nUn fichier"
+            msgstr[1] "{count} fichiers"
+            ''')
+        self.assertEqual(msgfmt.check_catalog(pofile), [
+            ("'msgid' and 'msgstr' entries do not both end with '\\n'", "Hello\n", "Bonjour"),
+            (
+                "'msgid' and 'msgstr[1]' entries do not both begin with '\\n'",
+                "\nOne file | \n{count} files",
+                "{count} fichiers",
+            ),
+        ])
+
+    def test_duplicates(self):
+        pofile = catalog(r'''
+            msgid "Hello"
+            msgstr "Bonjour"
+
+            msgctxt "greeting"
+            msgid "Hello"
+            msgstr "Salut"
+
+            msgid "Hello"
+            msgstr ""
+            ''')
+        self.assertEqual(msgfmt.check_catalog(pofile), [("duplicate message definition", "Hello")])
+
+    @ddt.data(
+        # Python formats.
+        ('python-format', '%(name)s has %(count)d', '%(count)d pour %(name)s', None),
+        ('python-format', '%s has %d', '%s a %d', None),
+        ('python-format', '100%% of %s', '%s à 100%%', None),
+        ('python-format', '%(name)s', 'nom', "a format specification for argument 'name' doesn't exist in 'msgstr'"),
+        ('python-format', 'name', '%(name)s', "a format specification for argument 'name', as in 'msgstr', doesn't exist in 'msgid'"),
+        ('python-format', '%(count)d', '%(count)s', "format specifications in 'msgid' and 'msgstr' for argument 'count' are not the same"),
+        ('python-format', '%s and %s', '%s', "number of format specifications in 'msgid' and 'msgstr' does not match"),
+        ('python-format', '%s has %d', '%d a %s', "format specifications in 'msgid' and 'msgstr' for argument 1 are not the same"),
+        ('python-format', '%(name)s', '%s', "format specifications in 'msgid' expect a mapping, those in 'msgstr' expect a tuple"),
+        ('python-format', '%s', '%(name)s', "format specifications in 'msgid' expect a tuple, those in 'msgstr' expect a mapping"),
+        (
+            'python-format', '%(name)s', '%(name)s et %s',
+            "'msgstr' is not a valid Python format string, unlike 'msgid'. Reason: The string refers to arguments "
+            "both through argument names and through unnamed argument specifications.",
+        ),
+        (
+            'python-format', '%(name)s', '%(name)y',
+            "'msgstr' is not a valid Python format string, unlike 'msgid'. Reason: In the directive number 1, "
+            "the character 'y' is not a valid conversion specifier.",
+        ),
+        # An invalid msgid isn't checked.
+        ('python-format', '100%', '100 %(pour)s', None),
+        # C formats.
+        ('c-format', '%s has %d files', '%2$d fichiers pour %1$s', None),
+        ('c-format', '%.*f%%', '%.*f %%', None),
+        ('c-format', '%s has %d', '%s a %ld', "format specifications in 'msgid' and 'msgstr' for argument 2 are not the same"),
+        ('c-format', '%s has %d', '%s', "number of format specifications in 'msgid' and 'msgstr' does not match"),
+        (
+            'c-format', '%s has %d', '%2$d',
+            "'msgstr' is not a valid C format string, unlike 'msgid'. Reason: The string refers to argument "
+            "number 2 but ignores argument number 1.",
+        ),
+        # Python brace formats.
+        ('python-brace-format', '{name} has {count:d} {{files}}', '{count:d} pour {name.title}', None),
+        ('python-brace-format', '{name}', 'nom', "a format specification for argument 'name' doesn't exist in 'msgstr'"),
+        ('python-brace-format', '{name}', '{nom}', "a format specification for argument 'name' doesn't exist in 'msgstr'"),
+        (
+            'python-brace-format', '{name}', '{name',
+            "'msgstr' is not a valid Python brace format string, unlike 'msgid'. Reason: In the directive number 1, "
+            "there is an unterminated format directive.",
+        ),
+        # Strings not flagged aren't checked.
+        ('', '%(name)s', 'nom', None),
+    )
+    @ddt.unpack
+    def test_formats(self, flag, msgid, msgstr, problem):
+        entry = polib.POEntry(msgid=msgid, msgstr=msgstr, flags=[flag] if flag else [])
+        self.assertEqual(msgfmt.check_formats(entry), [(problem, msgstr)] if problem else [])
+
+    def test_plural_formats(self):
+        pofile = catalog(r'''
+            #, python-format
+            msgid "One file"
+            msgid_plural "%(count)s files"
+            msgstr[0] "Un fichier"
+            msgstr[1] "Des fichiers"
+            ''')
+        # The first form, for 0 and 1 only, can leave the number out, not the other.
+        self.assertEqual(msgfmt.check_catalog(pofile), [(
+            "a format specification for argument 'count' doesn't exist in 'msgstr[1]'",
+            "One file | %(count)s files",
+            "Des fichiers",
+        )])
+
+    @ddt.data(*FIXTURES)
+    def test_same_as_gnu_msgfmt(self, name):
+        output = msgfmt_output(name)
+        if output is None:
+            self.skipTest("GNU msgfmt isn't installed, and its output for this fixture isn't recorded")
+        problems = msgfmt.check_catalog(polib.pofile(FIXTURES_DIR / name))
+        self.assertEqual(sorted(problem[0] for problem in problems), msgfmt_problems(name, output))
+
+    @ddt.data(*FIXTURES)
+    def test_fixtures_have_problems(self, name):
+        # Each fixture but one has problems for msgfmt to find.
+        problems = msgfmt.check_catalog(polib.pofile(FIXTURES_DIR / name))
+        self.assertEqual(bool(problems), name != 'no_problems.po')
@@ -1,5 +1,6 @@
 """Test i18n/segment.py"""
 
+import fnmatch
 import os.path
 import shutil
 
@@ -7,7 +8,7 @@ from path import Path
 import polib
 
 from i18n.extract import DJANGO_PO
-from i18n.segment import segment_pofile
+from i18n.segment import SegmentMatcher, segment_pofile
 
 from . import I18nToolTestCase
 
@@ -59,3 +60,33 @@ class SegmentTest(I18nToolTestCase):
 
         self.assert_pofile_same(WORK / DJANGO_PO, TEST_DATA / "django_after.po")
         self.assert_pofile_same(WORK / "studio.po", TEST_DATA / "studio.po")
+
+    def test_sample_data_in_memory(self):
+        work_file = WORK / DJANGO_PO
+        catalogs = {work_file: polib.pofile(TEST_DATA / "django_before.po")}
+
+        written = segment_pofile(work_file, {'studio.po': ['cms/*', 'other_cms/*']}, catalogs)
+
+        self.assertEqual(written, {WORK / DJANGO_PO, WORK / "studio.po"})
+        self.assertFalse(os.path.exists(work_file))
+        self.assertFalse(os.path.exists(WORK / "studio.po"))
+        self.assertEqual(catalogs[work_file], polib.pofile(TEST_DATA / "django_after.po"))
+        self.assertEqual(catalogs[WORK / "studio.po"], polib.pofile(TEST_DATA / "studio.po"))
+
+    def test_segment_matcher(self):
+        segments = {
+            'studio.po': ['cms/*', 'common/*/studio_*.py'],
+            'weird.po': ['*/weird_*.*', 'common/[!x]?/*'],
+        }
+        matcher = SegmentMatcher(segments, default='django.po')
+        patterns = [(pat, segment) for segment, pats in segments.items() for pat in pats]
+        for occ_file in (
+            'cms/djangoapps/views.py', 'common/ab/studio_x.py', 'lms/weird_one.html', 'common/ab/c.py',
+            'common/xb/c.py', 'lms/templates/index.html', 'cms', '',
+        ):
+            expected = next((segment for pat, segment in patterns if fnmatch.fnmatch(occ_file, pat)), 'django.po')
+            self.assertEqual(matcher.segment(occ_file), expected, occ_file)
+        # The first pattern matching a file gives its segment.
+        self.assertEqual(matcher.segment('cms/weird_one.html'), 'studio.po')
+        self.assertEqual(matcher.segments['lms/weird_one.html'], 'weird.po')
+        self.assertIsNone(SegmentMatcher({}).segment('cms/views.py'))
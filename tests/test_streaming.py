@@ -0,0 +1,71 @@
+"""Test i18n/streaming.py"""
+
+import shutil
+import tempfile
+
+import polib
+from path import Path
+
+from i18n.concat import concatenate
+from i18n.generate import clean_catalog
+from i18n.streaming import concatenate_files, read_chunks, rewrite_catalog
+
+from . import I18nToolTestCase, MOCK_APPLICATION_DIR
+
+MOCK_MESSAGES_DIR = MOCK_APPLICATION_DIR / 'conf' / 'locale' / 'mock' / 'LC_MESSAGES'
+SOURCES = ('django-partial.po', 'mako.po', 'mako-studio.po', 'messages.po')
+
+
+class TestStreaming(I18nToolTestCase):
+    """
+    Tests of handling catalogs a chunk at a time.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        for source in SOURCES:
+            shutil.copy(MOCK_MESSAGES_DIR / source, self.temp_dir)
+        with open(self.temp_dir / 'mako.po', 'a', encoding='utf-8') as source_file:
+            source_file.write('\n#: lms/one.py:12\nmsgid "One"\nmsgstr "Un"\n\n#~ msgid "Gone"\n#~ msgstr "Parti"\n')
+        with open(self.temp_dir / 'headless.po', 'w', encoding='utf-8') as source_file:
+            source_file.write('#: cms/one.py:3\nmsgid "One"\nmsgstr "Une"\n\n#: cms/two.py:3\nmsgid "Two"\nmsgstr ""\n')
+
+    def test_read_chunks(self):
+        chunks = list(read_chunks(self.temp_dir / 'mako.po', chunk_size=2))
+        whole = polib.pofile(self.temp_dir / 'mako.po')
+        self.assertEqual((chunks[0].header, chunks[0].metadata, len(chunks[0])), (whole.header, whole.metadata, 0))
+        self.assertTrue(all(len(chunk) <= 2 for chunk in chunks))
+        self.assertEqual([str(entry) for chunk in chunks for entry in chunk], [str(entry) for entry in whole])
+
+        chunks = list(read_chunks(self.temp_dir / 'headless.po'))
+        self.assertEqual((chunks[0].metadata, len(chunks[0])), ({}, 0))
+        self.assertEqual([entry.msgid for entry in chunks[1]], ['One', 'Two'])
+
+    def test_rewrite_catalog(self):
+        expected = polib.pofile(self.temp_dir / 'mako.po')
+        clean_catalog(expected)
+        self.assertTrue(rewrite_catalog(self.temp_dir / 'mako.po', clean_catalog, chunk_size=3))
+        self.assertEqual((self.temp_dir / 'mako.po').read_text(encoding='utf-8'), str(expected))
+        self.assertFalse(rewrite_catalog(self.temp_dir / 'mako.po', clean_catalog, chunk_size=3))
+
+    def test_concatenate_files(self):
+        names = SOURCES + ('headless.po',)
+        catalogs = []
+        for name in names:
+            catalog = polib.pofile(self.temp_dir / name)
+            clean_catalog(catalog)
+            catalogs.append((name, catalog))
+        merged, conflicts = concatenate(catalogs)
+
+        target = self.temp_dir / 'merged.po'
+        streamed_conflicts = concatenate_files(
+            [(name, self.temp_dir / name) for name in names], target, clean=clean_catalog, chunk_size=2,
+        )
+        self.assertEqual(target.read_text(encoding='utf-8'), str(merged))
+        self.assertEqual(
+            [(str(entry), translations) for entry, translations in streamed_conflicts],
+            [(str(entry), translations) for entry, translations in conflicts],
+        )
+        self.assertEqual(len(conflicts), 1)
@@ -0,0 +1,126 @@
+"""Test i18n/translations.py"""
+
+import gettext
+import io
+import os
+import tempfile
+
+import ddt
+import polib
+
+from i18n.mofile import write_mofile
+from i18n.translations import MmapTranslations, install_django, translation
+
+from . import I18nToolTestCase
+
+
+@ddt.ddt
+class TestMmapTranslations(I18nToolTestCase):
+    """
+    Tests of the memory-mapped translations.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pofile = polib.POFile()
+        self.pofile.metadata = {
+            'Last-Translator': 'Élodie <elodie@example.com>',
+            'Content-Type': 'text/plain; charset=UTF-8',
+            'Plural-Forms': 'nplurals=2; plural=(n > 1);',
+        }
+        self.pofile.extend([
+            polib.POEntry(msgid='Hello', msgstr='Bonjour'),
+            polib.POEntry(msgid='May', msgctxt='month', msgstr='Mai'),
+            polib.POEntry(msgid='May', msgstr='Peut'),
+            polib.POEntry(msgid='One file', msgid_plural='{} files', msgstr_plural={0: 'Un fichier', 1: '{} fichiers'}),
+        ])
+        self.pofile.extend(polib.POEntry(msgid=f'Message {number}', msgstr=f'Méssage {number}') for number in range(50))
+        temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.addCleanup(temp_dir.cleanup)
+        self.directory = temp_dir.name
+
+    def mofile(self, writer):
+        """
+        Returns the filename of the pofile written as a .mo file by `writer`.
+        """
+        filename = os.path.join(self.directory, f'{writer}.mo')
+        if writer == 'polib':
+            # polib writes no hash table.
+            self.pofile.save_as_mofile(filename)
+        else:
+            write_mofile(self.pofile, filename)
+        return filename
+
+    @ddt.data('polib', 'mofile')
+    def test_same_as_gnu_translations(self, writer):
+        filename = self.mofile(writer)
+        with open(filename, 'rb') as stream:
+            expected = gettext.GNUTranslations(stream)
+        with open(filename, 'rb') as stream:
+            translations = MmapTranslations(stream)
+
+        for msgid in ('Hello', 'May', 'Message 0', 'Message 49', 'Missing', 'One file', ''):
+            self.assertEqual(translations.gettext(msgid), expected.gettext(msgid))
+        self.assertEqual(translations.pgettext('month', 'May'), 'Mai')
+        self.assertEqual(translations.pgettext('year', 'May'), 'May')
+        for count in (0, 1, 2):
+            self.assertEqual(
+                translations.ngettext('One file', '{} files', count),
+                expected.ngettext('One file', '{} files', count),
+            )
+        self.assertEqual(translations.ngettext('Hello', 'Hellos', 2), 'Hellos')
+        self.assertEqual(translations.info(), expected.info())
+        self.assertEqual(translations.charset(), 'UTF-8')
+        # pylint: disable=protected-access
+        self.assertEqual(dict(translations._catalog), expected._catalog)
+        self.assertEqual(len(translations._catalog), len(expected._catalog))
+
+    def test_lookups_cached(self):
+        with open(self.mofile('mofile'), 'rb') as stream:
+            translations = MmapTranslations(stream)
+        # pylint: disable=protected-access
+        find = translations._catalog.find
+        for __ in range(3):
+            translations.gettext('Hello')
+        self.assertEqual((find.cache_info().hits, find.cache_info().misses), (2, 1))
+        for number in range(find.cache_info().maxsize + 10):
+            translations.gettext(f'Missing {number}')
+        self.assertEqual(find.cache_info().currsize, find.cache_info().maxsize)
+        self.assertEqual(translations.gettext('Hello'), 'Bonjour')
+
+    def test_copy(self):
+        with open(self.mofile('mofile'), 'rb') as stream:
+            translations = MmapTranslations(stream)
+        # pylint: disable=protected-access
+        catalog = translations._catalog.copy()
+        catalog.update({'Hello': 'Salut', 'Bye': 'Au revoir'})
+        self.assertEqual((catalog['Hello'], catalog['Bye'], catalog['May']), ('Salut', 'Au revoir', 'Peut'))
+        self.assertEqual(translations.gettext('Hello'), 'Bonjour')
+
+    def test_bad_file(self):
+        with self.assertRaisesRegex(OSError, 'Bad magic number'):
+            MmapTranslations(io.BytesIO(b'not a .mo file at all, really not'))
+        with self.assertRaisesRegex(OSError, 'Bad magic number'):
+            MmapTranslations(io.BytesIO(b''))
+
+    def test_translation(self):
+        messages_dir = os.path.join(self.directory, 'fr', 'LC_MESSAGES')
+        os.makedirs(messages_dir)
+        write_mofile(self.pofile, os.path.join(messages_dir, 'djangojs.mo'))
+
+        translations = translation('djangojs', self.directory, ['fr'])
+        self.assertIsInstance(translations, MmapTranslations)
+        self.assertEqual(translations.gettext('Hello'), 'Bonjour')
+
+        # pylint: disable=import-outside-toplevel
+        from django.conf import settings
+        from django.utils.translation import trans_real
+        if not settings.configured:
+            settings.configure(LANGUAGE_CODE='fr')
+        original = trans_real.DjangoTranslation._new_gnu_trans  # pylint: disable=protected-access
+        self.addCleanup(setattr, trans_real.DjangoTranslation, '_new_gnu_trans', original)
+        install_django()
+        django_translation = trans_real.DjangoTranslation('fr', 'djangojs', [self.directory])
+        self.assertEqual(django_translation.gettext('Hello'), 'Bonjour')
+        self.assertEqual(django_translation.ngettext('One file', '{} files', 3), '{} fichiers')
+        self.assertEqual(django_translation.pgettext('month', 'May'), 'Mai')
@@ -3,8 +3,11 @@ Tests for validate.py
 """
 
 import os
+import tempfile
 import textwrap
+from unittest import mock
 
+import polib
 from path import Path
 
 from i18n import validate
@@ -90,6 +93,37 @@ class TestValidate(I18nToolTestCase):
         without_empty = [p for p in VALIDATION_PROBLEMS if p[0] != 'Empty translation']
         self.assertEqual(problems, without_empty)
 
+    def test_shared_source_tags(self):
+        source_tags = validate.SourceTags()
+        pomsgs = polib.pofile(TEST_DATA / "validation_problems.po")
+        for __ in range(2):
+            problems = validate.check_pofile_messages(pomsgs, report_empty=True, source_tags=source_tags)
+            self.assertEqual(problems, VALIDATION_PROBLEMS)
+        self.assertEqual(source_tags['Two tags: {one} and {two}'], {'{one}', '{two}'})
+        self.assertEqual(source_tags['<abbr>CSS</abbr> &amp; {more}'], {'{more}'})
+
+    def test_check_po_file(self):
+        msgfmt_problems = [
+            (
+                'message catalog has plural form translations, but lacks a header entry with '
+                '"Plural-Forms: nplurals=INTEGER; plural=EXPRESSION;"',
+                '1. There are {num} things',
+            ),
+            ('duplicate message definition', 'No tags'),
+        ]
+        filename = TEST_DATA / "validation_problems.po"
+        self.assertEqual(validate.check_po_file(filename, report_empty=True), msgfmt_problems + VALIDATION_PROBLEMS)
+        self.assertEqual(validate.check_po_file(filename, check_translations=False), msgfmt_problems)
+        self.assertEqual(validate.check_po_file(TEST_DATA / "django_before.po"), [])
+
+    def test_check_po_file_no_checks(self):
+        # A file is only read for the checks made, so English files checked with msgfmt aren't read here.
+        filename = Path(tempfile.mkdtemp()) / 'django.po'
+        self.addCleanup(filename.dirname().rmtree)
+        filename.write_text('msgid "One"\nmsgstr "Un"\nnot a keyword\n')
+        self.assertEqual(validate.check_po_file(filename, check_translations=False)[0][0], "Syntax error")
+        self.assertEqual(validate.check_po_file(filename, check_translations=False, check_format=False), [])
+
     def test_report_problems(self):
         self.addCleanup(os.remove, "foo.prob")
         validate.report_problems("foo.po", [
@@ -107,3 +141,121 @@ class TestValidate(I18nToolTestCase):
             """)
         with open("foo.prob") as f:
             self.assertEqual(f.read(), expected_output)
+
+    def make_po_files(self):
+        """
+        Returns the locale directory of a few .po files, with and without
+        problems, in several languages.
+        """
+        locale_dir = Path(tempfile.mkdtemp())
+        self.addCleanup(locale_dir.rmtree)
+        po_files = []
+        for language in ('ar', 'es', 'fr'):
+            messages_dir = locale_dir / language / 'LC_MESSAGES'
+            messages_dir.makedirs()
+            for name, source in (('django.po', 'validation_problems.po'), ('djangojs.po', 'django_before.po')):
+                (TEST_DATA / source).copy(messages_dir / name)
+                po_files.append(messages_dir / name)
+        return locale_dir, po_files
+
+    @staticmethod
+    def validate_files(locale_dir, po_files, report_empty=False, cached=False, **options):
+        """
+        Validate `po_files`, with a cache if `cached`.
+        """
+        cache = validate.ValidationCache(locale_dir) if cached else None
+        return validate.validate_files(locale_dir, po_files, report_empty, cache=cache, **options)
+
+    def test_validate_files_jobs(self):
+        outputs = []
+        for jobs in (1, 2):
+            locale_dir, po_files = self.make_po_files()
+            with self.assertLogs(validate.log, 'INFO') as logs:
+                found_problems = self.validate_files(locale_dir, po_files[::-1], jobs=jobs)
+            prob_files = sorted(locale_dir.walkfiles('*.prob'))
+            outputs.append((
+                found_problems,
+                [prob_file.relpath(locale_dir) for prob_file in prob_files],
+                [prob_file.read_text() for prob_file in prob_files],
+                [line.replace(locale_dir, '') for line in logs.output],
+            ))
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertTrue(outputs[0][0])
+        self.assertEqual(outputs[0][1], [f'{language}/LC_MESSAGES/django.prob' for language in ('ar', 'es', 'fr')])
+        # The files are reported in the order they are given.
+        self.assertIn('/fr/LC_MESSAGES/djangojs.po', outputs[0][3][0])
+        self.assertIn('/ar/LC_MESSAGES/django.po', outputs[0][3][-1])
+
+    def test_validate_files_msgfmt(self):
+        # With msgfmt, the format of the files is checked with GNU msgfmt -c instead.
+        locale_dir, po_files = self.make_po_files()
+        with mock.patch.object(validate, 'call', return_value=(b'', b'')) as call:
+            with self.assertLogs(validate.log, 'INFO'):
+                self.assertFalse(validate.validate_files(locale_dir, po_files[1::2], msgfmt=True))
+            self.assertEqual(call.call_count, 3)
+            call.return_value = (b'', b'djangojs.po:3: duplicate message definition')
+            with self.assertLogs(validate.log) as logs:
+                self.assertTrue(validate.validate_files(locale_dir, po_files[1:2], msgfmt=True))
+        self.assertIn('duplicate message definition', '\n'.join(logs.output))
+
+    def test_validate_files_max_problems(self):
+        locale_dir, po_files = self.make_po_files()
+        with self.assertLogs(validate.log) as logs:
+            self.assertTrue(self.validate_files(locale_dir, po_files, jobs=2, max_problems=5))
+        self.assertEqual(list(locale_dir.walkfiles('*.prob')), [locale_dir / 'ar' / 'LC_MESSAGES' / 'django.prob'])
+        self.assertIn("Stopped validating after 10 problems", logs.output[-1])
+        locale_dir, po_files = self.make_po_files()
+        with self.assertLogs(validate.log, 'INFO'):
+            self.assertFalse(self.validate_files(locale_dir, po_files[1::2], jobs=2, max_problems=1))
+
+    def test_validate_files_cache(self):
+        locale_dir, po_files = self.make_po_files()
+        prob_file = locale_dir / 'es' / 'LC_MESSAGES' / 'django.prob'
+        with self.assertLogs(validate.log, 'INFO'):
+            self.assertTrue(self.validate_files(locale_dir, po_files, cached=True))
+        expected = prob_file.read_text()
+        prob_file.remove()
+
+        # Unchanged files aren't checked again, and their problems are reported again.
+        with mock.patch.object(validate, 'check_po_file', wraps=validate.check_po_file) as check_po_file:
+            with self.assertLogs(validate.log, 'INFO'):
+                self.assertTrue(self.validate_files(locale_dir, po_files, cached=True))
+            self.assertEqual(check_po_file.call_count, 0)
+            self.assertEqual(prob_file.read_text(), expected)
+
+            # Nor are they when a .dup file appears, which is reported.
+            dup_file = locale_dir / 'fr' / 'LC_MESSAGES' / 'djangojs.dup'
+            dup_file.write_text('')
+            po_files = [po_file for po_file in po_files if po_file.basename() == 'djangojs.po']
+            with self.assertLogs(validate.log, 'INFO') as logs:
+                self.assertTrue(self.validate_files(locale_dir, po_files, cached=True))
+            self.assertIn(f"Duplicates found in {dup_file}", '\n'.join(logs.output))
+            self.assertEqual(check_po_file.call_count, 0)
+
+            # Changed files, and those checked with other options, are.
+            dup_file.remove()
+            po_files[0].write_text(po_files[0].read_text() + '\nmsgid "New"\nmsgstr "Nouveau"\n')
+            with self.assertLogs(validate.log, 'INFO'):
+                self.assertFalse(self.validate_files(locale_dir, po_files, cached=True))
+            self.assertEqual(check_po_file.call_count, 1)
+            with self.assertLogs(validate.log, 'INFO'):
+                self.validate_files(locale_dir, po_files, True, cached=True)
+            self.assertEqual(check_po_file.call_count, 4)
+
+    def test_validate_files_cache_msgfmt_version(self):
+        # The cached output of GNU msgfmt is only used with the same msgfmt.
+        locale_dir, po_files = self.make_po_files()
+        po_files = po_files[1::2]
+        version = 'msgfmt (GNU gettext-tools) 0.21'
+
+        def call(command, working_directory):  # pylint: disable=unused-argument
+            return (version.encode('utf8'), b'') if command == 'msgfmt --version' else (b'', b'')
+
+        with mock.patch.object(validate, 'call', side_effect=call) as mock_call:
+            for checks, new_version in [(3, version), (0, version), (3, 'msgfmt (GNU gettext-tools) 0.22')]:
+                version = new_version
+                mock_call.reset_mock()
+                with self.assertLogs(validate.log, 'INFO'):
+                    cache = validate.ValidationCache(locale_dir)
+                    self.assertFalse(validate.validate_files(locale_dir, po_files, msgfmt=True, cache=cache))
+                self.assertEqual(mock_call.call_count, checks + 1)